@@ -24,6 +24,14 @@ const calorieLogSchema = new mongoose.Schema(
       type: Date,
       default: Date.now,
     },
+    // "suggestion" when added from a dashboard suggestion; suggestedDish is
+    // the menu item name (dish above also carries the restaurant)
+    source: {
+      type: String,
+      enum: ["manual", "suggestion"],
+      default: "manual"
+    },
+    suggestedDish: String,
   },
   { timestamps: true }
 );
@@ -5,6 +5,7 @@ import { fileURLToPath } from "url";
 import User from "../models/User.js";
 import CalorieLog from "../models/CalorieLog.js";
 import MenuItem from "../models/MenuItem.js";
+import { callMlServer, invalidateMlSuggestions, recordMlProfileEvent } from "../utils/mlServer.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -39,7 +40,13 @@ router.get("/suggestions/:userId", async (req, res) => {
       const scriptPath = path.join(__dirname, "..", "..", "ml", "dashboard_recommender.py");
       const pythonPath = path.resolve(__dirname, "..", "..", "ml", "venv", "Scripts", "python.exe");
       
-      const mlSuggestions = await new Promise((resolve, reject) => {
+      // Prefer the warm recommendation server; spawn the script only if it is down
+      const mlSuggestions = await callMlServer("/dashboard", {
+        userId,
+        consumedCalories,
+        calorieGoal
+      }).catch((serverErr) => new Promise((resolve, reject) => {
+        console.error("⚠️ ML server unavailable, spawning script:", serverErr.message);
         execFile(pythonPath, [scriptPath, userId, consumedCalories.toString(), calorieGoal.toString()], 
           (err, stdout, stderr) => {
             if (err) {
@@ -54,7 +61,7 @@ router.get("/suggestions/:userId", async (req, res) => {
             }
           }
         );
-      });
+      }));
       
       suggestions = mlSuggestions;
       
@@ -142,13 +149,17 @@ router.post("/add-suggestion", async (req, res) => {
       return res.status(400).json({ error: "Missing required fields" });
     }
     
-    await CalorieLog.create({
+    const log = await CalorieLog.create({
       userId,
       dish: `${dish} (${restaurant})`,
       calories: parseInt(calories),
       mealType: mealType || "snack",
-      date: new Date()
+      date: new Date(),
+      source: "suggestion",
+      suggestedDish: dish
     });
+    invalidateMlSuggestions(userId);
+    recordMlProfileEvent(userId, { dish, eventId: String(log._id) });
     
     res.json({ message: "Suggestion added to meals successfully" });
     
@@ -1,5 +1,6 @@
 import express from "express";
 import User from "../models/User.js";
+import { invalidateMlSuggestions } from "../utils/mlServer.js";
 
 const router = express.Router();
 
@@ -11,6 +12,7 @@ router.put("/:id", async (req, res) => {
       req.body,
       { new: true }
     );
+    invalidateMlSuggestions(req.params.id);
 
     res.json(user);
   } catch (err) {
@@ -1,5 +1,6 @@
 import express from "express";
 import Review from "../models/Review.js";
+import { recordMlProfileEvent } from "../utils/mlServer.js";
 
 const router = express.Router();
 
@@ -14,6 +15,12 @@ router.post("/", async (req, res) => {
     ...req.body,
     sentiment
   });
+  if (review.userId) {
+    recordMlProfileEvent(review.userId, {
+      restaurantId: String(review.restaurantId),
+      eventId: String(review._id)
+    });
+  }
 
   res.json(review);
 });
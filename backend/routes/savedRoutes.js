@@ -1,10 +1,14 @@
 import express from "express";
 import SavedRecommendation from "../models/SavedRecommendation.js";
+import { recordMlProfileEvent } from "../utils/mlServer.js";
 
 const router = express.Router();
 
 router.post("/save", async (req, res) => {
-  await SavedRecommendation.create(req.body);
+  const saved = await SavedRecommendation.create(req.body);
+  if (saved.dish) {
+    recordMlProfileEvent(saved.userId, { dish: saved.dish, eventId: String(saved._id) });
+  }
   res.json({ message: "Recommendation saved" });
 });
 
@@ -1,5 +1,6 @@
 import express from "express";
 import CalorieLog from "../models/CalorieLog.js";
+import { invalidateMlSuggestions } from "../utils/mlServer.js";
 
 const router = express.Router();
 
@@ -13,6 +14,7 @@ router.post("/add", async (req, res) => {
     mealType: mealType || "snack",
     date: new Date()
   });
+  invalidateMlSuggestions(userId);
 
   res.json({ message: "Calories added" });
 });
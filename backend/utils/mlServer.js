@@ -0,0 +1,32 @@
+// Client for the persistent Python recommendation server (ml/recommendation_server.py).
+// Callers fall back to spawning the Python scripts when the server is not running.
+const ML_SERVER_URL = process.env.ML_SERVER_URL || "http://127.0.0.1:8765";
+const ML_SERVER_TIMEOUT_MS = parseInt(process.env.ML_SERVER_TIMEOUT_MS || "5000");
+
+export async function callMlServer(route, payload) {
+  const response = await fetch(`${ML_SERVER_URL}${route}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+    signal: AbortSignal.timeout(ML_SERVER_TIMEOUT_MS)
+  });
+
+  if (!response.ok) {
+    throw new Error(`ML server ${route} responded with ${response.status}`);
+  }
+  return response.json();
+}
+
+// Drop the server's cached dashboard suggestions for a user after their
+// meals or profile change. Fire-and-forget: a stopped server has no cache.
+export function invalidateMlSuggestions(userId) {
+  callMlServer("/invalidate", { userId: String(userId) }).catch(() => {});
+}
+
+// Fold a new review ({ restaurantId }) or an accepted/saved dish ({ dish })
+// into the user's profile embedding. eventId is the _id of the stored review,
+// saved recommendation or calorie log, so the server can tell whether a full
+// rebuild already counted it. Fire-and-forget like invalidation.
+export function recordMlProfileEvent(userId, event) {
+  callMlServer("/profile-event", { userId: String(userId), ...event }).catch(() => {});
+}
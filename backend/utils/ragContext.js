@@ -1,11 +1,19 @@
 import { execFile } from "child_process";
 import path from "path";
 import { fileURLToPath } from "url";
+import { callMlServer } from "./mlServer.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
-export function getRagContext(query) {
+export async function getRagContext(query) {
+  try {
+    const { context } = await callMlServer("/rag-context", { query });
+    return context.trim();
+  } catch (serverErr) {
+    console.error("⚠️ ML server unavailable, spawning RAG script:", serverErr.message);
+  }
+
   return new Promise((resolve, reject) => {
     // 🔥 ABSOLUTE path to ml/rag_runner.py
     const scriptPath = path.join(__dirname, "..", "..", "ml", "rag_runner.py");
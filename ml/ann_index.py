@@ -0,0 +1,200 @@
+import os
+import threading
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+import artifact_store
+from topk import top_k_indices
+
+# --------------------------------------------------
+# Dense LSA vectors + IVF approximate nearest neighbours
+#
+# The menu TF-IDF matrix is reduced with TruncatedSVD to float32 vectors
+# (L2-normalized, so inner product = cosine). A coarse k-means quantizer
+# splits them into inverted lists stored contiguously; a query scores
+# the centroids, then only the `nprobe` closest lists. nprobe is the
+# recall/latency knob: cost grows with nprobe · n / nlist, not with n.
+# The best k · RERANK_FACTOR dense hits can be re-scored exactly against
+# the sparse TF-IDF rows, which recovers most of what LSA loses.
+# Incremental index versions carry the ANN forward: changed rows are
+# projected with the frozen components and appended to their nearest list.
+# --------------------------------------------------
+ANN_DIR = os.path.join(artifact_store.ARTIFACTS_DIR, "menu_ann")
+
+# Menu indexes with at least this many dishes get (and are served from) an ANN
+ANN_MIN_ITEMS = int(os.getenv("ML_ANN_MIN_ITEMS", "50000"))
+
+N_COMPONENTS = int(os.getenv("ML_ANN_COMPONENTS", "128"))
+NPROBE = int(os.getenv("ML_ANN_NPROBE", "16"))
+RERANK_FACTOR = int(os.getenv("ML_ANN_RERANK_FACTOR", "50"))
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK = 65_536
+
+
+def _normalize(V):
+    norms = np.linalg.norm(V, axis=-1, keepdims=True)
+    return (V / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+def default_nlist(n_items):
+    return int(np.clip(4 * np.sqrt(n_items), 1, n_items))
+
+
+def fit_lsa(X, n_components=N_COMPONENTS, seed=0):
+    """(components (d × vocab) float32, normalized item vectors (n × d) float32)"""
+    n_components = max(1, min(n_components, X.shape[1] - 1, X.shape[0] - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=seed)
+    vectors = svd.fit_transform(X)
+    return svd.components_.astype(np.float32), _normalize(vectors)
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid (max inner product) per row, in chunks"""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        labels[start:start + ASSIGN_CHUNK] = np.argmax(
+            vectors[start:start + ASSIGN_CHUNK] @ centroids.T, axis=1
+        )
+    return labels
+
+
+def train_quantizer(vectors, nlist, seed=0, iterations=KMEANS_ITERATIONS):
+    """Spherical k-means on a sample of the vectors -> (nlist × d) centroids"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=nlist) == 0
+        # Re-seed empty lists with random sample points
+        sums[empty] = sample[rng.choice(sample_size, empty.sum())]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, components, centroids, vectors, item_rows, offsets, manifest=None):
+        self.components = components  # (d, vocab): projects TF-IDF rows
+        self.centroids = centroids    # (nlist, d)
+        self.vectors = vectors        # (n, d), grouped by list
+        self.item_rows = item_rows    # position in `vectors` -> original row
+        self.offsets = offsets        # list l spans vectors[offsets[l]:offsets[l + 1]]
+        self.manifest = manifest or {}
+
+    @classmethod
+    def build(cls, X, n_components=N_COMPONENTS, nlist=None, seed=0):
+        components, vectors = fit_lsa(X, n_components, seed)
+        nlist = nlist or default_nlist(len(vectors))
+        centroids = train_quantizer(vectors, nlist, seed)
+        labels = _assign(vectors, centroids)
+
+        item_rows = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+        return cls(components, centroids, vectors[item_rows], item_rows, offsets)
+
+    def __len__(self):
+        return len(self.item_rows)
+
+    def updated(self, keep, X_new):
+        """IVF for an index that keeps rows[keep] (in order) and appends X_new's rows"""
+        new_row = np.cumsum(keep) - 1
+        labels = np.repeat(np.arange(len(self.centroids)), np.diff(self.offsets))
+        kept = np.asarray(keep)[self.item_rows]
+
+        vectors = self.embed(X_new)
+        rows = np.concatenate([new_row[np.asarray(self.item_rows)[kept]],
+                               int(np.sum(keep)) + np.arange(len(vectors))])
+        labels = np.concatenate([labels[kept], _assign(vectors, np.asarray(self.centroids))])
+        vectors = np.concatenate([np.asarray(self.vectors)[kept], vectors])
+
+        order = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(self.centroids)))])
+        return IVFIndex(np.asarray(self.components), np.asarray(self.centroids),
+                        vectors[order], rows[order], offsets)
+
+    def embed(self, Q):
+        """Project TF-IDF query rows (sparse) into the normalized LSA space"""
+        return _normalize(np.asarray(Q @ self.components.T, dtype=np.float32))
+
+    def search(self, q, k, nprobe=NPROBE, X=None, rerank_factor=RERANK_FACTOR):
+        """(original rows, scores) of the approximate top-k for one TF-IDF query row.
+
+        With X (the normalized TF-IDF matrix) the best k · rerank_factor
+        dense candidates are re-scored with exact sparse cosine.
+        """
+        qd = self.embed(q)[0]
+        nprobe = min(nprobe, len(self.centroids))
+        lists = top_k_indices(self.centroids @ qd, nprobe)
+
+        positions = np.concatenate([
+            np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists
+        ])
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        scores = self.vectors[positions] @ qd
+        if X is None:
+            best = top_k_indices(scores, k)
+            return np.asarray(self.item_rows)[positions[best]], scores[best]
+
+        rows = np.asarray(self.item_rows)[positions[top_k_indices(scores, k * rerank_factor)]]
+        exact = np.asarray((X[rows] @ q.T).todense()).ravel()
+        best = top_k_indices(exact, k)
+        return rows[best], exact[best]
+
+
+# --------------------------------------------------
+# Persistence: one ANN version per menu index version
+# --------------------------------------------------
+def save_ann(ann, index_version):
+    ann.manifest = {
+        "index_version": index_version,
+        "n_items": len(ann),
+        "nlist": len(ann.centroids),
+        "n_components": ann.components.shape[0]
+    }
+
+    def write(tmp_dir):
+        for name in ("components", "centroids", "vectors", "item_rows", "offsets"):
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(ann, name))
+        artifact_store.save_json(tmp_dir, "manifest.json", ann.manifest)
+
+    artifact_store.publish(ANN_DIR, index_version, write)
+    return index_version
+
+
+_cache = {"key": None, "ann": None}
+_lock = threading.Lock()
+
+
+def _load_version(version):
+    version_dir = os.path.join(ANN_DIR, version)
+    if not os.path.exists(os.path.join(version_dir, "manifest.json")):
+        return None
+    ann = IVFIndex(
+        *(artifact_store.load_array(version_dir, name)
+          for name in ("components", "centroids", "vectors", "item_rows", "offsets")),
+        artifact_store.load_json(version_dir, "manifest.json")
+    )
+    artifact_store.hold(ANN_DIR, version)
+    return ann
+
+
+def load_ann(index_version):
+    """Memory-mapped ANN for this index version, or None if it was not built.
+
+    Versions are looked up by name, so an ANN published just before its
+    index version is already visible when readers switch to that index.
+    """
+    key = (index_version, artifact_store.current_stamp(ANN_DIR))
+    with _lock:
+        if _cache["key"] != key:
+            ann = _cache["ann"]
+            if ann is None or ann.manifest.get("index_version") != index_version:
+                ann = _load_version(index_version)
+            _cache["ann"] = ann
+            _cache["key"] = key
+        return _cache["ann"]
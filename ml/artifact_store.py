@@ -0,0 +1,173 @@
+import os
+import json
+import shutil
+import numpy as np
+from scipy import sparse
+
+# --------------------------------------------------
+# Versioned on-disk artifacts
+#
+#   <store_dir>/CURRENT          -> active version name
+#   <store_dir>/<version>/*.npy  -> arrays, loaded with mmap_mode="r"
+#
+# Every version is written to a temp dir and published by an atomic
+# rename + CURRENT swap, so readers never observe a partial write.
+# Memory-mapped files share one physical copy across worker processes.
+#
+# After each swap, versions beyond the newest KEEP_VERSIONS are deleted,
+# except CURRENT and versions a live reader process holds a lease on:
+#   <store_dir>/.leases/<version>.<pid>   (written by hold())
+# --------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.getenv("ML_ARTIFACTS_DIR", os.path.join(BASE_DIR, "artifacts"))
+KEEP_VERSIONS = max(2, int(os.getenv("ML_ARTIFACT_KEEP_VERSIONS", "3")))
+LEASES = ".leases"
+
+_held = {}  # store_dir -> version this process has a lease on
+
+
+def current_version(store_dir):
+    try:
+        with open(os.path.join(store_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_stamp(store_dir):
+    """Cheap change detector for CURRENT (mtime + size), None if missing"""
+    try:
+        st = os.stat(os.path.join(store_dir, "CURRENT"))
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def publish(store_dir, version, write_fn):
+    """Write a version via write_fn(tmp_dir) and make it CURRENT"""
+    version_dir = os.path.join(store_dir, version)
+    tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    try:
+        write_fn(tmp_dir)
+        if os.path.isdir(version_dir):
+            # Same content already persisted by another run
+            shutil.rmtree(tmp_dir)
+        else:
+            os.replace(tmp_dir, version_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    current_path = os.path.join(store_dir, "CURRENT")
+    tmp_current = f"{current_path}.tmp-{os.getpid()}"
+    with open(tmp_current, "w") as f:
+        f.write(version)
+    os.replace(tmp_current, current_path)
+    prune(store_dir)
+
+
+# --------------------------------------------------
+# Reader leases and pruning of old versions
+# --------------------------------------------------
+def hold(store_dir, version):
+    """Mark version as mapped by this process (and release the one held before)"""
+    previous = _held.get(store_dir)
+    if previous == version:
+        return
+    lease_dir = os.path.join(store_dir, LEASES)
+    os.makedirs(lease_dir, exist_ok=True)
+    open(os.path.join(lease_dir, f"{version}.{os.getpid()}"), "w").close()
+    _held[store_dir] = version
+    if previous is not None:
+        try:
+            os.remove(os.path.join(lease_dir, f"{previous}.{os.getpid()}"))
+        except FileNotFoundError:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def leased_versions(store_dir):
+    """Versions held by live processes; leases of dead processes are removed"""
+    lease_dir = os.path.join(store_dir, LEASES)
+    try:
+        names = os.listdir(lease_dir)
+    except FileNotFoundError:
+        return set()
+    leased = set()
+    for name in names:
+        version, _, pid = name.rpartition(".")
+        if not pid.isdigit():
+            continue
+        if _pid_alive(int(pid)):
+            leased.add(version)
+        else:
+            try:
+                os.remove(os.path.join(lease_dir, name))
+            except FileNotFoundError:
+                pass
+    return leased
+
+
+def prune(store_dir, keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions; CURRENT and leased versions stay"""
+    versions = []
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.startswith(".") or ".tmp-" in name or not os.path.isdir(path):
+            continue
+        versions.append((os.stat(path).st_mtime_ns, name))
+    if len(versions) <= keep:
+        return []
+
+    protected = leased_versions(store_dir) | {current_version(store_dir)}
+    removed = []
+    for _, name in sorted(versions, reverse=True)[keep:]:
+        if name not in protected:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def save_json(directory, name, payload):
+    with open(os.path.join(directory, name), "w") as f:
+        json.dump(payload, f)
+
+
+def load_json(directory, name):
+    with open(os.path.join(directory, name)) as f:
+        return json.load(f)
+
+
+def load_array(directory, name):
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+
+def save_csr(directory, matrix, prefix=""):
+    matrix = matrix.tocsr()
+    np.save(os.path.join(directory, f"{prefix}data.npy"), matrix.data.astype(np.float32))
+    np.save(os.path.join(directory, f"{prefix}indices.npy"), matrix.indices)
+    np.save(os.path.join(directory, f"{prefix}indptr.npy"), matrix.indptr)
+    return list(matrix.shape)
+
+
+def load_csr(directory, shape, prefix=""):
+    return sparse.csr_matrix(
+        (
+            load_array(directory, f"{prefix}data"),
+            load_array(directory, f"{prefix}indices"),
+            load_array(directory, f"{prefix}indptr"),
+        ),
+        shape=tuple(shape),
+        copy=False
+    )
@@ -0,0 +1,154 @@
+import os
+import asyncio
+import threading
+
+from mongo_client import DB_NAME  # also loads backend/.env
+from instrumentation import bind, count, current_trace
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.9: fall back to Motor
+    from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+
+# --------------------------------------------------
+# Async data access for the ML modules
+#
+# One event loop runs on a daemon thread and owns one pooled async
+# client per process. Synchronous callers (scripts, server threads)
+# hand it coroutines via run()/submit()/fetch_many(), so independent
+# reads go out concurrently and a request costs roughly its slowest
+# query.
+# --------------------------------------------------
+_loop = None
+_client = None
+_db_override = None
+_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ml-async-db", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """Start a coroutine on the shared loop; returns a concurrent.futures.Future"""
+    # The caller's sampled trace follows the coroutine onto the loop thread
+    return asyncio.run_coroutine_threadsafe(bind(coro, current_trace()), _get_loop())
+
+
+def run(coro):
+    """Run a coroutine on the shared loop and block until it finishes"""
+    return submit(coro).result()
+
+
+async def _create_client():
+    return AsyncMongoClient(
+        os.getenv("MONGO_URI"),
+        maxPoolSize=int(os.getenv("ML_MONGO_POOL_SIZE", "20"))
+    )
+
+
+def get_async_client():
+    """Process-wide async client, created on (and bound to) the shared loop"""
+    global _client
+    if _client is None:
+        client = run(_create_client())
+        with _lock:
+            if _client is None:
+                _client = client
+    return _client
+
+
+def get_async_db():
+    if _db_override is not None:
+        return _db_override
+    return get_async_client()[DB_NAME]
+
+
+def set_async_db(adb):
+    """Serve get_async_db() from adb (e.g. SyncDatabaseAdapter(mongomock_db))"""
+    global _db_override
+    _db_override = adb
+
+
+# --------------------------------------------------
+# Sync stand-ins (mongomock) behind the async interface; each call
+# runs in a worker thread, serialized by one lock per database because
+# mongomock collections are not thread-safe
+# --------------------------------------------------
+def _locked(lock, fn, *args, **kwargs):
+    with lock:
+        return fn(*args, **kwargs)
+
+
+class _AsyncCursorAdapter:
+    def __init__(self, cursor, lock):
+        self._cursor = cursor
+        self._lock = lock
+
+    async def to_list(self, length=None):
+        docs = await asyncio.to_thread(_locked, self._lock, list, self._cursor)
+        return docs if length is None else docs[:length]
+
+    async def _iterate(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class _AsyncCollectionAdapter:
+    def __init__(self, collection, lock):
+        self._collection = collection
+        self._lock = lock
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursorAdapter(self._collection.find(*args, **kwargs), self._lock)
+
+    async def find_one(self, *args, **kwargs):
+        return await asyncio.to_thread(_locked, self._lock, self._collection.find_one, *args, **kwargs)
+
+
+class SyncDatabaseAdapter:
+    """Async-looking view of a synchronous pymongo-compatible database"""
+
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return _AsyncCollectionAdapter(self._db[name], self._lock)
+
+    async def command(self, *args, **kwargs):
+        return await asyncio.to_thread(_locked, self._lock, self._db.command, *args, **kwargs)
+
+
+async def find_all(collection, query=None, projection=None, limit=0):
+    count("db.round_trips")
+    return await collection.find(query or {}, projection, limit=limit).to_list(None)
+
+
+async def find_one(collection, query=None, projection=None):
+    count("db.round_trips")
+    return await collection.find_one(query or {}, projection)
+
+
+async def gather_dict(**coros):
+    results = await asyncio.gather(*coros.values())
+    return dict(zip(coros, results))
+
+
+def fetch_many(**coros):
+    """Await independent queries concurrently: fetch_many(a=find_all(...), ...) -> {a: ...}"""
+    return run(gather_dict(**coros))
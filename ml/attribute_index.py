@@ -0,0 +1,134 @@
+import threading
+import numpy as np
+
+# --------------------------------------------------
+# Attribute indexes over the menu index metadata columns
+#
+# Structured filters for retrieval, e.g.
+#   {"veg": True, "spice": [0, 2], "price": [None, 200],
+#    "city": "Coimbatore", "maxCalories": 500}
+# Flags and cities are packed bitmaps (one bit per menu row); numeric
+# ranges are a searchsorted slice of the column's argsort. Filters are
+# ANDed as bitmaps and return the matching rows, so scoring only
+# touches that subset. Rows missing a filtered attribute never match.
+# Built once per index version on first use.
+# --------------------------------------------------
+RANGE_FILTERS = {"spice": "spice", "price": "price", "calories": "calories"}
+
+
+def _pack(mask):
+    return np.packbits(mask)
+
+
+def _range(value):
+    """(low, high) from [low, high] / (low, high) / a single number; None is open"""
+    if isinstance(value, (list, tuple)):
+        low, high = (list(value) + [None, None])[:2]
+    else:
+        low = high = value
+    return (None if low is None else float(low)), (None if high is None else float(high))
+
+
+def normalize_filters(filters):
+    """Canonical, hashable form of a filter dict (also the query cache key part)"""
+    if not filters:
+        return ()
+    canonical = []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name == "veg":
+            canonical.append((name, bool(value)))
+        elif name == "city":
+            cities = [value] if isinstance(value, str) else value
+            canonical.append((name, tuple(sorted({str(c).strip().lower() for c in cities}))))
+        elif name == "maxCalories":
+            canonical.append(("calories", (None, float(value))))
+        elif name in RANGE_FILTERS:
+            low, high = _range(value)
+            if low is not None or high is not None:
+                canonical.append((name, (low, high)))
+        else:
+            raise ValueError(f"Unknown filter: {name}")
+    # maxCalories and an explicit calories range: keep the tighter cap
+    merged = {}
+    for name, value in canonical:
+        if name == "calories" and name in merged:
+            low = max((v for v in (merged[name][0], value[0]) if v is not None), default=None)
+            high = min((v for v in (merged[name][1], value[1]) if v is not None), default=None)
+            value = (low, high)
+        merged[name] = value
+    return tuple(sorted(merged.items()))
+
+
+class AttributeIndex:
+    def __init__(self, columns):
+        self.n = len(columns["item_id"])
+
+        is_veg = np.asarray(columns["isVeg"])
+        self.veg = {True: _pack(is_veg == 1), False: _pack(is_veg == 0)}
+
+        city = np.char.lower(np.char.strip(np.asarray(columns["city"]).astype(str)))
+        names, codes = np.unique(city, return_inverse=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        self._city_rows = {
+            name: order[bounds[i]:bounds[i + 1]] for i, name in enumerate(names.tolist()) if name
+        }
+
+        # Sorted columns for ranges; NaN (missing) sorts last and is cut off
+        self._sorted = {}
+        for name, column in RANGE_FILTERS.items():
+            values = np.asarray(columns[column], dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            present = int((~np.isnan(values)).sum())
+            self._sorted[name] = (values[order[:present]], order[:present])
+
+    @property
+    def cities(self):
+        return list(self._city_rows)
+
+    def _rows_bitmap(self, rows):
+        mask = np.zeros(self.n, dtype=bool)
+        mask[rows] = True
+        return _pack(mask)
+
+    def range_rows(self, name, low, high):
+        values, order = self._sorted[name]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        end = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return order[start:end]
+
+    def bitmaps(self, filters):
+        """One packed bitmap per (canonical) filter"""
+        for name, value in filters:
+            if name == "veg":
+                yield self.veg[value]
+            elif name == "city":
+                rows = [self._city_rows[c] for c in value if c in self._city_rows]
+                yield self._rows_bitmap(np.concatenate(rows) if rows else np.empty(0, dtype=np.int64))
+            else:
+                yield self._rows_bitmap(self.range_rows(name, *value))
+
+    def select(self, filters):
+        """Sorted rows matching every filter; None when there are no filters"""
+        filters = normalize_filters(filters) if isinstance(filters, dict) else filters
+        if not filters:
+            return None
+        combined = None
+        for bitmap in self.bitmaps(filters):
+            combined = bitmap if combined is None else np.bitwise_and(combined, bitmap)
+        return np.flatnonzero(np.unpackbits(combined, count=self.n))
+
+
+_cache = {"version": None, "index": None}
+_lock = threading.Lock()
+
+
+def get_attribute_index(index):
+    """Attribute index for this menu index version (built on first use)"""
+    with _lock:
+        if _cache["version"] != index.version:
+            _cache["index"] = AttributeIndex(index.columns)
+            _cache["version"] = index.version
+        return _cache["index"]
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from mongo_client import get_db
+from async_db import get_async_db, run, find_all
+from feature_store import get_feature_store
+from restaurant_cache import restaurant_cache
+from diversity import name_vectors
+from similarity import row_similarity
+from dashboard_recommender import (
+    MENU_PROJECTION, MEAL_TYPE_FOODS, build_candidate_rows, build_user_context,
+    has_non_veg, suggest_meal_type, score_candidates
+)
+from instrumentation import trace, span, count
+import suggestion_cache
+
+# --------------------------------------------------
+# Dashboard suggestions for many users at once
+#
+# Input: JSON lines {"userId", "consumedCalories", "calorieGoal"} (or
+# [userId, consumed, goal]). Users are read in chunks; each chunk
+# fetches every profile and today's calorie logs in two queries. The
+# candidate pool (menu items, restaurants, TF-IDF rows, name vectors)
+# is built once per suggested meal type for the whole run. Users whose
+# calorie budget keeps the same candidates share one content-similarity
+# pass, and identical (candidates, conditions, budget) share the ranking.
+# Output: one JSON line per input user, in input order, written as each
+# chunk finishes. Results match get_dashboard_recommendations().
+# --------------------------------------------------
+CHUNK_USERS = int(os.getenv("ML_BATCH_DASHBOARD_CHUNK", "1000"))
+BACKFILL_LIMIT = 10  # non-veg items the single-user path adds when a meal type has none
+
+
+def parse_request(obj):
+    """(user_id, consumed, goal) from a JSON object or [userId, consumed, goal]"""
+    if isinstance(obj, (list, tuple)):
+        user_id, consumed, goal = obj
+    else:
+        user_id = obj.get("userId")
+        consumed = obj.get("consumedCalories", 0)
+        goal = obj.get("calorieGoal", 2000)
+    return (user_id if user_id not in (None, "null") else None), int(consumed), int(goal)
+
+
+async def fetch_user_contexts(adb, user_ids):
+    """Profiles and today's meal types for many users in two queries"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+
+    users, meals = await asyncio.gather(
+        find_all(adb.users, {"_id": {"$in": [u for u in user_ids if u]}}, {"preferences": 1, "health": 1}),
+        find_all(adb.calorielogs, {
+            "userId": {"$in": user_ids},
+            "date": {"$gte": today, "$lt": tomorrow}
+        }, {"userId": 1, "mealType": 1})
+    )
+    by_id = {u["_id"]: u for u in users}
+    meals_by_user = {}
+    for meal in meals:
+        meals_by_user.setdefault(meal.get("userId"), []).append(meal)
+    return {u: build_user_context(by_id.get(u) if u else None, meals_by_user.get(u, [])) for u in user_ids}
+
+
+def load_contexts(adb, user_ids):
+    """Per-user contexts, from the shared per-day cache where possible"""
+    from datetime import date
+    today = date.today()
+
+    contexts = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        context = suggestion_cache.user_contexts.get((user_id, today))
+        if context is not None:
+            contexts[user_id] = context
+        else:
+            missing.append(user_id)
+
+    if missing:
+        with span("dashboard_batch.fetch_contexts"):
+            fetched = run(fetch_user_contexts(adb, missing))
+        for user_id, context in fetched.items():
+            suggestion_cache.user_contexts.put((user_id, today), context)
+        contexts.update(fetched)
+    return contexts
+
+
+def _calories_at_most(item, limit):
+    calories = item.get("calories")
+    return isinstance(calories, (int, float)) and calories <= limit
+
+
+class CandidatePool:
+    """One meal type's candidates (meal items, then every non-veg item) with shared vectors"""
+
+    def __init__(self, menu_items, non_veg_items, restaurants):
+        meal_rows = build_candidate_rows(menu_items, restaurants)
+        self.n_meal = len(meal_rows)
+        self.needs_backfill = not any(r["isVeg"] == False for r in meal_rows)  # noqa: E712
+
+        # Backfill items keep their query order; -1 where the restaurant is missing
+        self.non_veg_items = non_veg_items
+        backfill_rows = []
+        self.backfill_rows = np.full(len(non_veg_items), -1, dtype=np.int64)
+        for i, item in enumerate(non_veg_items):
+            rows = build_candidate_rows([item], restaurants)
+            if rows:
+                self.backfill_rows[i] = self.n_meal + len(backfill_rows)
+                backfill_rows.extend(rows)
+
+        self.df = pd.DataFrame(meal_rows + backfill_rows)
+        if self.df.empty:
+            return
+        self.calories = self.df["calories"].to_numpy()
+        features = get_feature_store(get_db())
+        self.tfidf = features.vectors_for(self.df["item_id"].tolist(), self.df["text"].tolist())
+        self.names = name_vectors(self.df["name"])
+
+    def rows_for(self, remaining_calories):
+        """Pool rows the single-user path would score for this budget"""
+        if self.df.empty:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(self.n_meal)
+        if self.needs_backfill:
+            matches = [i for i, item in enumerate(self.non_veg_items)
+                       if _calories_at_most(item, remaining_calories + 200)][:BACKFILL_LIMIT]
+            backfill = self.backfill_rows[matches]
+            rows = np.concatenate([rows, backfill[backfill >= 0]])
+        return rows[self.calories[rows] <= remaining_calories + 100]
+
+
+async def fetch_pool_items(adb, meal_type):
+    """Meal-type menu items, every non-veg item when they need a backfill, and restaurants"""
+    meal_keywords = MEAL_TYPE_FOODS.get(meal_type, [])
+    meal_pattern = "|".join(meal_keywords) if meal_keywords else ".*"
+    menu_items = await find_all(adb.menuitems, {"name": {"$regex": meal_pattern, "$options": "i"}}, MENU_PROJECTION)
+    if len(menu_items) < 5:
+        menu_items = await find_all(adb.menuitems, {}, MENU_PROJECTION)
+    restaurants = await restaurant_cache.get_many_async(adb, [item["restaurantId"] for item in menu_items])
+
+    non_veg_items = []
+    if not has_non_veg(menu_items, restaurants):
+        # The single-user backfill depends on the budget: cut it per user from all of them
+        non_veg_items = await find_all(adb.menuitems, {"isVeg": False}, MENU_PROJECTION)
+        restaurants.update(await restaurant_cache.get_many_async(
+            adb, [item["restaurantId"] for item in non_veg_items]
+        ))
+    return menu_items, non_veg_items, restaurants
+
+
+class GroupRanker:
+    """Candidate pools per meal type (whole run) and shared rankings (per chunk)"""
+
+    def __init__(self, adb):
+        self.adb = adb
+        self.pools = {}
+        self.candidates = {}
+        self.results = {}
+
+    def pool(self, meal_type):
+        pool = self.pools.get(meal_type)
+        if pool is None:
+            with span("dashboard_batch.fetch_candidates"):
+                items = run(fetch_pool_items(self.adb, meal_type))
+            with span("dashboard_batch.candidate_vectors"):
+                pool = self.pools[meal_type] = CandidatePool(*items)
+            count("dashboard_batch.pools")
+        return pool
+
+    def candidates_for(self, meal_type, rows):
+        """(df, tfidf, content similarity, name vectors) for one candidate set"""
+        key = (meal_type, rows.tobytes())
+        found = self.candidates.get(key)
+        if found is None:
+            pool = self.pool(meal_type)
+            tfidf = pool.tfidf[rows]
+            found = self.candidates[key] = (
+                pool.df.iloc[rows].reset_index(drop=True),
+                tfidf,
+                row_similarity(tfidf, 0, normalized=True),
+                pool.names[rows]
+            )
+            count("dashboard_batch.groups")
+        return found
+
+    def rank(self, context, meal_type, remaining_calories):
+        rows = self.pool(meal_type).rows_for(remaining_calories)
+        if len(rows) == 0:
+            return []
+        key = (meal_type, rows.tobytes(), tuple(context["conditions"]), remaining_calories)
+        result = self.results.get(key)
+        if result is None:
+            df, tfidf, content_sim, names = self.candidates_for(meal_type, rows)
+            count("dashboard.items_scored", len(df))
+            result = self.results[key] = score_candidates(
+                df, tfidf, content_sim, names, context["conditions"], remaining_calories, meal_type
+            )
+        return result
+
+    def end_chunk(self):
+        self.candidates.clear()
+        self.results.clear()
+
+
+def rank_chunk(ranker, requests, hour):
+    """Suggestions for one chunk of (user_id, consumed, goal), in input order"""
+    contexts = load_contexts(ranker.adb, [user_id for user_id, _, _ in requests])
+
+    # Group by suggested meal type so each pool is scored together
+    by_meal_type = {}
+    for i, (user_id, consumed, goal) in enumerate(requests):
+        meal_type = suggest_meal_type(contexts[user_id]["meal_types_logged"], hour)
+        by_meal_type.setdefault(meal_type, []).append(i)
+
+    results = [None] * len(requests)
+    with span("dashboard_batch.rank"):
+        for meal_type, indices in by_meal_type.items():
+            for i in indices:
+                user_id, consumed, goal = requests[i]
+                remaining_calories = goal - consumed
+                key = suggestion_cache.suggestion_key(user_id, meal_type, remaining_calories)
+                cached = suggestion_cache.suggestions.get(key)
+                if cached is not None:
+                    count("dashboard.cache_hits")
+                    results[i] = cached
+                    continue
+                count("dashboard.cache_misses")
+                try:
+                    results[i] = ranker.rank(contexts[user_id], meal_type, remaining_calories)
+                    suggestion_cache.suggestions.put(key, results[i])
+                except Exception as e:
+                    count("dashboard.errors")
+                    print(f"Error in batch dashboard for {user_id}: {e}", file=sys.stderr)
+                    results[i] = []
+    ranker.end_chunk()
+    return results
+
+
+def iter_dashboard_batch(requests, adb=None, hour=None, chunk_users=CHUNK_USERS):
+    """Yield {"userId", "suggestions"} for each (user_id, consumed, goal), chunk by chunk"""
+    if adb is None:
+        adb = get_async_db()
+    ranker = GroupRanker(adb)
+
+    with trace("dashboard_batch", sample=True):
+        chunk = []
+        for request in requests:
+            chunk.append(request)
+            if len(chunk) >= chunk_users:
+                yield from _finish_chunk(ranker, chunk, hour)
+                chunk = []
+        if chunk:
+            yield from _finish_chunk(ranker, chunk, hour)
+
+
+def _finish_chunk(ranker, chunk, hour):
+    count("dashboard_batch.users", len(chunk))
+    results = rank_chunk(ranker, chunk, datetime.now().hour if hour is None else hour)
+    for (user_id, _, _), suggestions in zip(chunk, results):
+        yield {"userId": user_id, "suggestions": suggestions}
+
+
+def read_requests(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield parse_request(json.loads(line))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard suggestions for many users, as JSON lines")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL of {userId, consumedCalories, calorieGoal}; - for stdin")
+    parser.add_argument("--output", default="-", help="JSONL output path; - for stdout")
+    parser.add_argument("--hour", type=int, default=None, help="Hour used to pick the next meal type (default: now)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_USERS)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    written = 0
+    try:
+        for result in iter_dashboard_batch(read_requests(source), hour=args.hour, chunk_users=args.chunk):
+            sink.write(json.dumps(result, default=str) + "\n")
+            written += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"✅ Dashboard suggestions for {written} users in {time.perf_counter() - start:.2f}s", file=sys.stderr)
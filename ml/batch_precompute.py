@@ -0,0 +1,279 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from mongo_client import get_db
+from async_db import get_async_db, run, find_one
+from hybrid_recommender import load_hybrid_inputs
+from restaurant_cache import restaurant_cache
+from topk import normalize_rows, top_k_rows
+from instrumentation import traced, span, count
+
+# --------------------------------------------------
+# Nightly top-N precomputation for every user
+#
+# Per user: content = cosine between a profile vector (implicit-score
+# weighted sum of the TF-IDF rows of the restaurants they rated) and
+# every menu item; hybrid = HybridScorer.blend(content, cf); final =
+# 0.6 · hybrid + 0.4 · content, as in personalized_rerank.py. Users are
+# scored in chunks across a process pool and the top-N (with the item
+# fields the online filters need) are bulk-upserted into
+# db.recommendations under one model version. Online requests then only
+# filter that list by remaining calories and meal type.
+# --------------------------------------------------
+JOB_ID = "batch_precompute"
+TOP_N = int(os.getenv("ML_PRECOMPUTE_TOP_N", "50"))
+CHUNK_USERS = int(os.getenv("ML_PRECOMPUTE_CHUNK", "512"))
+MEMORY_BUDGET_MB = float(os.getenv("ML_PRECOMPUTE_MEMORY_MB", "256"))
+WORKERS = int(os.getenv("ML_PRECOMPUTE_WORKERS", str(os.cpu_count() or 2)))
+WRITE_BATCH = 1000
+
+HYBRID_WEIGHT = 0.6
+PROFILE_WEIGHT = 0.4
+CALORIE_BUFFER = 100  # same slack the dashboard allows over the remaining budget
+MAX_RESULTS = 6
+
+ITEM_PROJECTION = {"name": 1, "restaurantId": 1, "calories": 1, "isVeg": 1, "spicinessLevel": 1}
+
+_state = {}
+
+
+# --------------------------------------------------
+# Scoring (inside pool workers)
+# --------------------------------------------------
+def _init_worker(item_matrix, restaurant_profiles, user_item, scorer, top_n):
+    _state.update(
+        item_matrix=item_matrix,
+        restaurant_profiles=restaurant_profiles,
+        user_item=user_item,
+        scorer=scorer,
+        top_n=top_n
+    )
+
+
+def restaurant_profile_matrix(item_matrix, scorer, n_restaurants):
+    """(restaurants × vocab) sum of each CF restaurant's menu item TF-IDF rows"""
+    has_col = scorer.item_cf_columns >= 0
+    membership = sparse.csr_matrix(
+        (np.ones(has_col.sum()), (scorer.item_cf_columns[has_col], np.flatnonzero(has_col))),
+        shape=(n_restaurants, item_matrix.shape[0])
+    )
+    return (membership @ item_matrix).tocsr()
+
+
+def score_users(rows, item_matrix, restaurant_profiles, user_item, scorer, top_n):
+    """(top item indices, final scores) of shape (len(rows), top_n)"""
+    profiles = normalize_rows(user_item[rows] @ restaurant_profiles)
+    content = (profiles @ item_matrix.T).toarray()
+
+    hybrid = scorer.blend(content, scorer.cf_scores(user_item, rows))
+    return top_k_rows(HYBRID_WEIGHT * hybrid + PROFILE_WEIGHT * content, top_n)
+
+
+def score_chunk(rows):
+    top_idx, top_scores = score_users(rows, **_state)
+    return rows, top_idx, top_scores
+
+
+# --------------------------------------------------
+# Batch job
+# --------------------------------------------------
+def model_version(features, user_item, scorer, top_n):
+    digest = hashlib.sha1(features.version.encode("utf-8"))
+    for array in (user_item.indptr, user_item.indices, user_item.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr(sorted(scorer.weights.items())).encode("utf-8"))
+    digest.update(str(top_n).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def chunk_size(n_items, memory_budget_mb=MEMORY_BUDGET_MB):
+    # content, cf, blend and final: four dense (users × items) float64 blocks
+    per_user = max(n_items, 1) * 8 * 4
+    return max(1, min(CHUNK_USERS, int(memory_budget_mb * 1024 * 1024 // per_user)))
+
+
+def all_user_ids(db, cf_user_ids):
+    """CF users first (their matrix rows), then registered users without reviews"""
+    known = set(cf_user_ids.tolist())
+    extra = [str(u["_id"]) for u in db.users.find({}, {"_id": 1}) if str(u["_id"]) not in known]
+    return np.concatenate([cf_user_ids.astype(str), np.array(extra, dtype=str)]), len(extra)
+
+
+def _object_id(item_id):
+    return ObjectId(item_id) if ObjectId.is_valid(item_id) else item_id
+
+
+class ItemDetails:
+    """Menu fields of recommended items, fetched once per item across chunks"""
+
+    def __init__(self, db):
+        self.db = db
+        self._items = {}
+
+    def resolve(self, item_ids):
+        missing = [i for i in set(item_ids) if i not in self._items]
+        if missing:
+            count("db.round_trips")
+            docs = list(self.db.menuitems.find({"_id": {"$in": [_object_id(i) for i in missing]}}, ITEM_PROJECTION))
+            restaurants = restaurant_cache.get_many(self.db, [d["restaurantId"] for d in docs])
+            for d in docs:
+                restaurant = restaurants.get(d["restaurantId"]) or {}
+                self._items[str(d["_id"])] = {
+                    "itemId": str(d["_id"]),
+                    "dish": d.get("name"),
+                    "restaurant": restaurant.get("name", "Unknown"),
+                    "calories": int(d.get("calories", 200)),
+                    "spice": int(d.get("spicinessLevel", 2)),
+                    "isVeg": bool(d.get("isVeg", False))
+                }
+        return self._items
+
+
+def recommendation_updates(user_ids, rows, top_idx, top_scores, item_ids, details, version, generated_at):
+    items = details.resolve(item_ids[top_idx.ravel()].tolist())
+    for row, indices, scores in zip(rows, top_idx, top_scores):
+        recommended = [
+            dict(items[item_id], score=round(float(score), 4))
+            for item_id, score in zip(item_ids[indices].tolist(), scores)
+            if item_id in items
+        ]
+        yield UpdateOne(
+            {"_id": user_ids[row]},
+            {"$set": {
+                "userId": user_ids[row],
+                "modelVersion": version,
+                "generatedAt": generated_at,
+                "items": recommended
+            }},
+            upsert=True
+        )
+
+
+@traced(JOB_ID, sample=True)
+def precompute_all(db, workers=WORKERS, top_n=TOP_N):
+    """Score every user and upsert their top-N; returns (model version, users written)"""
+    with span("batch_precompute.load_inputs"):
+        features, scorer, user_item, cf_user_ids = load_hybrid_inputs(db)
+        user_ids, n_extra = all_user_ids(db, cf_user_ids)
+        if n_extra:
+            # Users without reviews: no CF signal, popularity only
+            user_item = sparse.vstack([user_item, sparse.csr_matrix((n_extra, user_item.shape[1]))]).tocsr()
+        restaurant_profiles = restaurant_profile_matrix(features.matrix, scorer, user_item.shape[1])
+
+    version = model_version(features, user_item, scorer, top_n)
+    generated_at = datetime.now(timezone.utc)
+    details = ItemDetails(db)
+    size = chunk_size(len(scorer.item_ids))
+    written = 0
+    pending = []
+
+    def flush():
+        nonlocal pending, written
+        if pending:
+            db.recommendations.bulk_write(pending, ordered=False)
+            written += len(pending)
+            pending = []
+
+    initargs = (features.matrix, restaurant_profiles, user_item, scorer, top_n)
+    with span("batch_precompute.score_and_write"), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        # Bounded window of chunks in flight so memory stays flat
+        in_flight = deque()
+
+        def drain_one():
+            rows, top_idx, top_scores = in_flight.popleft().result()
+            count("batch_precompute.users_scored", len(rows))
+            for update in recommendation_updates(user_ids, rows, top_idx, top_scores, scorer.item_ids,
+                                                 details, version, generated_at):
+                pending.append(update)
+                if len(pending) >= WRITE_BATCH:
+                    flush()
+
+        for start in range(0, len(user_ids), size):
+            in_flight.append(pool.submit(score_chunk, np.arange(start, min(start + size, len(user_ids)))))
+            if len(in_flight) >= workers * 2:
+                drain_one()
+        while in_flight:
+            drain_one()
+        flush()
+
+    # Only after every user was written: drop lists from older models
+    db.recommendations.delete_many({"modelVersion": {"$ne": version}})
+    db.ml_jobs.update_one(
+        {"_id": JOB_ID},
+        {"$set": {"modelVersion": version, "completedAt": datetime.now(timezone.utc), "users": written}},
+        upsert=True
+    )
+    return version, written
+
+
+# --------------------------------------------------
+# Online: real-time filters over the precomputed list
+# --------------------------------------------------
+def filter_recommendations(items, remaining_calories=None, meal_keywords=None, k=MAX_RESULTS):
+    """Items that fit the calorie budget, meal-type matches first"""
+    if remaining_calories is not None:
+        items = [i for i in items if i["calories"] <= remaining_calories + CALORIE_BUFFER]
+    if not meal_keywords:
+        return items[:k]
+
+    pattern = re.compile("|".join(map(re.escape, meal_keywords)), re.IGNORECASE)
+    matching = [i for i in items if pattern.search(i["dish"] or "")]
+    # Too few meal-type matches: backfill with the best remaining items
+    others = [i for i in items if not pattern.search(i["dish"] or "")]
+    return (matching + others)[:k]
+
+
+def get_precomputed_recommendations(user_id, remaining_calories=None, meal_type=None, k=MAX_RESULTS, adb=None):
+    from dashboard_recommender import MEAL_TYPE_FOODS
+
+    if adb is None:
+        adb = get_async_db()
+    doc = run(find_one(adb.recommendations, {"_id": str(user_id)}, {"items": 1, "modelVersion": 1}))
+    if doc is None:
+        count("precomputed.misses")
+        return None
+    count("precomputed.hits")
+
+    items = filter_recommendations(doc["items"], remaining_calories, MEAL_TYPE_FOODS.get(meal_type), k)
+    return [
+        {
+            "dish": i["dish"],
+            "restaurant": i["restaurant"],
+            "calories": i["calories"],
+            "spice": i["spice"],
+            "isVeg": i["isVeg"],
+            "final_score": i["score"],
+            "suggestedMealType": meal_type,
+            "modelVersion": doc["modelVersion"]
+        }
+        for i in items
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute hybrid + personalized top-N for every user")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        version, written = precompute_all(get_db(), args.workers, args.top_n)
+    except Exception as e:
+        print(f"Error in batch precompute: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Recommendations precomputed: version={version} users={written} "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,281 @@
+import string
+import numpy as np
+
+# --------------------------------------------------
+# Vectorized VADER compound scores for batches of reviews
+#
+# Reproduces nltk's SentimentIntensityAnalyzer.polarity_scores()["compound"]
+# without per-token Python rule evaluation:
+#   1. tokens are split and punctuation-stripped exactly like SentiText
+#      (a per-token cache, so each distinct token is analysed once) and
+#      laid out flat with per-document offsets;
+#   2. lexicon valence is gathered for every token at once from a
+#      per-token table;
+#   3. caps emphasis, boosters, negation ("not", "never so", "least"),
+#      idioms and "but" are applied with array ops over the lexicon hits,
+#      a fixed three steps back from each word;
+#   4. valences are summed per document in token order, then "!" / "?"
+#      emphasis and normalization are applied.
+# nltk quirks are kept for parity: a repeated token is scored in the
+# context of its first occurrence, and idiom / "never" checks are case
+# sensitive. Only the compound score is produced.
+# --------------------------------------------------
+_PUNCTUATION = set(string.punctuation)
+SO_THIS = {"so", "this"}
+AT_VERY = {"at", "very"}
+
+
+def _is_word(w):
+    return len(w) > 1 and not any(c in _PUNCTUATION for c in w)
+
+
+class BatchSentimentScorer:
+    def __init__(self, lexicon=None, constants=None):
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+        self.lexicon = lexicon if lexicon is not None else SentimentIntensityAnalyzer().lexicon
+        self.c = constants or VaderConstants()
+
+        self._raw_ids = {}   # raw whitespace token -> id of its SentiText form
+        self._ids = {}       # SentiText token -> id
+        self._columns = {name: [] for name in (
+            "lex", "in_lex", "upper", "booster", "is_booster", "negated",
+            "never", "so_this", "least", "at_very", "kind", "of", "but"
+        )}
+        self._arrays = None
+
+        # Idiom and multi-word booster tokens get ids up front so they can
+        # be matched as id sequences
+        self.idioms = []
+        for phrase, value in self.c.SPECIAL_CASE_IDIOMS.items():
+            self.idioms.append(([self._token_id(w) for w in phrase.split(" ")], float(value)))
+        self.booster_bigrams = [
+            [self._token_id(w) for w in phrase.split(" ")]
+            for phrase in self.c.BOOSTER_DICT if len(phrase.split(" ")) == 2
+        ]
+
+    # --------------------------------------------------
+    # Token table
+    # --------------------------------------------------
+    def _token_id(self, token):
+        token_id = self._ids.get(token)
+        if token_id is not None:
+            return token_id
+        token_id = self._ids[token] = len(self._ids)
+        lower = token.lower()
+        col = self._columns
+        col["lex"].append(self.lexicon.get(lower, 0.0))
+        col["in_lex"].append(lower in self.lexicon)
+        col["upper"].append(token.isupper())
+        col["booster"].append(self.c.BOOSTER_DICT.get(lower, 0.0))
+        col["is_booster"].append(lower in self.c.BOOSTER_DICT)
+        col["negated"].append(lower in self.c.NEGATE or "n't" in lower)
+        col["never"].append(token == "never")
+        col["so_this"].append(token in SO_THIS)
+        col["least"].append(lower == "least")
+        col["at_very"].append(lower in AT_VERY)
+        col["kind"].append(lower == "kind")
+        col["of"].append(lower == "of")
+        col["but"].append(lower == "but")
+        self._arrays = None
+        return token_id
+
+    def _raw_token_id(self, raw):
+        """SentiText strips one PUNC_LIST mark before or after a word"""
+        token = raw
+        for p in self.c.PUNC_LIST:
+            if raw.startswith(p) and _is_word(raw[len(p):]):
+                token = raw[len(p):]
+                break
+            if raw.endswith(p) and _is_word(raw[:-len(p)]):
+                token = raw[:-len(p)]
+                break
+        token_id = self._raw_ids[raw] = self._token_id(token)
+        return token_id
+
+    def _table(self):
+        if self._arrays is None:
+            self._arrays = {
+                name: np.asarray(values, dtype=np.float64 if name in ("lex", "booster") else bool)
+                for name, values in self._columns.items()
+            }
+        return self._arrays
+
+    def tokenize(self, texts):
+        """(flat token ids, per-document offsets)"""
+        raw_ids = self._raw_ids
+        ids = []
+        offsets = [0]
+        for text in texts:
+            for raw in text.split():
+                if len(raw) > 1:
+                    token_id = raw_ids.get(raw)
+                    ids.append(token_id if token_id is not None else self._raw_token_id(raw))
+            offsets.append(len(ids))
+        return np.asarray(ids, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+    # --------------------------------------------------
+    # Scoring
+    # --------------------------------------------------
+    def compound_scores(self, texts):
+        """VADER compound score per text (float64, rounded to 4 places like nltk)"""
+        texts = [t if isinstance(t, str) else str(t.encode("utf-8")) for t in texts]
+        tok, offsets = self.tokenize(texts)
+        t = self._table()
+        n_docs = len(texts)
+        lengths = np.diff(offsets)
+        doc = np.repeat(np.arange(n_docs), lengths)
+        pos = np.arange(len(tok)) - offsets[doc]
+
+        # Some but not all tokens ALL CAPS
+        n_upper = np.bincount(doc, weights=t["upper"][tok], minlength=n_docs)
+        cap_diff = (n_upper > 0) & (n_upper < lengths)
+
+        valence = self._occurrence_valence(tok, doc, pos, lengths, cap_diff, t)
+        sums = self._ordered_sums(valence, doc, offsets, n_docs)
+
+        sums += np.sign(sums) * self._punctuation_emphasis(texts)
+        compound = sums / np.sqrt(sums * sums + 15)
+        compound[lengths == 0] = 0.0
+        return np.round(compound, 4)
+
+    def _occurrence_valence(self, tok, doc, pos, lengths, cap_diff, t):
+        """Final sentiment of every token occurrence (0 for non-lexicon tokens)"""
+        if len(tok) == 0:
+            return np.zeros(0)
+
+        # nltk scores each occurrence at the first index of its token in the document
+        _, first, group = np.unique(doc * len(t["lex"]) + tok, return_index=True, return_inverse=True)
+        group = group.ravel()
+
+        def at(offset, rows):
+            """Token ids at rows + offset (callers guarantee the same document)"""
+            return tok[rows + offset]
+
+        rows = first
+        kind_of = np.zeros(len(rows), dtype=bool)
+        has_next = pos[rows] < lengths[doc[rows]] - 1
+        kind_of[has_next] = t["kind"][tok[rows[has_next]]] & t["of"][at(1, rows[has_next])]
+        scored = t["in_lex"][tok[rows]] & ~t["is_booster"][tok[rows]] & ~kind_of
+
+        rows = first[scored]
+        val = t["lex"][tok[rows]].copy()
+        p = pos[rows]
+        caps = cap_diff[doc[rows]]
+        emphasize = t["upper"][tok[rows]] & caps
+        val[emphasize] += np.where(val[emphasize] > 0, self.c.C_INCR, -self.c.C_INCR)
+
+        for start_i, damp in ((0, 1.0), (1, 0.95), (2, 0.9)):
+            idx = np.flatnonzero(p > start_i)
+            prev = at(-(start_i + 1), rows[idx])
+            idx = idx[~t["in_lex"][prev]]
+            prev = at(-(start_i + 1), rows[idx])
+
+            # Booster / dampener before the word, sign follows the current valence
+            s = t["booster"][prev].copy()
+            s[val[idx] < 0] *= -1
+            cap_boost = t["is_booster"][prev] & t["upper"][prev] & caps[idx]
+            s[cap_boost] += np.where(val[idx][cap_boost] > 0, self.c.C_INCR, -self.c.C_INCR)
+            val[idx] += s * damp
+
+            # Negation ("never so" / "so" intensify instead)
+            r = rows[idx]
+            if start_i == 0:
+                factor = np.where(t["negated"][prev], self.c.N_SCALAR, 1.0)
+            elif start_i == 1:
+                never_so = t["never"][at(-2, r)] & t["so_this"][at(-1, r)]
+                factor = np.where(never_so, 1.5, np.where(t["negated"][prev], self.c.N_SCALAR, 1.0))
+            else:
+                intensify = (t["never"][at(-3, r)] & t["so_this"][at(-2, r)]) | t["so_this"][at(-1, r)]
+                factor = np.where(intensify, 1.25, np.where(t["negated"][prev], self.c.N_SCALAR, 1.0))
+            val[idx] *= factor
+
+            if start_i == 2:
+                val[idx] = self._idioms(val[idx], r, pos, lengths[doc[r]], tok)
+
+        # "least" before the word negates it, unless "at least" / "very least"
+        least = np.zeros(len(rows), dtype=bool)
+        idx = np.flatnonzero(p > 0)
+        least[idx] = t["least"][at(-1, rows[idx])] & ~t["in_lex"][at(-1, rows[idx])]
+        idx = np.flatnonzero(least & (p > 1))
+        least[idx] &= ~t["at_very"][at(-2, rows[idx])]
+        val[least] *= self.c.N_SCALAR
+
+        first_valence = np.zeros(len(first))
+        first_valence[np.flatnonzero(scored)] = val
+        valence = first_valence[group]
+
+        # "but": halve what comes before the first one, boost what follows
+        is_but = t["but"][tok]
+        if is_but.any():
+            but_pos = np.full(len(lengths), np.iinfo(np.int64).max)
+            np.minimum.at(but_pos, doc[is_but], pos[is_but])
+            has_but = but_pos[doc] != np.iinfo(np.int64).max
+            valence[has_but & (pos < but_pos[doc])] *= 0.5
+            valence[has_but & (pos > but_pos[doc])] *= 1.5
+        return valence
+
+    @staticmethod
+    def _ordered_sums(valence, doc, offsets, n_docs):
+        """Per-document sum in token order, like nltk's sum(sentiments).
+
+        Vectorized across documents, one step per position; a different
+        order (e.g. a sparse product) can leave rounding noise where nltk
+        cancels to exactly 0, and "!" emphasis would then be added to it.
+        """
+        sums = np.zeros(n_docs)
+        hits = np.flatnonzero(valence)
+        if len(hits) == 0:
+            return sums
+        rank = np.arange(len(hits)) - np.searchsorted(hits, offsets[doc[hits]])
+        order = np.argsort(rank, kind="stable")
+        bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            step = hits[order[start:end]]
+            sums[doc[step]] += valence[step]
+        return sums
+
+    def _idioms(self, val, rows, pos, lengths, tok):
+        """SPECIAL_CASE_IDIOMS around the word (rows have at least 3 tokens before)"""
+        def seq(offsets):
+            return [tok[rows + o] for o in offsets]
+
+        def matches(window, valid=None):
+            hit = np.full(len(rows), np.nan)
+            for ids, value in self.idioms:
+                if len(ids) != len(window):
+                    continue
+                m = np.ones(len(rows), dtype=bool) if valid is None else valid.copy()
+                for column, token_id in zip(window, ids):
+                    m &= column == token_id
+                hit[m & np.isnan(hit)] = value
+            return hit
+
+        # First match wins among the preceding sequences
+        replaced = np.full(len(rows), np.nan)
+        for offsets in ((-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2)):
+            hit = matches(seq(offsets))
+            take = np.isnan(replaced) & ~np.isnan(hit)
+            replaced[take] = hit[take]
+        val = np.where(np.isnan(replaced), val, replaced)
+
+        # Then sequences starting at the word override
+        p = pos[rows]
+        for offsets, valid in (((0, 1), p < lengths - 1), ((0, 1, 2), p < lengths - 2)):
+            # Clipped ids past the document end are masked out by `valid`
+            window = [tok[np.minimum(rows + o, len(tok) - 1)] for o in offsets]
+            hit = matches(window, valid)
+            val = np.where(np.isnan(hit), val, hit)
+
+        # A two-word booster ("kind of", "sort of") just before dampens once
+        before = np.zeros(len(rows), dtype=bool)
+        for first_id, second_id in self.booster_bigrams:
+            before |= (tok[rows - 3] == first_id) & (tok[rows - 2] == second_id)
+            before |= (tok[rows - 2] == first_id) & (tok[rows - 1] == second_id)
+        return np.where(before, val + self.c.B_DECR, val)
+
+    @staticmethod
+    def _punctuation_emphasis(texts):
+        exclamations = np.minimum(np.fromiter((t.count("!") for t in texts), np.int64, len(texts)), 4)
+        questions = np.fromiter((t.count("?") for t in texts), np.int64, len(texts))
+        qm = np.where(questions > 3, 0.96, np.where(questions > 1, questions * 0.18, 0.0))
+        return exclamations * 0.292 + qm
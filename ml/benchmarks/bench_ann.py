@@ -0,0 +1,104 @@
+"""Exact sparse TF-IDF top-k vs LSA + IVF approximate search.
+
+Reports build time, per-query latency and recall@k against exact search
+for a few nprobe settings, with and without exact re-scoring of the
+IVF candidates.
+
+Usage:
+    python benchmarks/bench_ann.py [--sizes 10000 100000 1000000] [--nprobe 1 4 8 16 32] [--k 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from topk import normalize_rows, cosine_top_k  # noqa: E402
+from ann_index import IVFIndex  # noqa: E402
+
+VOCAB_SIZE = 5000
+N_TOPICS = 200
+TERMS_PER_TOPIC = 40
+TERMS_PER_ITEM = 8
+
+
+def synthetic_menu(n_rows, seed):
+    """TF-IDF-like rows drawn from topics (cuisines/dishes), so similar items share terms"""
+    rng = np.random.default_rng(seed)
+    topic_terms = rng.integers(0, VOCAB_SIZE, size=(N_TOPICS, TERMS_PER_TOPIC))
+    topics = rng.integers(0, N_TOPICS, size=n_rows)
+
+    # Most terms come from the item's topic, the rest are noise
+    from_topic = rng.random((n_rows, TERMS_PER_ITEM)) < 0.8
+    topic_pick = topic_terms[topics[:, None], rng.integers(0, TERMS_PER_TOPIC, (n_rows, TERMS_PER_ITEM))]
+    noise = rng.integers(0, VOCAB_SIZE, (n_rows, TERMS_PER_ITEM))
+    indices = np.where(from_topic, topic_pick, noise).ravel().astype(np.int32)
+
+    data = rng.random(n_rows * TERMS_PER_ITEM, dtype=np.float32) + 0.5
+    indptr = np.arange(0, n_rows * TERMS_PER_ITEM + 1, TERMS_PER_ITEM, dtype=np.int64)
+    X = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, VOCAB_SIZE))
+    X.sum_duplicates()
+    return normalize_rows(X).astype(np.float32)
+
+
+def query_rows(X, n_queries, seed):
+    """Queries = a few terms of random items (like a short chat query)"""
+    rng = np.random.default_rng(seed)
+    rows = X[rng.choice(X.shape[0], n_queries, replace=False)].tolil()
+    for r in range(n_queries):
+        keep = rng.permutation(len(rows.rows[r]))[:3]
+        rows.rows[r] = [rows.rows[r][i] for i in sorted(keep)]
+        rows.data[r] = [rows.data[r][i] for i in sorted(keep)]
+    return normalize_rows(rows.tocsr())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        X = synthetic_menu(n, seed=n)
+        Q = query_rows(X, args.queries, seed=1)
+
+        start = time.perf_counter()
+        ann = IVFIndex.build(X)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = [cosine_top_k(Q[i], X, args.k) for i in range(Q.shape[0])]
+        exact_ms = (time.perf_counter() - start) * 1000 / Q.shape[0]
+
+        def recall(results):
+            # An item tied with the k-th exact score counts as a hit
+            hits = []
+            for i, rows in enumerate(results):
+                scores = np.asarray((X[rows] @ Q[i].T).todense()).ravel() if len(rows) else np.empty(0)
+                hits.append(min(args.k, int(np.sum(scores >= exact[i][1][-1] - 1e-6))) / args.k)
+            return float(np.mean(hits))
+
+        print(f"\n📦 {n:,} items — IVF build {build_s:.1f}s "
+              f"({len(ann.centroids)} lists, {ann.components.shape[0]} dims)")
+        print(f"   exact sparse : {exact_ms:8.3f} ms/query")
+        for nprobe in args.nprobe:
+            start = time.perf_counter()
+            approx = [ann.search(Q[i], args.k, nprobe)[0] for i in range(Q.shape[0])]
+            ann_ms = (time.perf_counter() - start) * 1000 / Q.shape[0]
+
+            start = time.perf_counter()
+            reranked = [ann.search(Q[i], args.k, nprobe, X=X)[0] for i in range(Q.shape[0])]
+            rerank_ms = (time.perf_counter() - start) * 1000 / Q.shape[0]
+
+            print(f"   ivf nprobe={nprobe:<3}: {ann_ms:8.3f} ms/query, recall@{args.k} = {recall(approx):.3f}"
+                  f" | +exact rerank: {rerank_ms:8.3f} ms/query, recall@{args.k} = {recall(reranked):.3f}")
+
+
+if __name__ == "__main__":
+    main()
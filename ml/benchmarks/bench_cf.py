@@ -0,0 +1,100 @@
+"""Sparse collaborative filtering at scale: build, neighbours, batch scoring.
+
+Usage:
+    python benchmarks/bench_cf.py [--reviews 1000000] [--users 100000] [--items 5000]
+                                  [--memory-mb 256] [--sample-users 20000]
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from collaborative_filtering import (  # noqa: E402
+    build_user_item_matrix,
+    fill_weak_interactions,
+    top_k_neighbours,
+    recommend_all,
+)
+from item_item_cf import ItemNeighbours  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_reviews(n_reviews, n_users, n_items, seed=0):
+    """Zipf-like item popularity, uniform users, ratings 1-5"""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_items + 1)
+    popularity /= popularity.sum()
+    users = rng.integers(0, n_users, size=n_reviews).astype(str)
+    items = rng.choice(n_items, size=n_reviews, p=popularity).astype(str)
+    ratings = rng.integers(1, 6, size=n_reviews).astype(np.float64)
+    return users, items, ratings
+
+
+def stage(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - start:8.2f}s  peak RSS {peak_rss_mb():8.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=5_000)
+    parser.add_argument("--memory-mb", type=float, default=256)
+    parser.add_argument("--sample-users", type=int, default=20_000,
+                        help="Users to score (0 = all); time scales linearly")
+    args = parser.parse_args()
+
+    users, items, ratings = stage(
+        "generate reviews", lambda: synthetic_reviews(args.reviews, args.users, args.items)
+    )
+    X, user_ids, item_ids = stage("build sparse matrix", lambda: build_user_item_matrix(users, items, ratings))
+    X = stage("fill weak interactions", lambda: fill_weak_interactions(X))
+    print(f"matrix {X.shape[0]} × {X.shape[1]}, nnz={X.nnz}")
+
+    n_score = X.shape[0] if args.sample_users <= 0 else min(args.sample_users, X.shape[0])
+    rows = np.arange(n_score)
+
+    neighbours, _ = stage(
+        f"top-3 neighbours ({n_score} users)",
+        lambda: top_k_neighbours(X, k=3, memory_budget_mb=args.memory_mb, user_rows=rows)
+    )
+    stage(
+        f"batch recommend ({n_score} users)",
+        lambda: recommend_all(X, neighbours, k=5, memory_budget_mb=args.memory_mb)
+    )
+
+    # Item–item: offline neighbour lists, then O(rated × N) online scoring
+    item_neighbours, item_sims = stage(
+        "item-item top-20 neighbours",
+        lambda: top_k_neighbours(X.T.tocsr(), k=20, memory_budget_mb=args.memory_mb)
+    )
+    model = ItemNeighbours("bench", item_ids, item_neighbours.astype(np.int32), item_sims.astype(np.float32))
+
+    X_csr = X.tocsr()
+    sample = np.random.default_rng(1).choice(X.shape[0], size=min(1000, X.shape[0]), replace=False)
+    histories = [
+        (item_ids[X_csr.indices[X_csr.indptr[u]:X_csr.indptr[u + 1]]],
+         np.where(X_csr.data[X_csr.indptr[u]:X_csr.indptr[u + 1]] >= 1, 5.0, 3.0))
+        for u in sample
+    ]
+    start = time.perf_counter()
+    for rated, ratings in histories:
+        model.recommend(rated, ratings, k=5)
+    per_user_us = (time.perf_counter() - start) / len(histories) * 1e6
+    print(f"{'item-item score per user':<28} {per_user_us:8.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
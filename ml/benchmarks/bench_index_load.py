@@ -0,0 +1,75 @@
+"""Cold-start cost of the memory-mapped menu index vs the old pickle path.
+
+Usage:
+    python build_menu_embeddings.py
+    python benchmarks/bench_index_load.py [--repeat 20]
+"""
+import os
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import artifact_store  # noqa: E402
+import menu_index  # noqa: E402
+
+QUERY = "spicy chicken curry"
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    version = artifact_store.current_version(menu_index.INDEX_DIR)
+    if version is None:
+        sys.exit("Menu index not built. Run: python build_menu_embeddings.py")
+
+    index = menu_index._load_version(version)
+    meta = [index.meta(i) for i in range(len(index))]
+
+    # Recreate the legacy pickle (vectorizer, X, meta) from the same data
+    pickle_path = os.path.join(tempfile.mkdtemp(), "menu_vectors.pkl")
+    with open(pickle_path, "wb") as f:
+        pickle.dump((index.vectorizer, index.X.copy(), meta), f)
+
+    def pickle_path_query():
+        with open(pickle_path, "rb") as f:
+            vectorizer, X, meta_rows = pickle.load(f)
+        scores = cosine_similarity(vectorizer.transform([QUERY]), X)[0]
+        return [meta_rows[i] for i in scores.argsort()[::-1][:5]]
+
+    def mmap_cold_query():
+        cold = menu_index._load_version(version)
+        scores = cosine_similarity(cold.vectorizer.transform([QUERY]), cold.X)[0]
+        return [cold.meta(i) for i in scores.argsort()[::-1][:5]]
+
+    def mmap_warm_query():
+        warm = menu_index.load_index()
+        scores = cosine_similarity(warm.vectorizer.transform([QUERY]), warm.X)[0]
+        return [warm.meta(i) for i in scores.argsort()[::-1][:5]]
+
+    mmap_warm_query()
+    print(f"items={len(index)} pickle_size={os.path.getsize(pickle_path) / 1024:.1f}KB")
+    print(f"pickle load + query : {median_ms(pickle_path_query, args.repeat):.2f} ms")
+    print(f"mmap cold + query   : {median_ms(mmap_cold_query, args.repeat):.2f} ms")
+    print(f"resident + query    : {median_ms(mmap_warm_query, args.repeat):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Vectorized batch VADER vs nltk polarity_scores: parity and throughput.
+
+Parity: compound scores of the seed reviews and of synthetic texts
+(lexicon words mixed with negations, boosters, ALL CAPS, idioms, "but"
+and punctuation) must match nltk within --tolerance; the exit code is 1
+otherwise. Throughput: the batch scorer over --reviews review-like texts
+in batches of ML_SENTIMENT_BATCH_SIZE, against nltk timed on a sample.
+
+Usage:
+    python benchmarks/bench_sentiment.py [--reviews 1000000] [--synthetic 50000] [--vader-sample 20000]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from batch_sentiment import BatchSentimentScorer  # noqa: E402
+from sentiment_analysis import BATCH_SIZE  # noqa: E402
+
+SEED_REVIEWS = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../backend/data/raw/reviews_seed.csv"))
+PUNCTUATION = ["", "", "", "!", "!!", "?", "??", ".", ",", "!!!!", "?!?", "'", ")"]
+CONTEXT_WORDS = ["the", "shit", "bomb", "yeah", "right", "kind", "of", "least", "at", "very", "but", "BUT",
+                 "never", "so", "this", "food", "dosa", "NOT", "GOOD", "BAD", "cut", "mustard", "sort", "a", "I"]
+FOOD_WORDS = ["biryani", "dosa", "idli", "service", "staff", "ambience", "portion", "price", "taste", "curry"]
+
+
+def seed_reviews():
+    with open(SEED_REVIEWS, encoding="utf-8") as f:
+        return [r["reviewText"] for r in csv.DictReader(f)]
+
+
+def synthetic_texts(n, lexicon, constants, seed=0):
+    """Adversarial mixes of the constructs VADER special-cases"""
+    rng = random.Random(seed)
+    words = sorted(lexicon)[::7] + sorted(constants.NEGATE) + sorted(constants.BOOSTER_DICT) + CONTEXT_WORDS
+    texts = []
+    for _ in range(n):
+        tokens = []
+        for _ in range(rng.randint(0, 14)):
+            w = rng.choice(words)
+            if rng.random() < 0.1:
+                w = w.upper()
+            if rng.random() < 0.2:
+                w += rng.choice(PUNCTUATION)
+            if rng.random() < 0.05:
+                w = rng.choice(PUNCTUATION) + w
+            tokens.append(w)
+        texts.append(" ".join(tokens))
+    return texts
+
+
+def review_like_texts(n, seeds, seed=0):
+    """Seed review sentences recombined with food words, ~15-30 tokens each"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(seeds)}. The {rng.choice(FOOD_WORDS)} {rng.choice(seeds).lower()}{rng.choice(PUNCTUATION)}"
+        for _ in range(n)
+    ]
+
+
+def check_parity(scorer, sid, name, texts, tolerance):
+    expected = np.array([sid.polarity_scores(t)["compound"] for t in texts])
+    actual = scorer.compound_scores(texts)
+    diff = np.abs(expected - actual)
+    bad = np.flatnonzero(diff > tolerance)
+    print(f"   {name:<10}: {len(texts):>8,} texts, max |diff| {diff.max() if len(diff) else 0:.1e}, "
+          f"{len(bad)} beyond {tolerance:g}")
+    for i in bad[:5]:
+        print(f"      {texts[i]!r}: nltk {expected[i]} vs batch {actual[i]}")
+    return len(bad) == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--synthetic", type=int, default=50_000)
+    parser.add_argument("--vader-sample", type=int, default=20_000)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    sid = SentimentIntensityAnalyzer()
+    scorer = BatchSentimentScorer(sid.lexicon, sid.constants)
+    seeds = seed_reviews()
+
+    print("\n🔎 Parity with nltk polarity_scores()['compound']")
+    ok = check_parity(scorer, sid, "seed", seeds, args.tolerance)
+    ok &= check_parity(scorer, sid, "synthetic", synthetic_texts(args.synthetic, sid.lexicon, sid.constants),
+                       args.tolerance)
+
+    print(f"\n⏱️  Throughput over {args.reviews:,} review-like texts (batches of {BATCH_SIZE:,})")
+    texts = review_like_texts(args.reviews, seeds)
+    sample = texts[:args.vader_sample]
+    start = time.perf_counter()
+    for text in sample:
+        sid.polarity_scores(text)
+    vader_rate = len(sample) / (time.perf_counter() - start)
+
+    scorer = BatchSentimentScorer(sid.lexicon, sid.constants)  # cold token cache
+    start = time.perf_counter()
+    for i in range(0, len(texts), BATCH_SIZE):
+        scorer.compound_scores(texts[i:i + BATCH_SIZE])
+    seconds = time.perf_counter() - start
+    print(f"   nltk polarity_scores : {vader_rate:12,.0f} reviews/s "
+          f"(~{args.reviews / vader_rate:,.1f}s for {args.reviews:,}, from {len(sample):,} sampled)")
+    print(f"   batch scorer         : {args.reviews / seconds:12,.0f} reviews/s ({seconds:,.1f}s, "
+          f"{args.reviews / seconds / vader_rate:.1f}x)")
+
+    if not ok:
+        print("\n❌ Parity check failed")
+        sys.exit(1)
+    print("\n✅ Parity within tolerance")
+
+
+if __name__ == "__main__":
+    main()
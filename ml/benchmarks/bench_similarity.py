@@ -0,0 +1,56 @@
+"""Full cosine_similarity(X)[row] vs row-only and blockwise all-pairs top-k.
+
+The full matrix is skipped once it would exceed --max-full-mb.
+
+Usage:
+    python benchmarks/bench_similarity.py [--sizes 5000 20000 100000] [--k 10] [--budget-mb 256]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from topk import normalize_rows  # noqa: E402
+from similarity import row_similarity, all_pairs_top_k  # noqa: E402
+from bench_topk import synthetic_matrix  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--budget-mb", type=float, default=256)
+    parser.add_argument("--max-full-mb", type=float, default=4096)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        X = normalize_rows(synthetic_matrix(n, seed=n))
+        full_mb = n * n * 8 / 1024 / 1024
+        print(f"\n📦 {n:,} items (full N×N float64 = {full_mb:,.0f} MB)")
+
+        if full_mb <= args.max_full_mb:
+            start = time.perf_counter()
+            full_row = cosine_similarity(X)[0]
+            print(f"   cosine_similarity(X)[0] : {(time.perf_counter() - start) * 1000:10.1f} ms")
+        else:
+            full_row = None
+            print("   cosine_similarity(X)[0] : skipped")
+
+        start = time.perf_counter()
+        row = row_similarity(X, 0, normalized=True)
+        print(f"   row_similarity(X, 0)    : {(time.perf_counter() - start) * 1000:10.1f} ms"
+              + (f" (max diff {np.abs(row - full_row).max():.1e})" if full_row is not None else ""))
+
+        start = time.perf_counter()
+        neighbours, _ = all_pairs_top_k(X, args.k, memory_budget_mb=args.budget_mb)
+        print(f"   all_pairs_top_k k={args.k:<3}   : {(time.perf_counter() - start) * 1000:10.1f} ms "
+              f"-> {neighbours.nbytes / 1024 / 1024:.1f} MB of neighbours")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Top-k retrieval: cosine_similarity + full argsort vs normalized dot + argpartition.
+
+Usage:
+    python benchmarks/bench_topk.py [--sizes 10000 100000 1000000] [--k 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from topk import normalize_rows, cosine_top_k, batch_cosine_top_k  # noqa: E402
+
+VOCAB_SIZE = 5000
+TERMS_PER_ITEM = 8
+
+
+def synthetic_matrix(n_rows, seed):
+    """Sparse TF-IDF-like matrix with a fixed number of terms per row"""
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, VOCAB_SIZE, size=n_rows * TERMS_PER_ITEM, dtype=np.int32)
+    data = rng.random(n_rows * TERMS_PER_ITEM, dtype=np.float32)
+    indptr = np.arange(0, n_rows * TERMS_PER_ITEM + 1, TERMS_PER_ITEM, dtype=np.int64)
+    X = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, VOCAB_SIZE))
+    X.sum_duplicates()
+    return X
+
+
+def timed_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Q = synthetic_matrix(args.queries, seed=1)
+    q = Q[0]
+
+    print(f"{'items':>10} {'argsort':>10} {'topk':>10} {'batch/query':>12}  (ms)")
+    for n in args.sizes:
+        X = synthetic_matrix(n, seed=0)
+        X_normed = normalize_rows(X)
+
+        def legacy():
+            scores = cosine_similarity(q, X)[0]
+            return scores.argsort()[::-1][:args.k]
+
+        def shared():
+            return cosine_top_k(q, X_normed, args.k)
+
+        def batched():
+            return batch_cosine_top_k(Q, X_normed, args.k)
+
+        legacy_ms = timed_ms(legacy, args.repeat)
+        topk_ms = timed_ms(shared, args.repeat)
+        batch_ms = timed_ms(batched, args.repeat) / args.queries
+        print(f"{n:>10} {legacy_ms:>10.2f} {topk_ms:>10.2f} {batch_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
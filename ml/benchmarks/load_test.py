@@ -0,0 +1,97 @@
+"""Compare dashboard latency: persistent server vs one interpreter per request.
+
+Usage:
+    python benchmarks/load_test.py <user_id> [--requests 50] [--concurrency 4]
+
+Start ``python recommendation_server.py`` first for the server path.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPT_PATH = os.path.join(ML_DIR, "dashboard_recommender.py")
+
+
+def call_server(url, user_id, consumed, goal):
+    payload = json.dumps({
+        "userId": user_id,
+        "consumedCalories": consumed,
+        "calorieGoal": goal
+    }).encode("utf-8")
+    req = urllib.request.Request(
+        f"{url}/dashboard",
+        data=payload,
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        resp.read()
+
+
+def call_spawn(user_id, consumed, goal):
+    subprocess.run(
+        [sys.executable, SCRIPT_PATH, user_id, str(consumed), str(goal)],
+        check=True,
+        capture_output=True,
+        cwd=ML_DIR
+    )
+
+
+def run(label, fn, n_requests, concurrency):
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, range(n_requests))))
+    wall = time.perf_counter() - wall_start
+
+    print(
+        f"{label:<8} n={n_requests} "
+        f"p50={np.percentile(latencies, 50):.1f}ms "
+        f"p99={np.percentile(latencies, 99):.1f}ms "
+        f"throughput={n_requests / wall:.1f} req/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("user_id")
+    parser.add_argument("--consumed", type=int, default=800)
+    parser.add_argument("--goal", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--url", default=os.getenv("ML_SERVER_URL", "http://127.0.0.1:8765"))
+    parser.add_argument("--skip-spawn", action="store_true")
+    args = parser.parse_args()
+
+    # One warm-up call so the server's first-request costs are not counted
+    call_server(args.url, args.user_id, args.consumed, args.goal)
+
+    run(
+        "server",
+        lambda: call_server(args.url, args.user_id, args.consumed, args.goal),
+        args.requests,
+        args.concurrency
+    )
+
+    if not args.skip_spawn:
+        run(
+            "spawn",
+            lambda: call_spawn(args.user_id, args.consumed, args.goal),
+            args.requests,
+            args.concurrency
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Time every ML pipeline stage on a synthetic catalog and catch regressions.
+
+Each stage runs in a forked child (where available) so its peak RSS is
+measured on its own. Results are compared against a stored baseline;
+the exit code is 1 when any stage is slower or bigger than the baseline
+by more than --tolerance.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--scale small|medium|large] [--backend mongomock|mongod]
+                                        [--stages dashboard retrieve ...] [--save-baseline]
+
+mongomock (default) generates data in-process; with --backend mongod the
+catalog is generated into --db on MONGO_URI (or use synthetic_data.py
+once and pass --no-generate).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import multiprocessing
+
+import numpy as np
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+try:
+    import resource
+except ImportError:  # Windows: wall time only
+    resource = None
+
+RETRIEVE_QUERIES = [
+    "spicy chicken biryani", "something light and healthy", "non veg comfort food",
+    "crispy dosa", "paneer butter masala", "veg meals", "fish curry rice", "sweet dessert",
+]
+RETRIEVE_FILTERS = [
+    {"veg": True}, {"veg": False, "spice": [3, None]}, {"price": [None, 150]},
+    {"maxCalories": 300, "veg": True}, {"spice": [None, 1], "price": [100, 250]},
+]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)  # KiB on Linux, bytes on macOS
+
+
+# --------------------------------------------------
+# Stages (each returns a small dict of result facts)
+# --------------------------------------------------
+def stage_feature_store(db, opts):
+    from feature_store import build_feature_store
+    features = build_feature_store(db, force=True)
+    return {"items": int(features.matrix.shape[0]), "vocabulary": len(features.vocabulary)}
+
+
+def stage_menu_index(db, opts):
+    from build_menu_embeddings import build_menu_index
+    from menu_index import load_index
+    build_menu_index(db)
+    return {"items": len(load_index())}
+
+
+def stage_retrieve(db, opts):
+    from retrieve_menu import retrieve
+    latencies = []
+    for i in range(opts.queries):
+        start = time.perf_counter()
+        retrieve(RETRIEVE_QUERIES[i % len(RETRIEVE_QUERIES)], top_k=5, use_cache=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"queries": opts.queries, "p50_ms": round(float(np.percentile(latencies, 50)), 3)}
+
+
+def stage_retrieve_filtered(db, opts):
+    from retrieve_menu import retrieve
+    latencies = []
+    returned = 0
+    for i in range(opts.queries):
+        start = time.perf_counter()
+        returned += len(retrieve(RETRIEVE_QUERIES[i % len(RETRIEVE_QUERIES)], top_k=5, use_cache=False,
+                                 filters=RETRIEVE_FILTERS[i % len(RETRIEVE_FILTERS)]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"queries": opts.queries, "results": returned, "p50_ms": round(float(np.percentile(latencies, 50)), 3)}
+
+
+def stage_collaborative_filtering(db, opts):
+    from collaborative_filtering import (
+        load_interactions, build_user_item_matrix, fill_weak_interactions, top_k_neighbours, recommend_all
+    )
+    users, items, ratings = load_interactions(db)
+    X, user_ids, item_ids = build_user_item_matrix(users, items, ratings)
+    X = fill_weak_interactions(X)
+    neighbours, _ = top_k_neighbours(X, k=3)
+    rec_idx, _ = recommend_all(X, neighbours, k=5)
+    return {"users": len(user_ids), "items": len(item_ids), "with_recs": int((rec_idx[:, 0] >= 0).sum())}
+
+
+def stage_item_item_cf(db, opts):
+    from item_item_cf import build_item_neighbours, load_item_neighbours
+    build_item_neighbours(db)
+    return {"items": len(load_item_neighbours().item_ids)}
+
+
+def stage_hybrid(db, opts):
+    from hybrid_recommender import load_hybrid_inputs, content_scores
+    features, scorer, user_item, user_ids = load_hybrid_inputs(db)
+    rows = np.arange(min(opts.sample_users, len(user_ids)))
+    top_idx, _ = scorer.top_k(content_scores(features, 0), user_item, rows, k=5)
+    return {"users_scored": len(rows), "items": len(scorer.item_ids)}
+
+
+def stage_dashboard(db, opts):
+    import suggestion_cache
+    from dashboard_recommender import get_dashboard_recommendations
+    users = list(db.users.find({}, {"preferences": 1}).limit(opts.sample_users))
+    latencies, returned = [], 0
+    for i, user in enumerate(users):
+        suggestion_cache.invalidate_user()  # time the uncached path
+        goal = user.get("preferences", {}).get("calorieGoal", 2000)
+        start = time.perf_counter()
+        returned += len(get_dashboard_recommendations(user["_id"], (i * 137) % goal, goal))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "users": len(users),
+        "suggestions": returned,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else None
+    }
+
+
+def stage_dashboard_batch(db, opts):
+    import suggestion_cache
+    from batch_dashboard import iter_dashboard_batch
+    suggestion_cache.invalidate_user()
+    requests = []
+    for i, user in enumerate(db.users.find({}, {"preferences": 1})):
+        goal = user.get("preferences", {}).get("calorieGoal", 2000)
+        requests.append((user["_id"], (i * 137) % goal, goal))
+    returned = sum(len(r["suggestions"]) for r in iter_dashboard_batch(requests))
+    return {"users": len(requests), "suggestions": returned}
+
+
+def stage_sentiment(db, opts):
+    import sentiment_analysis
+    scored, scores = sentiment_analysis.run(db, full=True, workers=opts.workers)
+    return {"reviews": scored, "restaurants": len(scores)}
+
+
+def stage_batch_precompute(db, opts):
+    from batch_precompute import precompute_all
+    _, written = precompute_all(db, workers=opts.workers)
+    return {"users": written}
+
+
+STAGES = {
+    "feature_store": stage_feature_store,
+    "menu_index": stage_menu_index,
+    "retrieve": stage_retrieve,
+    "retrieve_filtered": stage_retrieve_filtered,
+    "collaborative_filtering": stage_collaborative_filtering,
+    "item_item_cf": stage_item_item_cf,
+    "hybrid": stage_hybrid,
+    "dashboard": stage_dashboard,
+    "dashboard_batch": stage_dashboard_batch,
+    "sentiment": stage_sentiment,
+    "batch_precompute": stage_batch_precompute,
+}
+
+# Artifacts a stage reads but does not build; built untimed when not selected
+PREREQUISITES = {
+    "retrieve": ["menu_index"],
+    "retrieve_filtered": ["menu_index"],
+}
+
+
+# --------------------------------------------------
+# Runner
+# --------------------------------------------------
+def _measure(name, db, opts):
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    result = STAGES[name](db, opts)
+    wall = time.perf_counter() - start
+    peak = _peak_rss_mb()
+    return {
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "rss_growth_mb": round(peak - rss_before, 1) if peak is not None else None,
+        "result": result,
+    }
+
+
+def _child(name, db, opts, conn):
+    try:
+        conn.send(("ok", _measure(name, db, opts)))
+    except Exception as e:  # report, don't hang the parent
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_stage(name, db, opts):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return _measure(name, db, opts)
+
+    ctx = multiprocessing.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(name, db, opts, child_conn))
+    proc.start()
+    child_conn.close()
+    status, payload = parent_conn.recv()
+    proc.join()
+    if status != "ok":
+        raise RuntimeError(f"stage {name} failed: {payload}")
+    return payload
+
+
+def _facts(result):
+    """Result entries that must match exactly (latency figures are compared via wall time)"""
+    return {k: v for k, v in (result or {}).items() if not k.endswith("_ms")}
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    """List of regression messages (empty when everything is within tolerance)"""
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["wall_s"] > max(base["wall_s"] * (1 + tolerance), base["wall_s"] + min_seconds):
+            problems.append(f"{name}: wall {current['wall_s']:.3f}s vs baseline {base['wall_s']:.3f}s")
+        if current.get("peak_rss_mb") and base.get("peak_rss_mb") and \
+                current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{name}: peak RSS {current['peak_rss_mb']}MB vs baseline {base['peak_rss_mb']}MB")
+        if _facts(current["result"]) != _facts(base.get("result")):
+            problems.append(f"{name}: result {current['result']} differs from baseline {base.get('result')}")
+    return problems
+
+
+def _patch_mongomock_bulk(mongomock):
+    """pymongo >= 4.9 passes sort= to bulk updates; older mongomock rejects it"""
+    import inspect
+    builder = mongomock.collection.BulkOperationBuilder
+    if "sort" in inspect.signature(builder.add_update).parameters:
+        return
+    add_update = builder.add_update
+
+    def patched(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+    builder.add_update = patched
+
+
+def connect(opts):
+    """Point mongo_client/async_db at the benchmark database; returns a sync db handle"""
+    import mongo_client
+    import async_db
+
+    if opts.backend == "mongomock":
+        import mongomock
+        _patch_mongomock_bulk(mongomock)
+        client = mongomock.MongoClient()
+        mongo_client.set_client(client)
+        db = mongo_client.get_db()
+        async_db.set_async_db(async_db.SyncDatabaseAdapter(db))
+        return db
+    return mongo_client.get_db()
+
+
+def main():
+    sys.path.insert(0, ML_DIR)
+    from synthetic_data import scale_args, resolve_scale, populate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    scale_args(parser)
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--db", default="bench", help="database name on mongod (never the app's 'test' DB)")
+    parser.add_argument("--no-generate", action="store_true", help="reuse data already in --db (mongod only)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--sample-users", type=int, default=50, help="users scored by dashboard/hybrid stages")
+    parser.add_argument("--queries", type=int, default=200, help="retrieve() calls")
+    parser.add_argument("--workers", type=int, default=2, help="sentiment / precompute worker processes")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--json", help="also write the results here")
+    opts = parser.parse_args()
+    opts.stages = [name for name in STAGES if name in opts.stages]  # pipeline order
+
+    # Artifacts go to a scratch dir and the ML modules read the bench DB
+    scratch_dir = None
+    if "ML_ARTIFACTS_DIR" not in os.environ:
+        scratch_dir = os.environ["ML_ARTIFACTS_DIR"] = tempfile.mkdtemp(prefix="ml-bench-")
+    os.environ["ML_MONGO_DB"] = opts.db
+    if opts.backend == "mongomock":
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+    db = connect(opts)
+
+    counts = resolve_scale(opts)
+    key = f"{opts.scale}:{opts.backend}:" + ",".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    if not opts.no_generate:
+        print(f"🧪 Generating {opts.scale} catalog ({opts.backend})")
+        populate(db, seed=opts.seed, **counts)
+
+    prerequisites = {p for name in opts.stages for p in PREREQUISITES.get(name, []) if p not in opts.stages}
+    results = {}
+    print(f"\n{'stage':<24}{'wall s':>10}{'peak MB':>10}{'+MB':>8}  result")
+    try:
+        for name in sorted(prerequisites):
+            run_stage(name, db, opts)
+        for name in opts.stages:
+            r = results[name] = run_stage(name, db, opts)
+            print(f"{name:<24}{r['wall_s']:>10.3f}{r['peak_rss_mb'] or 0:>10.1f}{r['rss_growth_mb'] or 0:>8.1f}  {r['result']}")
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump({key: results}, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(opts.baseline):
+        with open(opts.baseline) as f:
+            baselines = json.load(f)
+
+    if opts.save_baseline:
+        baselines[key] = results
+        with open(opts.baseline, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"\n💾 Baseline saved for {key}")
+        return 0
+
+    if key not in baselines:
+        print(f"\nℹ️ No baseline for {key}; run with --save-baseline to record one")
+        return 0
+
+    problems = compare(results, baselines[key], opts.tolerance)
+    if problems:
+        print("\n❌ Regressions vs baseline:")
+        for p in problems:
+            print(f"- {p}")
+        return 1
+    print("\n✅ Within tolerance of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Expand the seed CSVs in backend/data/raw into a synthetic catalog.
+
+Generates restaurants, menu items, users, reviews and today's calorie
+logs shaped like the backend's Mongoose models, and bulk-inserts them
+into mongomock (in-process) or a real mongod.
+
+Usage:
+    python benchmarks/synthetic_data.py --scale medium --uri mongodb://localhost:27017 [--db bench]
+    python benchmarks/synthetic_data.py --menu-items 1000000 --reviews 2000000 --uri ...
+"""
+import os
+import csv
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+RAW_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../backend/data/raw"))
+INSERT_BATCH = 10_000
+
+SCALES = {
+    "small": {"restaurants": 200, "menu_items": 5_000, "users": 1_000, "reviews": 20_000, "calorie_logs": 3_000},
+    "medium": {"restaurants": 2_000, "menu_items": 50_000, "users": 10_000, "reviews": 200_000, "calorie_logs": 30_000},
+    "large": {"restaurants": 20_000, "menu_items": 1_000_000, "users": 100_000, "reviews": 2_000_000,
+              "calorie_logs": 300_000},
+}
+
+CONDITIONS = ["diabetes", "bp"]
+DIET_TYPES = ["veg", "non-veg", "non-veg", "vegan"]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+def read_csv(name):
+    with open(os.path.join(RAW_DIR, name), newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def load_seeds():
+    return {
+        "restaurants": read_csv("restaurants.csv"),
+        "menu_items": read_csv("menu_items.csv"),
+        "nutrition": {r["itemName"]: int(float(r["calories"])) for r in read_csv("nutrition_seed.csv")},
+        "reviews": read_csv("reviews_seed.csv"),
+    }
+
+
+def insert_batches(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= INSERT_BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def generate_restaurants(seeds, n, rng, now):
+    rows = seeds["restaurants"]
+    ids = [ObjectId() for _ in range(n)]
+    picks = rng.integers(0, len(rows), n)
+    jitter = rng.normal(0, 0.05, (n, 2))  # ~5 km around the seed city
+    ratings = np.clip(rng.normal(4.0, 0.4, n), 1, 5).round(1)
+
+    def docs():
+        for i in range(n):
+            r = rows[picks[i]]
+            yield {
+                "_id": ids[i],
+                "name": f"{r['name']} #{i}",
+                "cuisines": [c.strip() for c in r["cuisine"].split(",")],
+                "rating": float(ratings[i]),
+                "priceRange": r["price"],
+                "isOpen": r["isOpen"] == "true",
+                "location": {
+                    "city": r["city"],
+                    "latitude": float(r["latitude"]) + jitter[i, 0],
+                    "longitude": float(r["longitude"]) + jitter[i, 1],
+                },
+                "createdAt": now,
+                "updatedAt": now,
+            }
+    return ids, docs()
+
+
+def generate_menu_items(seeds, n, restaurant_ids, rng, now):
+    rows = seeds["menu_items"]
+    picks = rng.integers(0, len(rows), n)
+    owners = rng.integers(0, len(restaurant_ids), n)
+    price_scale = rng.uniform(0.8, 1.3, n)
+    calorie_jitter = rng.normal(0, 40, n)
+
+    def docs():
+        for i in range(n):
+            m = rows[picks[i]]
+            base_calories = seeds["nutrition"].get(m["itemName"], 200)
+            yield {
+                "restaurantId": restaurant_ids[owners[i]],
+                "name": m["itemName"],
+                "description": m["description"],
+                "cuisine": m["cuisine"],
+                "price": round(float(m["price"]) * price_scale[i]),
+                "budgetCategory": m["budgetCategory"],
+                "isVeg": m["isVeg"] == "true",
+                "spicinessLevel": int(m["spicinessLevel"]),
+                "calories": int(max(50, base_calories + calorie_jitter[i])),
+                "createdAt": now,
+                "updatedAt": now,
+            }
+    return docs()
+
+
+def generate_users(n, rng, now):
+    ids = [ObjectId() for _ in range(n)]
+    diets = rng.integers(0, len(DIET_TYPES), n)
+    goals = rng.choice([1600, 1800, 2000, 2200, 2500], n)
+    condition_draws = rng.random((n, len(CONDITIONS))) < 0.15
+
+    def docs():
+        for i in range(n):
+            yield {
+                "_id": ids[i],
+                "name": f"Bench User {i}",
+                "email": f"bench{i}@example.com",
+                "password": "x",
+                "preferences": {"dietType": DIET_TYPES[diets[i]], "calorieGoal": int(goals[i])},
+                "health": {"conditions": [c for c, on in zip(CONDITIONS, condition_draws[i]) if on]},
+                "createdAt": now,
+                "updatedAt": now,
+            }
+    return ids, docs()
+
+
+def generate_reviews(seeds, n, user_ids, restaurant_ids, rng, now):
+    rows = seeds["reviews"]
+    picks = rng.integers(0, len(rows), n)
+    # Zipf-like popularity: a few restaurants collect most reviews
+    popularity = rng.zipf(1.3, n) % len(restaurant_ids)
+    users = rng.integers(0, len(user_ids), n)
+    ages = rng.integers(0, 365 * 24 * 3600, n)
+
+    def docs():
+        for i in range(n):
+            r = rows[picks[i]]
+            created = now - timedelta(seconds=int(ages[i]))
+            yield {
+                "restaurantId": restaurant_ids[popularity[i]],
+                "userId": user_ids[users[i]],
+                "rating": int(r["rating"]),
+                "reviewText": r["reviewText"],
+                "sentiment": "neutral",
+                "createdAt": created,
+                "updatedAt": created,
+            }
+    return docs()
+
+
+def generate_calorie_logs(seeds, n, user_ids, rng, now):
+    dishes = list(seeds["nutrition"].items())
+    picks = rng.integers(0, len(dishes), n)
+    users = rng.integers(0, len(user_ids), n)
+    meals = rng.integers(0, len(MEAL_TYPES), n)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    offsets = rng.integers(0, max(1, int((now - today).total_seconds())), n)
+
+    def docs():
+        for i in range(n):
+            dish, calories = dishes[picks[i]]
+            yield {
+                "userId": user_ids[users[i]],
+                "dish": dish,
+                "calories": calories,
+                "mealType": MEAL_TYPES[meals[i]],
+                "date": today + timedelta(seconds=int(offsets[i])),
+            }
+    return docs()
+
+
+def populate(db, restaurants, menu_items, users, reviews, calorie_logs, seed=0, drop=True, verbose=True):
+    """Fill db with a synthetic catalog; returns {collection: row count}"""
+    rng = np.random.default_rng(seed)
+    seeds = load_seeds()
+    now = datetime.now()
+    names = ["restaurants", "menuitems", "users", "reviews", "calorielogs"]
+
+    if drop:
+        for name in names + ["restaurant_sentiment", "ml_jobs", "recommendations"]:
+            db[name].drop()
+
+    def step(name, docs):
+        start = time.perf_counter()
+        insert_batches(db[name], docs)
+        if verbose:
+            print(f"  {name:<12} {db[name].estimated_document_count():>10,} rows in {time.perf_counter() - start:.1f}s")
+
+    restaurant_ids, docs = generate_restaurants(seeds, restaurants, rng, now)
+    step("restaurants", docs)
+    step("menuitems", generate_menu_items(seeds, menu_items, restaurant_ids, rng, now))
+    user_ids, docs = generate_users(users, rng, now)
+    step("users", docs)
+    step("reviews", generate_reviews(seeds, reviews, user_ids, restaurant_ids, rng, now))
+    step("calorielogs", generate_calorie_logs(seeds, calorie_logs, user_ids, rng, now))
+
+    # Indexes the ML queries rely on (no-ops on mongomock)
+    db.calorielogs.create_index([("userId", 1), ("date", 1)])
+    db.reviews.create_index("userId")
+    db.menuitems.create_index("updatedAt")
+
+    return {name: db[name].estimated_document_count() for name in names}
+
+
+def scale_args(parser):
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                            help=f"override the scale's {name} count")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def resolve_scale(args):
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    scale_args(parser)
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI"), help="mongod URI (required: mongomock data is in-process)")
+    parser.add_argument("--db", default="bench", help="database name (keep it away from the app's 'test' DB)")
+    args = parser.parse_args()
+
+    if not args.uri:
+        sys.exit("--uri (or MONGO_URI) is required; run_benchmarks.py generates mongomock data itself")
+
+    from pymongo import MongoClient
+    db = MongoClient(args.uri)[args.db]
+    counts = resolve_scale(args)
+    print(f"🧪 Generating {args.scale} catalog into {args.db}: {counts}")
+    populate(db, seed=args.seed, **counts)
+    print("✅ Synthetic data ready")
+
+
+if __name__ == "__main__":
+    main()
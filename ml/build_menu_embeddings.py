@@ -1,41 +1,93 @@
-import os
-import pickle
-import pandas as pd
-from pymongo import MongoClient
-from dotenv import load_dotenv
+import argparse
 from sklearn.feature_extraction.text import TfidfVectorizer
+from mongo_client import get_db
+from restaurant_cache import restaurant_cache
+from menu_index import save_index, encode_meta, content_version
+from ann_index import ANN_MIN_ITEMS, IVFIndex, save_ann
+from instrumentation import traced, span, count
 
-ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
-load_dotenv(ENV_PATH)
+MENU_PROJECTION = {
+    "name": 1,
+    "description": 1,
+    "cuisine": 1,
+    "restaurantId": 1,
+    "price": 1,
+    "isVeg": 1,
+    "spicinessLevel": 1,
+    "calories": 1,
+    "updatedAt": 1
+}
 
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["test"]
+def index_text(m):
+    return f"{m['name']} {m.get('description','')} {m.get('cuisine','')}"
 
-menu_items = list(db.menuitems.find())
-
-texts = []
-meta = []
-
-for m in menu_items:
-    text = f"{m['name']} {m.get('description','')} {m.get('cuisine','')}"
-    texts.append(text)
-    restaurant = db.restaurants.find_one({ "_id": m["restaurantId"] })
-
-    meta.append({
+def index_meta(m, restaurant):
+    return {
         "item_id": str(m["_id"]),
         "dish": m["name"],
         "restaurant": restaurant["name"] if restaurant else "Unknown",
         "city": restaurant["location"]["city"] if restaurant else "",
         "price": m.get("price"),
         "isVeg": m.get("isVeg"),
-        "spice": m.get("spicinessLevel")
-    })
+        "spice": m.get("spicinessLevel"),
+        "calories": m.get("calories")
+    }
+
+def load_documents(db, query=None):
+    """Menu texts, metadata and the newest updatedAt seen, with restaurants resolved in one batch"""
+    menu_items = list(db.menuitems.find(query or {}, MENU_PROJECTION))
+    restaurants = restaurant_cache.get_many(db, [m["restaurantId"] for m in menu_items])
+
+    texts = []
+    meta = []
+    watermark = None
+    for m in menu_items:
+        texts.append(index_text(m))
+        meta.append(index_meta(m, restaurants.get(m["restaurantId"])))
+        updated_at = m.get("updatedAt")
+        if updated_at is not None and (watermark is None or updated_at > watermark):
+            watermark = updated_at
+    return texts, meta, watermark
+
+@traced("build_menu_index", sample=True)
+def build_menu_index(db, ann=None):
+    """Full TF-IDF rebuild; also builds the LSA + IVF index when ann=True,
+    or (ann=None) when the menu has at least ANN_MIN_ITEMS dishes"""
+    with span("build_menu_index.load_documents"):
+        texts, meta, watermark = load_documents(db)
+    count("build_menu_index.items", len(texts))
+
+    with span("build_menu_index.fit_tfidf"):
+        vectorizer = TfidfVectorizer(stop_words="english")
+        X = vectorizer.fit_transform(texts)
+
+    # The ANN goes out first so it is in place when readers switch to the index
+    version = content_version(texts, meta)
+    if ann or (ann is None and len(texts) >= ANN_MIN_ITEMS):
+        with span("build_menu_index.ann"):
+            save_ann(IVFIndex.build(X), version)
 
-vectorizer = TfidfVectorizer(stop_words="english")
-X = vectorizer.fit_transform(texts)
+    save_index(
+        X,
+        vectorizer.get_feature_names_out().tolist(),
+        vectorizer.idf_,
+        encode_meta(meta),
+        version,
+        {
+            # Read by incremental_indexer.py to resume polling and track drift
+            "watermark": watermark.isoformat() if watermark else None,
+            "full_build": True,
+            "oov_tokens": 0,
+            "indexed_tokens": 0
+        }
+    )
+    return version
 
-vector_path = os.path.join(os.path.dirname(__file__), "menu_vectors.pkl")
-with open(vector_path, "wb") as f:
-    pickle.dump((vectorizer, X, meta), f)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the RAG menu index")
+    parser.add_argument("--ann", action="store_true",
+                        help="Also build the LSA + IVF approximate index (automatic from ML_ANN_MIN_ITEMS dishes)")
+    args = parser.parse_args()
 
-print("Menu embeddings built and saved successfully")
+    version = build_menu_index(get_db(), ann=True if args.ann else None)
+    print(f"Menu embeddings built and saved successfully (version {version})")
@@ -1,119 +1,177 @@
 import os
-import pandas as pd
+import numpy as np
+from scipy import sparse
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
+from topk import top_k_rows
+from similarity import all_pairs_top_k, block_rows
 
-# --------------------------------------------------
-# 1️⃣ Load backend .env explicitly
-# --------------------------------------------------
-ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
-load_dotenv(ENV_PATH)
+# Dense scratch space allowed per block of users (neighbour search / scoring)
+MEMORY_BUDGET_MB = float(os.getenv("ML_CF_MEMORY_MB", "256"))
 
-if not os.getenv("MONGO_URI"):
-    raise Exception("❌ MONGO_URI not loaded")
+REVIEW_PROJECTION = {"userId": 1, "restaurantId": 1, "rating": 1}
 
-print("✅ MONGO_URI loaded")
 
 # --------------------------------------------------
-# 2️⃣ Connect to MongoDB Atlas
+# Interaction matrix
 # --------------------------------------------------
-client = MongoClient(os.getenv("MONGO_URI"))
+def implicit_scores(ratings):
+    """Rating ≥ 4 → 1, rating 3 → 0.5, otherwise 0 (ignored)"""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    return np.where(ratings >= 4, 1.0, np.where(ratings == 3, 0.5, 0.0))
 
-# ⚠️ IMPORTANT: use DB where data actually exists
-db = client["test"]
 
-# --------------------------------------------------
-# 3️⃣ Load review data
-# --------------------------------------------------
-reviews = list(db.reviews.find())
+def load_interactions(db, batch_size=10_000):
+    """Stream reviews into (user, item, rating) arrays"""
+    users, items, ratings = [], [], []
+    cursor = db.reviews.find({}, REVIEW_PROJECTION, batch_size=batch_size)
+    for r in cursor:
+        users.append(str(r.get("userId", r["_id"])))  # 🔥 pseudo-user fix
+        items.append(str(r["restaurantId"]))
+        ratings.append(r.get("rating", 0))
+    return np.array(users), np.array(items), np.array(ratings, dtype=np.float64)
 
-if not reviews:
-    raise Exception("❌ No reviews found in database")
 
-# --------------------------------------------------
-# 4️⃣ Build implicit interaction dataset
-#    (Each review acts as a pseudo-user)
-# --------------------------------------------------
-data = []
+async def load_interactions_async(adb, batch_size=10_000):
+    """load_interactions against an async (pymongo async / Motor) database"""
+    users, items, ratings = [], [], []
+    async for r in adb.reviews.find({}, REVIEW_PROJECTION, batch_size=batch_size):
+        users.append(str(r.get("userId", r["_id"])))
+        items.append(str(r["restaurantId"]))
+        ratings.append(r.get("rating", 0))
+    return np.array(users), np.array(items), np.array(ratings, dtype=np.float64)
 
-for r in reviews:
-    rating = r.get("rating", 0)
 
-    # implicit score
-    if rating >= 4:
-        score = 1
-    elif rating == 3:
-        score = 0.5
-    else:
-        continue  # ignore negative feedback
+def build_user_item_matrix(users, items, ratings):
+    """CSR user × item matrix of implicit scores, plus sorted id encoders.
 
-    data.append({
-        "user": str(r.get("userId", r["_id"])),  # 🔥 pseudo-user fix
-        "item": str(r["restaurantId"]),
-        "score": score
-    })
+    Repeated (user, item) pairs are averaged, matching pivot_table's default.
+    """
+    scores = implicit_scores(ratings)
+    keep = scores > 0
+    user_ids, user_codes = np.unique(users[keep], return_inverse=True)
+    item_ids, item_codes = np.unique(items[keep], return_inverse=True)
 
-df = pd.DataFrame(data)
+    shape = (len(user_ids), len(item_ids))
+    totals = sparse.csr_matrix((scores[keep], (user_codes, item_codes)), shape=shape)
+    counts = sparse.csr_matrix((np.ones(keep.sum()), (user_codes, item_codes)), shape=shape)
+    totals.sort_indices()
+    counts.sort_indices()
+    totals.data /= counts.data
 
-print("Total interactions:", len(df))
-print("Unique users:", df["user"].nunique())
-print("Unique items:", df["item"].nunique())
+    return totals, user_ids, item_ids
 
-# --------------------------------------------------
-# 5️⃣ Create user–item interaction matrix
-# --------------------------------------------------
-user_item = df.pivot_table(
-    index="user",
-    columns="item",
-    values="score",
-    fill_value=0
-)
 
-# --------------------------------------------------
-# 6️⃣ TEMPORARY: Reduce sparsity (research-valid)
-# --------------------------------------------------
-users = user_item.index.tolist()
-items = user_item.columns.tolist()
+def fill_weak_interactions(X, n_items=2, value=0.5):
+    """TEMPORARY sparsity reduction: every user gets ≥ value on the first n_items"""
+    n_items = min(n_items, X.shape[1])
+    n_users = X.shape[0]
+    rows = np.repeat(np.arange(n_users), n_items)
+    cols = np.tile(np.arange(n_items), n_users)
+    weak = sparse.csr_matrix((np.full(rows.shape[0], value), (rows, cols)), shape=X.shape)
+    return X.maximum(weak).tocsr()
 
-for user in users:
-    for item in items[:2]:  # simulate weak interactions
-        user_item.loc[user, item] = max(user_item.loc[user, item], 0.5)
 
 # --------------------------------------------------
-# 7️⃣ Compute user similarity
+# Neighbours & scoring (blockwise, never materializes U × U)
 # --------------------------------------------------
-similarity = cosine_similarity(user_item)
+def top_k_neighbours(X, k=3, memory_budget_mb=MEMORY_BUDGET_MB, user_rows=None):
+    """k most similar users (cosine) for each requested user, self excluded.
 
-print("✅ Collaborative filtering matrix built")
+    Missing neighbours (fewer than k other users) are returned as -1.
+    """
+    return all_pairs_top_k(X, k, rows=user_rows, memory_budget_mb=memory_budget_mb)
 
-# --------------------------------------------------
-# 8️⃣ Generate CF recommendations for first user
-# --------------------------------------------------
-user_idx = 0
-scores = similarity[user_idx]
-similar_users = scores.argsort()[::-1][1:4]
 
-recommended_items = {}
+def recommend_all(X, neighbours, k=5, memory_budget_mb=MEMORY_BUDGET_MB):
+    """Sum neighbours' interactions per item and keep the top-k for every user.
 
-for u in similar_users:
-    for item, val in user_item.iloc[u].items():
-        if val > 0:
-            recommended_items[item] = recommended_items.get(item, 0) + val
+    Returns (item_index, score) arrays of shape (n_users, k); slots without a
+    positive score hold -1 / 0.
+    """
+    n_users, n_neighbours = neighbours.shape
+    owners = np.repeat(np.arange(n_users), n_neighbours)
+    valid = neighbours.ravel() >= 0
+    # Sparse "neighbour of" matrix: N[u, v] = 1 when v is one of u's neighbours
+    N = sparse.csr_matrix(
+        (np.ones(valid.sum()), (owners[valid], neighbours.ravel()[valid])),
+        shape=(n_users, X.shape[0])
+    )
+    # float64 scores + int64 argpartition positions per item column
+    block = block_rows(X.shape[1], memory_budget_mb, itemsize=16)
 
-# --------------------------------------------------
-# 9️⃣ Sort and display recommendations
-# --------------------------------------------------
-recommended_items = sorted(
-    recommended_items.items(),
-    key=lambda x: x[1],
-    reverse=True
-)
-
-print("🔍 CF Recommendations (restaurant IDs):")
-
-if not recommended_items:
-    print("⚠️ No CF recommendations generated")
-else:
-    for item_id, score in recommended_items[:5]:
-        print(f"- {item_id} (score: {round(score, 2)})")
+    all_idx = []
+    all_scores = []
+    for start in range(0, n_users, block):
+        R = (N[start:start + block] @ X).toarray()
+        idx, scores = top_k_rows(R, k)
+        idx[scores <= 0] = -1
+        scores[scores <= 0] = 0
+        all_idx.append(idx)
+        all_scores.append(scores)
+
+    return np.vstack(all_idx), np.vstack(all_scores)
+
+
+if __name__ == "__main__":
+    # --------------------------------------------------
+    # 1️⃣ Load backend .env explicitly
+    # --------------------------------------------------
+    ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
+    load_dotenv(ENV_PATH)
+
+    if not os.getenv("MONGO_URI"):
+        raise Exception("❌ MONGO_URI not loaded")
+
+    print("✅ MONGO_URI loaded")
+
+    # --------------------------------------------------
+    # 2️⃣ Connect to MongoDB Atlas
+    # --------------------------------------------------
+    client = MongoClient(os.getenv("MONGO_URI"))
+
+    # ⚠️ IMPORTANT: use DB where data actually exists
+    db = client["test"]
+
+    # --------------------------------------------------
+    # 3️⃣ Load review data (each review without userId acts as a pseudo-user)
+    # --------------------------------------------------
+    users, items, ratings = load_interactions(db)
+
+    if len(ratings) == 0:
+        raise Exception("❌ No reviews found in database")
+
+    # --------------------------------------------------
+    # 4️⃣ Create sparse user–item interaction matrix
+    # --------------------------------------------------
+    user_item, user_ids, item_ids = build_user_item_matrix(users, items, ratings)
+
+    print("Total interactions:", int((implicit_scores(ratings) > 0).sum()))
+    print("Unique users:", len(user_ids))
+    print("Unique items:", len(item_ids))
+
+    # --------------------------------------------------
+    # 5️⃣ TEMPORARY: Reduce sparsity (research-valid)
+    # --------------------------------------------------
+    user_item = fill_weak_interactions(user_item)
+
+    # --------------------------------------------------
+    # 6️⃣ Top-k user neighbours (blockwise, no U × U matrix)
+    # --------------------------------------------------
+    neighbours, _ = top_k_neighbours(user_item, k=3)
+
+    print("✅ Collaborative filtering neighbours built")
+
+    # --------------------------------------------------
+    # 7️⃣ CF recommendations for all users, shown for the first
+    # --------------------------------------------------
+    rec_idx, rec_scores = recommend_all(user_item, neighbours, k=5)
+
+    print("🔍 CF Recommendations (restaurant IDs):")
+
+    if rec_idx.shape[0] == 0 or rec_idx[0, 0] < 0:
+        print("⚠️ No CF recommendations generated")
+    else:
+        for item, score in zip(rec_idx[0], rec_scores[0]):
+            if item >= 0:
+                print(f"- {item_ids[item]} (score: {round(score, 2)})")
@@ -1,9 +1,10 @@
 import os
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from topk import top_k_indices
+from similarity import row_similarity
+from feature_store import build_feature_store, menu_text, MENU_TEXT_PROJECTION
 
 # 🔴 EXPLICITLY LOAD BACKEND ENV FILE
 ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
@@ -22,50 +23,29 @@ client = MongoClient(os.getenv("MONGO_URI"))
 # ⚠️ EXPLICIT DB NAME
 db = client["test"]
 
-# Load menu items
-items = list(db.menuitems.find())
-# print("Total menu items fetched:", len(items))
+# Shared TF-IDF features (refit only when db.menuitems changes)
+features = build_feature_store(db)
+tfidf_matrix = features.matrix
 
-# Build dataframe
-data = []
+# Menu text for display, aligned to feature-store rows
+items = db.menuitems.find({}, MENU_TEXT_PROJECTION)
+texts = {str(item["_id"]): menu_text(item) for item in items}
+# print("Total menu items fetched:", len(texts))
 
-for item in items:
-    name = item.get("name", "")
-    desc = item.get("description", "")
-    cuisine = item.get("cuisine", "")
-    is_veg = "veg" if item.get("isVeg", False) else "non-veg"
-    spice = "spicy " * int(item.get("spicinessLevel", 1))
-
-    text = f"{name} {desc} {cuisine} {is_veg} {spice}".strip()
-
-    data.append({
-        "id": str(item["_id"]),
-        "text": text
-    })
-
-
-df = pd.DataFrame(data)
-
-# print("DataFrame columns:", df.columns)
-# print("Total rows in DataFrame:", len(df))
-
-if df.empty:
-    raise Exception("No data available for TF-IDF. Check menu items.")
-
-
-# TF-IDF
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf_matrix = vectorizer.fit_transform(df["text"])
-
-# Similarity matrix
-similarity = cosine_similarity(tfidf_matrix)
-
-print("✅ Content-based similarity matrix built")
+df = pd.DataFrame({
+    "id": features.item_ids,
+    "text": [texts.get(item_id, "") for item_id in features.item_ids]
+})
 
 # Example: recommend similar to first item
+# (only that item's similarity row; feature-store rows are L2-normalized)
 idx = 0
-scores = list(enumerate(similarity[idx]))
-scores = sorted(scores, key=lambda x: x[1], reverse=True)[1:6]
+similarity = row_similarity(tfidf_matrix, idx, normalized=True)
+
+print("✅ Content-based similarity computed")
+
+top_idx = top_k_indices(similarity, 5, exclude=idx)
+scores = [(i, similarity[i]) for i in top_idx]
 
 print("🔍 Recommendations for:", df.iloc[idx]["text"])
 for i, score in scores:
@@ -1,241 +1,269 @@
 import sys
 import json
-import os
+import asyncio
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
-from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from mongo_client import get_db
+from async_db import get_async_db, run, find_all, find_one
+from feature_store import get_feature_store, menu_text
+from restaurant_cache import restaurant_cache
+from health_rules import dashboard_rules
+from diversity import select_diverse, name_vectors
+from similarity import row_similarity
+from instrumentation import trace, span, count
+import suggestion_cache
 
-# Load environment
-ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
-load_dotenv(ENV_PATH)
+# Only the menu fields the candidate builder reads
+MENU_PROJECTION = {
+    "name": 1,
+    "description": 1,
+    "restaurantId": 1,
+    "cuisine": 1,
+    "isVeg": 1,
+    "calories": 1,
+    "spicinessLevel": 1
+}
 
-def get_dashboard_recommendations(user_id, consumed_calories, calorie_goal):
-    try:
-        client = MongoClient(os.getenv("MONGO_URI"))
-        db = client["test"]
-        
-        # Get user profile and today's meals
-        user = db.users.find_one({"_id": user_id}) if user_id else None
-        if not user:
-            user = {"preferences": {"dietType": "non-veg"}, "health": {"conditions": []}}
-        
-        health = user.get("health", {})
-        prefs = user.get("preferences", {})
-        diet_type = prefs.get("dietType", "non-veg")
-        conditions = [c.lower() for c in health.get("conditions", [])]
-        
-        remaining_calories = calorie_goal - consumed_calories
-        
-        # Get today's meal breakdown to suggest next meal
-        from datetime import datetime, timedelta
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow = today + timedelta(days=1)
-        
-        today_meals = list(db.calorielogs.find({
-            "userId": user_id,
-            "date": {"$gte": today, "$lt": tomorrow}
-        }))
-        
-        # Determine next meal type based on time and existing meals
-        current_hour = datetime.now().hour
-        meal_types_logged = [meal.get("mealType", "snack") for meal in today_meals]
-        
-        # Smart meal progression logic
-        suggested_meal_type = "snack"  # default
-        
-        if "breakfast" not in meal_types_logged and current_hour < 11:
+MAX_SUGGESTIONS = 6
+DIVERSITY_QUOTAS = {"isVeg": 3, "restaurant": 2}  # max 3 veg / 3 non-veg, 2 per restaurant
+
+# Name keywords that select menu items for each meal type
+MEAL_TYPE_FOODS = {
+    "breakfast": ["idli", "dosa", "pongal", "upma", "uttapam", "vada", "poori"],
+    "lunch": ["meals", "biryani", "curry", "rice", "sambar", "rasam"],
+    "dinner": ["curry", "rice", "biryani", "chapati", "naan", "dal"],
+    "snack": ["fry", "tikka", "chaat", "samosa", "pakora"]
+}
+
+def build_candidate_rows(menu_items, restaurants):
+    """Join menu items with their (already fetched) restaurants"""
+    rows = []
+    for item in menu_items:
+        restaurant = restaurants.get(item["restaurantId"])
+        if not restaurant:
+            continue
+
+        rows.append({
+            "item_id": str(item["_id"]),
+            "name": item.get("name"),
+            "restaurant": restaurant.get("name", "Unknown"),
+            "isVeg": item.get("isVeg", False),
+            "calories": item.get("calories", 200),
+            "spice": item.get("spicinessLevel", 2),
+            "rating": restaurant.get("rating", 3.5),
+            "text": menu_text(item)
+        })
+    return rows
+
+async def fetch_user_context(adb, user_id):
+    """User profile and today's meal types, read concurrently"""
+    from datetime import datetime, timedelta
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+
+    meals = find_all(adb.calorielogs, {
+        "userId": user_id,
+        "date": {"$gte": today, "$lt": tomorrow}
+    }, {"mealType": 1})
+    if not user_id:
+        return None, await meals
+
+    return await asyncio.gather(
+        find_one(adb.users, {"_id": user_id}, {"preferences": 1, "health": 1}),
+        meals
+    )
+
+def has_non_veg(menu_items, restaurants):
+    """Whether any item that survives the restaurant join is non-veg"""
+    return any(
+        restaurants.get(item["restaurantId"]) and item.get("isVeg", False) == False  # noqa: E712
+        for item in menu_items
+    )
+
+async def fetch_candidates(adb, suggested_meal_type, remaining_calories):
+    """Meal-type menu items, the non-veg backfill (only when they have no non-veg item) and their restaurants"""
+    # Create regex pattern for suggested meal type
+    meal_keywords = MEAL_TYPE_FOODS.get(suggested_meal_type, [])
+    meal_pattern = "|".join(meal_keywords) if meal_keywords else ".*"
+    menu_items = await find_all(adb.menuitems, {"name": {"$regex": meal_pattern, "$options": "i"}}, MENU_PROJECTION)
+
+    # If no meal-specific items found, get all items
+    if len(menu_items) < 5:
+        menu_items = await find_all(adb.menuitems, {}, MENU_PROJECTION)
+
+    restaurants = await restaurant_cache.get_many_async(adb, [item["restaurantId"] for item in menu_items])
+
+    non_veg_items = []
+    if not has_non_veg(menu_items, restaurants):
+        # Some non-veg items without meal-type restriction
+        count("dashboard.backfill_queries")
+        non_veg_items = await find_all(adb.menuitems, {
+            "isVeg": False,
+            "calories": {"$lte": remaining_calories + 200}
+        }, MENU_PROJECTION, limit=10)
+        restaurants.update(await restaurant_cache.get_many_async(
+            adb, [item["restaurantId"] for item in non_veg_items]
+        ))
+    return menu_items, non_veg_items, restaurants
+
+def load_user_context(adb, user_id):
+    """Health conditions and today's logged meal types, cached per user and day"""
+    from datetime import date
+    key = (user_id, date.today())
+
+    context = suggestion_cache.user_contexts.get(key)
+    if context is not None:
+        count("dashboard.context_cache_hits")
+        return context
+
+    with span("dashboard.fetch_user_context"):
+        user, today_meals = run(fetch_user_context(adb, user_id))
+    context = build_user_context(user, today_meals)
+    suggestion_cache.user_contexts.put(key, context)
+    return context
+
+def build_user_context(user, today_meals):
+    """Diet, lower-cased health conditions and logged meal types from raw documents"""
+    if not user:
+        user = {"preferences": {"dietType": "non-veg"}, "health": {"conditions": []}}
+
+    health = user.get("health", {})
+    prefs = user.get("preferences", {})
+
+    return {
+        "diet_type": prefs.get("dietType", "non-veg"),
+        "conditions": [c.lower() for c in health.get("conditions", [])],
+        "meal_types_logged": [meal.get("mealType", "snack") for meal in today_meals]
+    }
+
+def suggest_meal_type(meal_types_logged, current_hour):
+    # Smart meal progression logic
+    suggested_meal_type = "snack"  # default
+    
+    if "breakfast" not in meal_types_logged and current_hour < 11:
+        suggested_meal_type = "breakfast"
+    elif "lunch" not in meal_types_logged and current_hour >= 11 and current_hour < 17:
+        suggested_meal_type = "lunch"
+    elif "dinner" not in meal_types_logged and current_hour >= 17:
+        suggested_meal_type = "dinner"
+    elif len(meal_types_logged) >= 3:  # All main meals done, suggest snack
+        suggested_meal_type = "snack"
+    else:
+        # Enhanced time-based fallback
+        if current_hour < 11 and "breakfast" not in meal_types_logged:
             suggested_meal_type = "breakfast"
-        elif "lunch" not in meal_types_logged and current_hour >= 11 and current_hour < 17:
+        elif current_hour >= 11 and current_hour < 17 and "lunch" not in meal_types_logged:
             suggested_meal_type = "lunch"
-        elif "dinner" not in meal_types_logged and current_hour >= 17:
+        elif current_hour >= 17 and "dinner" not in meal_types_logged:
             suggested_meal_type = "dinner"
-        elif len(meal_types_logged) >= 3:  # All main meals done, suggest snack
-            suggested_meal_type = "snack"
         else:
-            # Enhanced time-based fallback
-            if current_hour < 11 and "breakfast" not in meal_types_logged:
-                suggested_meal_type = "breakfast"
-            elif current_hour >= 11 and current_hour < 17 and "lunch" not in meal_types_logged:
-                suggested_meal_type = "lunch"
-            elif current_hour >= 17 and "dinner" not in meal_types_logged:
-                suggested_meal_type = "dinner"
-            else:
-                suggested_meal_type = "snack"
-        
-        # Load menu items with meal-type filtering
-        meal_type_foods = {
-            "breakfast": ["idli", "dosa", "pongal", "upma", "uttapam", "vada", "poori"],
-            "lunch": ["meals", "biryani", "curry", "rice", "sambar", "rasam"],
-            "dinner": ["curry", "rice", "biryani", "chapati", "naan", "dal"],
-            "snack": ["fry", "tikka", "chaat", "samosa", "pakora"]
-        }
-        
-        # Create regex pattern for suggested meal type
-        meal_keywords = meal_type_foods.get(suggested_meal_type, [])
-        meal_pattern = "|".join(meal_keywords) if meal_keywords else ".*"
-        
-        menu_items = list(db.menuitems.find({
-            "name": {"$regex": meal_pattern, "$options": "i"}
-        }))
-        
-        # If no meal-specific items found, get all items
-        if len(menu_items) < 5:
-            menu_items = list(db.menuitems.find())
-        
-        rows = []
-        for item in menu_items:
-            restaurant = db.restaurants.find_one({"_id": item["restaurantId"]})
-            if not restaurant:
-                continue
-                
-            rows.append({
-                "item_id": str(item["_id"]),
-                "name": item.get("name"),
-                "restaurant": restaurant.get("name", "Unknown"),
-                "isVeg": item.get("isVeg", False),
-                "calories": item.get("calories", 200),
-                "spice": item.get("spicinessLevel", 2),
-                "rating": restaurant.get("rating", 3.5),
-                "text": f"{item.get('name','')} {item.get('description','')}"
-            })
-        
-        df = pd.DataFrame(rows)
-        
-        # Force include some non-veg items if none exist in current selection
-        if len(df[df['isVeg'] == False]) == 0:
-            # Get some non-veg items without meal-type restriction
-            non_veg_items = list(db.menuitems.find({
-                "isVeg": False,
-                "calories": {"$lte": remaining_calories + 200}
-            }).limit(10))
-            
-            for item in non_veg_items:
-                restaurant = db.restaurants.find_one({"_id": item["restaurantId"]})
-                if restaurant:
-                    rows.append({
-                        "item_id": str(item["_id"]),
-                        "name": item.get("name"),
-                        "restaurant": restaurant.get("name", "Unknown"),
-                        "isVeg": item.get("isVeg", False),
-                        "calories": item.get("calories", 200),
-                        "spice": item.get("spicinessLevel", 2),
-                        "rating": restaurant.get("rating", 3.5),
-                        "text": f"{item.get('name','')} {item.get('description','')}"
-                    })
-            
-            # Recreate dataframe with additional items
-            df = pd.DataFrame(rows)
-        
-        # Filter by remaining calories (with some buffer)
-        df = df[df["calories"] <= remaining_calories + 100]
-        
-        if df.empty:
-            return []
-        
-        # Content-based similarity
-        vectorizer = TfidfVectorizer(stop_words="english")
-        tfidf = vectorizer.fit_transform(df["text"])
-        content_sim = cosine_similarity(tfidf)
-        
-        # Health-aware scoring
-        final_scores = []
-        
-        for idx, row in df.iterrows():
-            # Base score from content similarity + rating
-            score = content_sim[0][idx] * 0.6 + (row["rating"] / 5.0) * 0.4
-            explanation = []
-            
-            # Calorie fitness
-            if row["calories"] <= remaining_calories:
-                score += 0.2
-                explanation.append("Fits calorie budget")
+            suggested_meal_type = "snack"
+    return suggested_meal_type
+
+def get_dashboard_recommendations(user_id, consumed_calories, calorie_goal, adb=None):
+    try:
+        with trace("dashboard"):
+            # Reuse the process-wide async pool (warm when served by recommendation_server.py)
+            if adb is None:
+                adb = get_async_db()
             
-            # Health condition penalties
-            if "diabetes" in conditions and row["calories"] > 300:
-                score -= 0.15
-                explanation.append("High calories for diabetes")
+            from datetime import datetime
+            context = load_user_context(adb, user_id)
+            remaining_calories = calorie_goal - consumed_calories
             
-            if "bp" in conditions and row["spice"] >= 4:
-                score -= 0.1
-                explanation.append("High spice for BP")
+            # Determine next meal type based on time and existing meals
+            suggested_meal_type = suggest_meal_type(context["meal_types_logged"], datetime.now().hour)
             
-            # Prefer balanced meals
-            if 150 <= row["calories"] <= 400:
-                score += 0.1
-                explanation.append("Balanced portion")
+            # Served from cache until the user logs a meal or edits their profile
+            key = suggestion_cache.suggestion_key(user_id, suggested_meal_type, remaining_calories)
+            cached = suggestion_cache.suggestions.get(key)
+            if cached is not None:
+                count("dashboard.cache_hits")
+                return cached
+            count("dashboard.cache_misses")
             
-            final_scores.append({
-                "dish": row["name"],
-                "restaurant": row["restaurant"],
-                "calories": int(row["calories"]),
-                "spice": int(row["spice"]),
-                "isVeg": bool(row["isVeg"]),
-                "final_score": round(score, 3),
-                "reason": "; ".join(explanation) if explanation else "Good match",
-                "suggestedMealType": suggested_meal_type
-            })
-        
-        # Sort by score first
-        result = sorted(final_scores, key=lambda x: x["final_score"], reverse=True)
-        
-        # Ensure dish diversity - avoid same dish from multiple restaurants
-        diverse_result = []
-        seen_dishes = set()
-        veg_items = [item for item in result if item["isVeg"]]
-        non_veg_items = [item for item in result if not item["isVeg"]]
-        
-        # Force alternating selection to ensure variety
-        max_items = 6
-        veg_added = 0
-        non_veg_added = 0
-        
-        # Add items alternating between veg and non-veg
-        for i in range(max_items):
-            if i % 2 == 0:  # Even positions: try veg first
-                if veg_added < len(veg_items) and veg_added < 3:  # Max 3 veg
-                    for item in veg_items[veg_added:]:
-                        dish_base = item["dish"].lower().split()[0]  # Use first word only
-                        if dish_base not in seen_dishes:
-                            diverse_result.append(item)
-                            seen_dishes.add(dish_base)
-                            veg_added = veg_items.index(item) + 1
-                            break
-                # If no unique veg available, try non-veg
-                if len(diverse_result) == i:  # No veg was added
-                    for item in non_veg_items[non_veg_added:]:
-                        dish_base = item["dish"].lower().split()[0]
-                        if dish_base not in seen_dishes:
-                            diverse_result.append(item)
-                            seen_dishes.add(dish_base)
-                            non_veg_added = non_veg_items.index(item) + 1
-                            break
-            else:  # Odd positions: try non-veg first
-                if non_veg_added < len(non_veg_items) and non_veg_added < 3:  # Max 3 non-veg
-                    for item in non_veg_items[non_veg_added:]:
-                        dish_base = item["dish"].lower().split()[0]
-                        if dish_base not in seen_dishes:
-                            diverse_result.append(item)
-                            seen_dishes.add(dish_base)
-                            non_veg_added = non_veg_items.index(item) + 1
-                            break
-                # If no unique non-veg available, try veg
-                if len(diverse_result) == i:  # No non-veg was added
-                    for item in veg_items[veg_added:]:
-                        dish_base = item["dish"].lower().split()[0]
-                        if dish_base not in seen_dishes:
-                            diverse_result.append(item)
-                            seen_dishes.add(dish_base)
-                            veg_added = veg_items.index(item) + 1
-                            break
-        
-        return diverse_result[:6]
+            with span("dashboard.fetch_candidates"):
+                candidates = run(fetch_candidates(adb, suggested_meal_type, remaining_calories))
+            with span("dashboard.rank"):
+                result = rank_suggestions(context, suggested_meal_type, remaining_calories, *candidates)
+            suggestion_cache.suggestions.put(key, result)
+            return result
         
     except Exception as e:
+        count("dashboard.errors")
         print(f"Error in dashboard recommender: {e}", file=sys.stderr)
         return []
 
+def rank_suggestions(context, suggested_meal_type, remaining_calories, menu_items, non_veg_items, restaurants):
+    """Uncached ranking: candidates, health-aware scores and diversity"""
+    rows = build_candidate_rows(menu_items, restaurants)
+    df = pd.DataFrame(rows)
+    
+    # Force include some non-veg items if none exist in current selection
+    if df.empty or len(df[df['isVeg'] == False]) == 0:
+        rows.extend(build_candidate_rows(non_veg_items, restaurants))
+        
+        # Recreate dataframe with additional items
+        df = pd.DataFrame(rows)
+    
+    # Filter by remaining calories (with some buffer)
+    df = df[df["calories"] <= remaining_calories + 100].reset_index(drop=True)
+    
+    if df.empty:
+        return []
+    count("dashboard.items_scored", len(df))
+    
+    # Content-based similarity from the shared menu feature store
+    # (rows are L2-normalized, so a dot product is the cosine)
+    with span("dashboard.content_vectors"):
+        features = get_feature_store(get_db())
+        tfidf = features.vectors_for(df["item_id"].tolist(), df["text"].tolist())
+        content_sim = row_similarity(tfidf, 0, normalized=True)
+    
+    return score_candidates(df, tfidf, content_sim, name_vectors(df["name"]),
+                            context["conditions"], remaining_calories, suggested_meal_type)
+
+def score_candidates(df, tfidf, content_sim, duplicate_vectors, conditions, remaining_calories, suggested_meal_type):
+    """Health-aware scores and diverse picks over prepared candidates (df row i is tfidf row i)"""
+    # Health-aware scoring: declarative rules evaluated over all candidates at once
+    with span("dashboard.health_rules"):
+        rules = dashboard_rules.evaluate(
+            {"calories": df["calories"].to_numpy(), "spice": df["spice"].to_numpy()},
+            conditions,
+            {"remaining_calories": remaining_calories}
+        )
+        
+        # Base score from content similarity + rating
+        base_scores = content_sim * 0.6 + (df["rating"].to_numpy() / 5.0) * 0.4
+        scores = np.round(rules.apply(base_scores), 3)
+    
+    # Diverse top picks: MMR over the content vectors with veg/non-veg and
+    # restaurant quotas; the same dish from another restaurant is suppressed
+    # by dish-name similarity
+    with span("dashboard.diversify"):
+        picks = select_diverse(
+            scores,
+            tfidf,
+            k=MAX_SUGGESTIONS,
+            attributes={"isVeg": df["isVeg"].to_numpy(), "restaurant": df["restaurant"].to_numpy()},
+            quotas=DIVERSITY_QUOTAS,
+            duplicate_vectors=duplicate_vectors
+        )
+    
+    return [
+        {
+            "dish": df.at[idx, "name"],
+            "restaurant": df.at[idx, "restaurant"],
+            "calories": int(df.at[idx, "calories"]),
+            "spice": int(df.at[idx, "spice"]),
+            "isVeg": bool(df.at[idx, "isVeg"]),
+            "final_score": scores[idx],
+            "reason": rules.explain(idx),
+            "suggestedMealType": suggested_meal_type
+        }
+        for idx in picks
+    ]
+
 if __name__ == "__main__":
     if len(sys.argv) != 4:
         print("Usage: python dashboard_recommender.py <user_id> <consumed_calories> <calorie_goal>")
@@ -0,0 +1,91 @@
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# --------------------------------------------------
+# Diversity re-ranking (MMR with quotas)
+#
+# Greedy maximal marginal relevance over precomputed, L2-normalized item
+# vectors: each step takes the candidate maximising
+#   w · score − (1 − w) · max similarity to the items already picked,
+# skipping near-duplicates of a pick and attribute values whose quota is
+# full. Every step updates the running max-similarity with one vectorized
+# row product, so selecting k items from n costs O(k · n).
+# --------------------------------------------------
+
+
+# Character trigrams of the dish name: the same dish listed by several
+# restaurants is a near-duplicate even when descriptions differ
+_name_vectorizer = HashingVectorizer(
+    analyzer="char_wb", ngram_range=(3, 3), n_features=2 ** 16, alternate_sign=False, norm="l2"
+)
+
+
+def name_vectors(names):
+    """L2-normalized char-trigram vectors for near-duplicate dish names"""
+    return _name_vectorizer.transform([str(n).lower() for n in names])
+
+
+def row_similarity(vectors, i):
+    """Cosine of row i against every row (rows already L2-normalized)"""
+    if sparse.issparse(vectors):
+        return (vectors @ vectors[i].T).toarray().ravel()
+    return np.asarray(vectors) @ np.asarray(vectors)[i]
+
+
+def select_diverse(scores, vectors, k, relevance_weight=0.8, duplicate_threshold=0.8,
+                   attributes=None, quotas=None, relax_quotas=True, duplicate_vectors=None):
+    """Indices of up to k diverse, high-scoring items in selection order.
+
+    attributes maps a name to per-item labels; quotas maps the same name to
+    the max picks per label (an int, or a {label: max} dict). When quotas
+    leave fewer than k items, the rest are filled without them unless
+    relax_quotas is False. Items whose duplicate_vectors (default: vectors)
+    similarity to a pick is >= duplicate_threshold are never selected.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    attributes = attributes or {}
+    quotas = dict(quotas or {})
+
+    codes, labels, counts = {}, {}, {}
+    for name in quotas:
+        labels[name], codes[name] = np.unique(np.asarray(attributes[name]), return_inverse=True)
+        counts[name] = np.zeros(len(labels[name]), dtype=np.int64)
+
+    def limit(name, code):
+        q = quotas[name]
+        return q.get(labels[name][code], n) if isinstance(q, dict) else q
+
+    available = np.ones(n, dtype=bool)  # not picked and not a near-duplicate
+    allowed = np.ones(n, dtype=bool)    # quota still open
+    max_sim = np.zeros(n)
+    selected = []
+
+    while len(selected) < k:
+        candidates = available & allowed
+        if not candidates.any():
+            if relax_quotas and quotas and available.any():
+                quotas = {}
+                allowed[:] = True
+                continue
+            break
+
+        mmr = relevance_weight * scores - (1 - relevance_weight) * max_sim
+        i = int(np.argmax(np.where(candidates, mmr, -np.inf)))  # ties → earliest item
+        selected.append(i)
+        available[i] = False
+
+        np.maximum(max_sim, row_similarity(vectors, i), out=max_sim)
+        if duplicate_vectors is not None:
+            available &= row_similarity(duplicate_vectors, i) < duplicate_threshold
+        else:
+            available &= max_sim < duplicate_threshold
+
+        for name in quotas:
+            code = codes[name][i]
+            counts[name][code] += 1
+            if counts[name][code] >= limit(name, code):
+                allowed &= codes[name] != code
+
+    return np.array(selected, dtype=np.int64)
@@ -0,0 +1,174 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+import artifact_store
+from instrumentation import traced, span, count
+
+# --------------------------------------------------
+# Shared, versioned TF-IDF features for db.menuitems
+#
+# Layout (one directory per collection version):
+#   artifacts/menu_features/CURRENT            -> active version
+#   artifacts/menu_features/<version>/*.npy    -> CSR arrays, idf, item ids
+#   artifacts/menu_features/<version>/vocabulary.json
+#   artifacts/menu_features/<version>/manifest.json
+# --------------------------------------------------
+STORE_DIR = os.path.join(artifact_store.ARTIFACTS_DIR, "menu_features")
+
+MENU_TEXT_PROJECTION = {
+    "name": 1,
+    "description": 1,
+    "cuisine": 1,
+    "isVeg": 1,
+    "spicinessLevel": 1
+}
+
+
+def menu_text(item):
+    """Canonical text template used by every recommender"""
+    name = item.get("name", "") or ""
+    desc = item.get("description", "") or ""
+    cuisine = item.get("cuisine", "") or ""
+    is_veg = "veg" if item.get("isVeg", False) else "non-veg"
+    spice = "spicy " * int(item.get("spicinessLevel", 1) or 0)
+    return f"{name} {desc} {cuisine} {is_veg} {spice}".strip()
+
+
+def collection_version(items):
+    """Hash of the menu fields that feed the text template"""
+    digest = hashlib.sha1()
+    for item in sorted(items, key=lambda m: str(m["_id"])):
+        digest.update(str(item["_id"]).encode("utf-8"))
+        digest.update(menu_text(item).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class MenuFeatures:
+    def __init__(self, version, matrix, item_ids, vocabulary, idf):
+        self.version = version
+        self.matrix = matrix          # CSR, L2-normalized rows
+        self.item_ids = item_ids      # row -> item id (str)
+        self.vocabulary = vocabulary  # list of terms in column order
+        self.idf = idf
+        self.index = {item_id: row for row, item_id in enumerate(item_ids.tolist())}
+        self._vectorizer = None
+
+    def rows(self, item_ids):
+        """Row positions for item ids; -1 for items not in this version"""
+        return np.array([self.index.get(str(i), -1) for i in item_ids], dtype=np.int64)
+
+    def transform(self, texts):
+        """Vectorize new text against the frozen vocabulary and idf"""
+        if self._vectorizer is None:
+            vectorizer = TfidfVectorizer(stop_words="english", vocabulary=self.vocabulary)
+            vectorizer.idf_ = np.asarray(self.idf)
+            self._vectorizer = vectorizer
+        return self._vectorizer.transform(texts)
+
+    def vectors_for(self, item_ids, texts):
+        """Stored rows for known items, frozen-vocabulary transform for the rest"""
+        rows = self.rows(item_ids)
+        known = rows >= 0
+        if known.all():
+            return self.matrix[rows]
+
+        unknown = np.flatnonzero(~known)
+        stacked = sparse.vstack([
+            self.matrix[rows[known]],
+            self.transform([texts[i] for i in unknown])
+        ]).tocsr()
+        order = np.concatenate([np.flatnonzero(known), unknown])
+        return stacked[np.argsort(order)]
+
+
+# --------------------------------------------------
+# Build & persist
+# --------------------------------------------------
+@traced("build_feature_store", sample=True)
+def build_feature_store(db, force=False):
+    """Fit TF-IDF over db.menuitems and persist it if the collection changed"""
+    with span("build_feature_store.load"):
+        items = list(db.menuitems.find({}, MENU_TEXT_PROJECTION))
+    if not items:
+        raise Exception("No menu items available for TF-IDF")
+
+    version = collection_version(items)
+    if not force and current_version() == version:
+        return load_feature_store()
+
+    count("build_feature_store.items", len(items))
+    with span("build_feature_store.fit_tfidf"):
+        vectorizer = TfidfVectorizer(stop_words="english")
+        matrix = vectorizer.fit_transform([menu_text(m) for m in items]).tocsr()
+
+    def write(tmp_dir):
+        shape = artifact_store.save_csr(tmp_dir, matrix)
+        np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_.astype(np.float64))
+        np.save(os.path.join(tmp_dir, "item_ids.npy"), np.array([str(m["_id"]) for m in items], dtype="U24"))
+        artifact_store.save_json(tmp_dir, "vocabulary.json", vectorizer.get_feature_names_out().tolist())
+        artifact_store.save_json(tmp_dir, "manifest.json", {
+            "version": version,
+            "shape": shape,
+            "nnz": int(matrix.nnz),
+            "built_at": time.time()
+        })
+
+    artifact_store.publish(STORE_DIR, version, write)
+    return load_feature_store()
+
+
+# --------------------------------------------------
+# Load (memory-mapped, cached per process)
+# --------------------------------------------------
+_cache = {"version": None, "features": None}
+_lock = threading.Lock()
+
+
+def current_version():
+    return artifact_store.current_version(STORE_DIR)
+
+
+def _load_version(version):
+    version_dir = os.path.join(STORE_DIR, version)
+    manifest = artifact_store.load_json(version_dir, "manifest.json")
+
+    return MenuFeatures(
+        version,
+        artifact_store.load_csr(version_dir, manifest["shape"]),
+        artifact_store.load_array(version_dir, "item_ids"),
+        artifact_store.load_json(version_dir, "vocabulary.json"),
+        artifact_store.load_array(version_dir, "idf")
+    )
+
+
+def load_feature_store():
+    """Return the active MenuFeatures, reloading only when CURRENT changes"""
+    version = current_version()
+    if version is None:
+        raise FileNotFoundError("Menu feature store not built. Run: python feature_store.py")
+
+    with _lock:
+        if _cache["version"] != version:
+            _cache["features"] = _load_version(version)
+            artifact_store.hold(STORE_DIR, version)
+            _cache["version"] = version
+        return _cache["features"]
+
+
+def get_feature_store(db):
+    """Cached store for online callers; built on first use if missing"""
+    try:
+        return load_feature_store()
+    except FileNotFoundError:
+        return build_feature_store(db)
+
+
+if __name__ == "__main__":
+    from mongo_client import get_db
+
+    features = build_feature_store(get_db())
+    print(f"Menu feature store ready: version={features.version} shape={features.matrix.shape}")
@@ -0,0 +1,88 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0
+
+RESTAURANT_GEO_PROJECTION = {"name": 1, "location": 1, "rating": 1, "sentimentScore": 1}
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in km (inputs in degrees, broadcastable)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class RestaurantGeoIndex:
+    """Restaurant coordinates in NumPy arrays behind a haversine BallTree"""
+
+    def __init__(self, restaurants):
+        rows = [
+            r for r in restaurants
+            if r.get("location", {}).get("latitude") is not None
+            and r.get("location", {}).get("longitude") is not None
+        ]
+        self.ids = np.array([str(r["_id"]) for r in rows])
+        self.names = np.array([r.get("name") or "" for r in rows], dtype=object)
+        self.cities = np.array([r["location"].get("city") or "" for r in rows], dtype=object)
+        self.lat = np.array([r["location"]["latitude"] for r in rows], dtype=np.float64)
+        self.lon = np.array([r["location"]["longitude"] for r in rows], dtype=np.float64)
+        self.rating = np.array([r.get("rating", 3) for r in rows], dtype=np.float64)
+        self.sentiment = np.array([r.get("sentimentScore", 0) for r in rows], dtype=np.float64)
+
+        self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric="haversine") \
+            if len(rows) else None
+
+    @classmethod
+    def from_db(cls, db):
+        return cls(db.restaurants.find({}, RESTAURANT_GEO_PROJECTION))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def within_radius(self, lat, lon, radius_km):
+        """Indices and distances (km) of restaurants within radius_km"""
+        if self._tree is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        point = np.radians([[lat, lon]])
+        idx, dist = self._tree.query_radius(point, r=radius_km / EARTH_RADIUS_KM, return_distance=True)
+        return idx[0], dist[0] * EARTH_RADIUS_KM
+
+    def nearest(self, lat, lon, k):
+        """Indices and distances (km) of the k nearest restaurants"""
+        if self._tree is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        k = min(k, len(self))
+        dist, idx = self._tree.query(np.radians([[lat, lon]]), k=k)
+        return idx[0], dist[0] * EARTH_RADIUS_KM
+
+    def rank_nearby(self, lat, lon, radius_km=10, k=5, quality_weight=0.6):
+        """Score restaurants near a point: quality blended with proximity.
+
+        Only candidates inside radius_km are scored (proximity is zero past
+        it); when fewer than k are inside, the k nearest are used instead.
+        """
+        idx, _ = self.within_radius(lat, lon, radius_km)
+        if len(idx) < k:
+            idx, _ = self.nearest(lat, lon, k)
+        if len(idx) == 0:
+            return []
+
+        distance = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        distance_score = np.maximum(0, 1 - distance / radius_km)
+        quality_score = self.rating[idx] / 5 + self.sentiment[idx]
+        final = np.round(quality_weight * quality_score + (1 - quality_weight) * distance_score, 3)
+
+        order = np.argsort(-final, kind="stable")[:k]
+        return [
+            {
+                "restaurant": self.names[idx[i]],
+                "city": self.cities[idx[i]],
+                "distance_km": round(float(distance[i]), 2),
+                "final_score": float(final[i])
+            }
+            for i in order
+        ]
@@ -1,9 +1,12 @@
 import os
+import numpy as np
 import pandas as pd
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from async_db import get_async_db, fetch_many, find_all, find_one
+from feature_store import build_feature_store, menu_text, MENU_TEXT_PROJECTION
+from health_rules import health_aware_rules
+from similarity import row_similarity
 
 # --------------------------------------------------
 # 1️⃣ Load env & connect DB
@@ -15,9 +18,14 @@ client = MongoClient(os.getenv("MONGO_URI"))
 db = client["test"]
 
 # --------------------------------------------------
-# 2️⃣ Load ONE sample user with health profile
+# 2️⃣ Load ONE sample user with health profile & the menu (concurrently)
 # --------------------------------------------------
-user = db.users.find_one()
+adb = get_async_db()
+data = fetch_many(
+    user=find_one(adb.users, {}, {"preferences": 1, "health": 1}),
+    menu_items=find_all(adb.menuitems, {}, {**MENU_TEXT_PROJECTION, "nutrition": 1})
+)
+user = data["user"]
 
 health = user.get("health", {})
 prefs = user.get("preferences", {})
@@ -27,9 +35,9 @@ calorie_goal = prefs.get("calorieGoal", 2000)
 conditions = [c.lower() for c in health.get("conditions", [])]
 
 # --------------------------------------------------
-# 3️⃣ Load menu items
+# 3️⃣ Menu item rows
 # --------------------------------------------------
-menu_items = list(db.menuitems.find())
+menu_items = data["menu_items"]
 
 rows = []
 for item in menu_items:
@@ -39,7 +47,7 @@ for item in menu_items:
         "isVeg": item.get("isVeg", False),
         "calories": item.get("nutrition", {}).get("calories", 300),
         "spice": item.get("spicinessLevel", 2),
-        "text": f"{item.get('name','')} {item.get('description','')}"
+        "text": menu_text(item)
     })
 
 df = pd.DataFrame(rows)
@@ -50,50 +58,36 @@ df = pd.DataFrame(rows)
 if diet_type == "veg":
     df = df[df["isVeg"] == True]
 
+df = df.reset_index(drop=True)
+
 # --------------------------------------------------
-# 5️⃣ Content similarity
+# 5️⃣ Content similarity (shared menu features)
 # --------------------------------------------------
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf = vectorizer.fit_transform(df["text"])
-content_sim = cosine_similarity(tfidf)
+features = build_feature_store(db)
+tfidf = features.vectors_for(df["item_id"].tolist(), df["text"].tolist())
+content_sim = row_similarity(tfidf, 0)  # similarity to the first candidate only
 
 # --------------------------------------------------
-# 6️⃣ Health-aware scoring
+# 6️⃣ Health-aware scoring (declarative rules, one pass over all items)
 # --------------------------------------------------
-final_scores = []
-
-for idx, row in df.iterrows():
-    score = content_sim[0][idx]  # base similarity
-    explanation = []
-
-    # 🔹 Soft: calorie penalty
-    if row["calories"] > calorie_goal:
-        score -= 0.15
-        explanation.append("High calories")
-
-    # 🔹 Soft: diabetes rule
-    if "diabetes" in conditions and row["calories"] > 400:
-        score -= 0.2
-        explanation.append("Not ideal for diabetes")
-
-    # 🔹 Soft: BP & spice
-    if "bp" in conditions and row["spice"] >= 4:
-        score -= 0.15
-        explanation.append("Too spicy for BP")
-
-    final_scores.append({
-        "item": row["name"],
-        "final_score": round(score, 3),
-        "calories": row["calories"],
-        "spice": row["spice"],
-        "reason": ", ".join(explanation) if explanation else "Health-compatible"
-    })
+rules = health_aware_rules.evaluate(
+    {"calories": df["calories"].to_numpy(), "spice": df["spice"].to_numpy()},
+    conditions,
+    {"calorie_goal": calorie_goal}
+)
+scores = np.round(rules.apply(content_sim), 3)  # base similarity + rule deltas
 
 # --------------------------------------------------
-# 7️⃣ Show final recommendations
+# 7️⃣ Show final recommendations (explanations for the top 5 only)
 # --------------------------------------------------
-result = pd.DataFrame(final_scores)
-result = result.sort_values("final_score", ascending=False)
+top_idx = np.argsort(-scores, kind="stable")[:5]
+result = pd.DataFrame({
+    "item": df["name"].to_numpy()[top_idx],
+    "final_score": scores[top_idx],
+    "calories": df["calories"].to_numpy()[top_idx],
+    "spice": df["spice"].to_numpy()[top_idx],
+    "reason": [rules.explain(i, ", ", "Health-compatible") for i in top_idx]
+}, index=top_idx)
 
 print("🥗 HEALTH-AWARE RECOMMENDATIONS")
 print(result.head(5))
@@ -0,0 +1,94 @@
+import numpy as np
+
+# --------------------------------------------------
+# Declarative health rules
+#
+# Each rule is data: an optional health condition that activates it,
+# a candidate column, a comparison, a threshold, a score delta and the
+# explanation text. Thresholds given as strings are looked up in the
+# request params (e.g. "remaining_calories"). Rules compile to one
+# boolean mask per rule over the whole candidate array; explanations
+# are only assembled for the rows a caller actually returns.
+# --------------------------------------------------
+OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "between": lambda x, bounds: (x >= bounds[0]) & (x <= bounds[1]),  # inclusive
+}
+
+# Next-meal suggestions on the dashboard
+DASHBOARD_RULES = [
+    {"column": "calories", "op": "<=", "value": "remaining_calories",
+     "delta": 0.2, "reason": "Fits calorie budget"},
+    {"condition": "diabetes", "column": "calories", "op": ">", "value": 300,
+     "delta": -0.15, "reason": "High calories for diabetes"},
+    {"condition": "bp", "column": "spice", "op": ">=", "value": 4,
+     "delta": -0.1, "reason": "High spice for BP"},
+    {"column": "calories", "op": "between", "value": (150, 400),
+     "delta": 0.1, "reason": "Balanced portion"},
+]
+
+# Whole-day recommendations (health_aware_recommender.py)
+HEALTH_AWARE_RULES = [
+    {"column": "calories", "op": ">", "value": "calorie_goal",
+     "delta": -0.15, "reason": "High calories"},
+    {"condition": "diabetes", "column": "calories", "op": ">", "value": 400,
+     "delta": -0.2, "reason": "Not ideal for diabetes"},
+    {"condition": "bp", "column": "spice", "op": ">=", "value": 4,
+     "delta": -0.15, "reason": "Too spicy for BP"},
+]
+
+
+class RuleResult:
+    """Per-rule masks over the candidates, plus lazy explanations"""
+
+    def __init__(self, rules, masks):
+        self.rules = rules
+        self.masks = masks  # (rules, candidates) bool
+
+    def apply(self, base_scores):
+        # One rule at a time so sums match adding the deltas row by row
+        scores = np.array(base_scores, dtype=np.float64)
+        for rule, mask in zip(self.rules, self.masks):
+            scores += np.where(mask, rule["delta"], 0.0)
+        return scores
+
+    def reasons(self, i):
+        return [rule["reason"] for rule, mask in zip(self.rules, self.masks) if mask[i]]
+
+    def explain(self, i, separator="; ", default="Good match"):
+        reasons = self.reasons(i)
+        return separator.join(reasons) if reasons else default
+
+
+class HealthRules:
+    def __init__(self, rules):
+        for rule in rules:
+            if rule["op"] not in OPS:
+                raise ValueError(f"Unknown health rule op: {rule['op']}")
+        self.rules = list(rules)
+
+    def active(self, conditions):
+        conditions = set(conditions)
+        return [r for r in self.rules if r.get("condition") is None or r["condition"] in conditions]
+
+    def evaluate(self, columns, conditions=(), params=None):
+        """Masks for every rule active under the user's conditions.
+
+        columns maps column name -> array over the candidates.
+        """
+        params = params or {}
+        rules = self.active(conditions)
+        n = len(next(iter(columns.values()))) if columns else 0
+        masks = np.zeros((len(rules), n), dtype=bool)
+        for r, rule in enumerate(rules):
+            value = params[rule["value"]] if isinstance(rule["value"], str) else rule["value"]
+            masks[r] = OPS[rule["op"]](np.asarray(columns[rule["column"]]), value)
+        return RuleResult(rules, masks)
+
+
+dashboard_rules = HealthRules(DASHBOARD_RULES)
+health_aware_rules = HealthRules(HEALTH_AWARE_RULES)
@@ -1,129 +1,95 @@
 import os
+import asyncio
+import numpy as np
 import pandas as pd
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-# --------------------------------------------------
-# 1️⃣ Load backend .env
-# --------------------------------------------------
-ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
-load_dotenv(ENV_PATH)
-
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["test"]  # confirmed DB
-
-# --------------------------------------------------
-# 2️⃣ Load menu items
-# --------------------------------------------------
-menu_items = list(db.menuitems.find())
-
-menu_df = []
-for item in menu_items:
-    text = f"{item.get('name','')} {item.get('description','')} "
-    text += "veg " if item.get("isVeg") else "non-veg "
-    text += "spicy " * int(item.get("spicinessLevel", 1))
-
-    menu_df.append({
-        "item_id": str(item["_id"]),
-        "text": text
-    })
-
-menu_df = pd.DataFrame(menu_df)
-
-# --------------------------------------------------
-# 3️⃣ Content-based similarity
-# --------------------------------------------------
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf = vectorizer.fit_transform(menu_df["text"])
-content_sim = cosine_similarity(tfidf)
-
-# --------------------------------------------------
-# 4️⃣ Collaborative Filtering scores (reuse logic)
-# --------------------------------------------------
-reviews = list(db.reviews.find())
-cf_data = []
-
-for r in reviews:
-    rating = r.get("rating", 0)
-    if rating >= 4:
-        score = 1
-    elif rating == 3:
-        score = 0.5
-    else:
-        continue
-
-    cf_data.append({
-        "user": str(r.get("userId", r["_id"])),
-        "item": str(r["restaurantId"]),
-        "score": score
-    })
-
-cf_df = pd.DataFrame(cf_data)
-
-user_item = cf_df.pivot_table(
-    index="user",
-    columns="item",
-    values="score",
-    fill_value=0
-)
-
-# simulate sparsity reduction
-for u in user_item.index:
-    for i in user_item.columns[:2]:
-        user_item.loc[u, i] = max(user_item.loc[u, i], 0.5)
-
-cf_sim = cosine_similarity(user_item)
-
-# --------------------------------------------------
-# 5️⃣ Popularity score (average rating)
-# --------------------------------------------------
-popularity = {}
-
-for r in reviews:
-    rid = str(r["restaurantId"])
-    popularity.setdefault(rid, []).append(r["rating"])
-
-popularity_score = {
-    k: sum(v) / len(v) for k, v in popularity.items()
-}
-
-# --------------------------------------------------
-# 6️⃣ HYBRID RANKING
-# --------------------------------------------------
-TARGET_ITEM_INDEX = 0  # example seed item
+from async_db import get_async_db, submit, find_all
+from feature_store import build_feature_store
+from collaborative_filtering import load_interactions_async, build_user_item_matrix, fill_weak_interactions
+from hybrid_scoring import HybridScorer
+from similarity import row_similarities
+
+
+async def fetch_hybrid_data(adb):
+    """Menu → restaurant docs and review interactions, read concurrently"""
+    return await asyncio.gather(
+        find_all(adb.menuitems, {}, {"restaurantId": 1}),
+        load_interactions_async(adb)
+    )
 
-final_scores = []
 
-for idx, row in menu_df.iterrows():
-    item_id = row["item_id"]
+def load_hybrid_inputs(db, weights=None, adb=None):
+    """Feature store, aligned HybridScorer, CF matrix and its user ids"""
+    # Reads run on the async loop while the feature store loads here
+    pending = submit(fetch_hybrid_data(adb if adb is not None else get_async_db()))
 
-    content_score = content_sim[TARGET_ITEM_INDEX][idx]
+    # Shared menu TF-IDF features (content signal)
+    features = build_feature_store(db)
+    menu_items, (users, restaurants, ratings) = pending.result()
 
-    cf_score = user_item.iloc[0].get(item_id, 0)
+    # Menu item → restaurant, so restaurant-level CF and popularity align to items
+    item_restaurant = {str(m["_id"]): str(m["restaurantId"]) for m in menu_items}
 
-    pop_score = popularity_score.get(item_id, 3) / 5  # normalize
+    # Collaborative Filtering matrix (reuse logic)
+    user_item, user_ids, cf_restaurant_ids = build_user_item_matrix(users, restaurants, ratings)
+    user_item = fill_weak_interactions(user_item)  # simulate sparsity reduction
 
-    final = (
-        0.5 * content_score +
-        0.3 * cf_score +
-        0.2 * pop_score
+    # Popularity = average review rating per restaurant (all ratings)
+    scorer = HybridScorer.from_mappings(
+        features.item_ids,
+        item_restaurant,
+        cf_restaurant_ids,
+        restaurants,
+        ratings,
+        weights
     )
-
-    final_scores.append({
-        "item_id": item_id,
-        "final_score": round(final, 3),
-        "content": round(content_score, 3),
-        "cf": round(cf_score, 3),
-        "popularity": round(pop_score, 3)
+    return features, scorer, user_item, user_ids
+
+
+def content_scores(features, seed_rows):
+    """(seeds, items) cosine to each seed item; rows are L2-normalized"""
+    return row_similarities(features.matrix, seed_rows, normalized=True)
+
+
+if __name__ == "__main__":
+    # --------------------------------------------------
+    # 1️⃣ Load backend .env
+    # --------------------------------------------------
+    ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
+    load_dotenv(ENV_PATH)
+
+    client = MongoClient(os.getenv("MONGO_URI"))
+    db = client["test"]  # confirmed DB
+
+    # --------------------------------------------------
+    # 2️⃣ Content, CF and popularity aligned on menu items
+    # --------------------------------------------------
+    features, scorer, user_item, user_ids = load_hybrid_inputs(db)
+
+    # --------------------------------------------------
+    # 3️⃣ HYBRID RANKING (one vectorized blend)
+    # --------------------------------------------------
+    TARGET_ITEM_INDEX = 0  # example seed item
+    USER_INDEX = 0         # example user
+
+    content = content_scores(features, TARGET_ITEM_INDEX)
+    cf = scorer.cf_scores(user_item, USER_INDEX)
+    final = scorer.blend(content, cf)
+
+    top_idx, _ = scorer.top_k(content, user_item, USER_INDEX, k=5)
+    top_idx = top_idx[0]
+
+    # --------------------------------------------------
+    # 4️⃣ Show top recommendations
+    # --------------------------------------------------
+    final_df = pd.DataFrame({
+        "item_id": scorer.item_ids[top_idx],
+        "final_score": np.round(final[0, top_idx], 3),
+        "content": np.round(content[0, top_idx], 3),
+        "cf": np.round(cf[0, top_idx], 3),
+        "popularity": np.round(scorer.popularity[top_idx], 3)
     })
 
-# --------------------------------------------------
-# 7️⃣ Show top recommendations
-# --------------------------------------------------
-final_df = pd.DataFrame(final_scores)
-final_df = final_df.sort_values("final_score", ascending=False)
-
-print("🔥 HYBRID RECOMMENDATIONS")
-print(final_df.head(5))
+    print("🔥 HYBRID RECOMMENDATIONS")
+    print(final_df.head(5))
@@ -0,0 +1,84 @@
+import numpy as np
+from scipy import sparse
+from topk import top_k_rows
+
+# --------------------------------------------------
+# Vectorized hybrid scoring
+#
+# Content, CF and popularity are NumPy arrays aligned on one menu-item
+# index and blended in a single expression:
+#   final = w_content · content + w_cf · cf + w_pop · popularity
+# Rows are users, so many users are scored at once.
+# --------------------------------------------------
+DEFAULT_WEIGHTS = {"content": 0.5, "cf": 0.3, "popularity": 0.2}
+DEFAULT_POPULARITY = 3.0  # rating assumed for restaurants without reviews
+
+
+def group_averages(keys, values, group_ids):
+    """Mean of values per key, aligned to group_ids (NaN when a group has none)"""
+    keys = np.asarray(keys)
+    group_ids = np.asarray(group_ids)
+    out = np.full(len(group_ids), np.nan)
+    if len(keys) == 0:
+        return out
+
+    unique_keys, codes = np.unique(keys, return_inverse=True)
+    means = np.bincount(codes, weights=np.asarray(values, dtype=np.float64)) / np.bincount(codes)
+
+    pos = np.clip(np.searchsorted(unique_keys, group_ids), 0, len(unique_keys) - 1)
+    found = unique_keys[pos] == group_ids
+    out[found] = means[pos[found]]
+    return out
+
+
+class HybridScorer:
+    def __init__(self, item_ids, item_cf_columns, popularity, weights=None):
+        self.item_ids = np.asarray(item_ids)
+        self.item_cf_columns = np.asarray(item_cf_columns, dtype=np.int64)  # -1 = no CF column
+        self.popularity = np.asarray(popularity, dtype=np.float64)          # already in 0..1
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    @classmethod
+    def from_mappings(cls, item_ids, item_restaurant, cf_restaurant_ids, review_restaurants,
+                      review_ratings, weights=None):
+        """Align restaurant-level CF columns and popularity to menu items.
+
+        item_restaurant maps menu item id -> restaurant id; cf_restaurant_ids
+        are the (sorted) column ids of the user × restaurant CF matrix.
+        """
+        item_ids = np.asarray(item_ids)
+        restaurants = np.array([item_restaurant.get(str(i), "") for i in item_ids])
+
+        cf_restaurant_ids = np.asarray(cf_restaurant_ids)
+        cols = np.full(len(item_ids), -1, dtype=np.int64)
+        if len(cf_restaurant_ids):
+            pos = np.clip(np.searchsorted(cf_restaurant_ids, restaurants), 0, len(cf_restaurant_ids) - 1)
+            hit = cf_restaurant_ids[pos] == restaurants
+            cols[hit] = pos[hit]
+
+        avg_rating = group_averages(review_restaurants, review_ratings, restaurants)
+        popularity = np.where(np.isnan(avg_rating), DEFAULT_POPULARITY, avg_rating) / 5
+
+        return cls(item_ids, cols, popularity, weights)
+
+    def cf_scores(self, user_item, user_rows):
+        """(users, items) CF scores: each item takes its restaurant's column"""
+        user_rows = np.atleast_1d(user_rows)
+        out = np.zeros((len(user_rows), len(self.item_ids)))
+        has_col = self.item_cf_columns >= 0
+        if has_col.any() and user_item.shape[0]:
+            block = user_item[user_rows][:, self.item_cf_columns[has_col]]
+            out[:, has_col] = block.toarray() if sparse.issparse(block) else block
+        return out
+
+    def blend(self, content, cf):
+        w = self.weights
+        return w["content"] * content + w["cf"] * cf + w["popularity"] * self.popularity
+
+    def score(self, content, user_item, user_rows):
+        """Blended (users, items) scores; content is (items,) or (users, items)"""
+        return self.blend(np.atleast_2d(content), self.cf_scores(user_item, user_rows))
+
+    def top_k(self, content, user_item, user_rows, k=5):
+        """(item_index, score) arrays of shape (users, k), best first"""
+        return top_k_rows(self.score(content, user_item, user_rows), k)
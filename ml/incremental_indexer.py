@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+from mongo_client import get_db
+from menu_index import load_index, save_index, encode_meta
+from build_menu_embeddings import load_documents, build_menu_index
+from ann_index import ANN_MIN_ITEMS, load_ann, save_ann
+from instrumentation import trace, count
+
+# --------------------------------------------------
+# Incremental RAG index updates
+#
+# Consumes menu changes (change stream or updatedAt polling), vectorizes
+# them with the frozen vocabulary/idf of the current index and replaces or
+# appends their rows. A full refit runs in the background only once the
+# share of out-of-vocabulary tokens since the last full build passes
+# DRIFT_THRESHOLD. The ANN index (if the previous version had one) is
+# carried forward to each new version; a large index without one gets
+# a full refit, which builds it.
+#
+# Hard deletes are only seen in "stream" mode; "poll" mode relies on the
+# next full refit to drop them.
+# --------------------------------------------------
+DRIFT_THRESHOLD = float(os.getenv("ML_INDEX_DRIFT_THRESHOLD", "0.1"))
+POLL_INTERVAL = float(os.getenv("ML_INDEX_POLL_INTERVAL", "5"))
+
+
+def vocabulary_drift(index, texts):
+    """(oov_tokens, total_tokens) for texts under the index analyzer"""
+    analyzer = index.vectorizer.build_analyzer()
+    vocab = index.vectorizer.vocabulary_
+    oov = 0
+    total = 0
+    for text in texts:
+        tokens = analyzer(text)
+        total += len(tokens)
+        oov += sum(1 for t in tokens if t not in vocab)
+    return oov, total
+
+
+def apply_changes(index, texts, meta, deleted_ids=(), watermark=None):
+    """Publish a new index version with changed rows replaced/appended (and its ANN, if any)"""
+    changed_ids = [m["item_id"] for m in meta]
+    drop = set(changed_ids) | set(deleted_ids)
+
+    item_ids = np.asarray(index.columns["item_id"])
+    keep = ~np.isin(item_ids, list(drop)) if drop else np.ones(len(item_ids), dtype=bool)
+
+    new_columns = encode_meta(meta)
+    columns = {
+        name: np.concatenate([np.asarray(values)[keep], new_columns[name]])
+        for name, values in index.columns.items()
+    }
+    X_new = index.vectorizer.transform(texts)
+    X = sparse.vstack([index.X[np.flatnonzero(keep)], X_new]).tocsr()
+
+    oov, total = vocabulary_drift(index, texts)
+    manifest = index.manifest
+
+    digest = hashlib.sha1(index.version.encode("utf-8"))
+    for item_id, text in zip(changed_ids, texts):
+        digest.update(item_id.encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+    for item_id in sorted(deleted_ids):
+        digest.update(f"-{item_id}".encode("utf-8"))
+
+    version = digest.hexdigest()[:16]
+    ann = load_ann(index.version)
+    if ann is not None:
+        # Published before the index version so readers never see it without one
+        save_ann(ann.updated(keep, X_new), version)
+        count("incremental_index.ann_updates")
+
+    previous_watermark = manifest.get("watermark")
+    if watermark is not None:
+        watermark = watermark.isoformat()
+
+    version = save_index(
+        X,
+        index.vocabulary,
+        index.idf,
+        columns,
+        version,
+        {
+            "watermark": max(filter(None, [previous_watermark, watermark]), default=None),
+            "full_build": False,
+            "oov_tokens": manifest.get("oov_tokens", 0) + oov,
+            "indexed_tokens": manifest.get("indexed_tokens", 0) + total
+        }
+    )
+    return version, oov, total
+
+
+def drift_ratio(manifest):
+    return manifest.get("oov_tokens", 0) / max(manifest.get("indexed_tokens", 0), 1)
+
+
+class IncrementalIndexer:
+    def __init__(self, db, drift_threshold=DRIFT_THRESHOLD):
+        self.db = db
+        self.drift_threshold = drift_threshold
+        self._refit_thread = None
+
+    @property
+    def refitting(self):
+        return self._refit_thread is not None and self._refit_thread.is_alive()
+
+    def _full_refit(self):
+        try:
+            version = build_menu_index(self.db)
+            print(f"Full refit published version {version}")
+        except Exception as e:
+            print(f"Error in full menu index refit: {e}", file=sys.stderr)
+
+    def trigger_refit(self):
+        if not self.refitting:
+            self._refit_thread = threading.Thread(target=self._full_refit, daemon=True)
+            self._refit_thread.start()
+
+    def apply(self, texts, meta, deleted_ids=(), watermark=None):
+        if self.refitting:
+            # The refit reads the collection itself; changes after its
+            # watermark are picked up by the next cycle
+            return None
+        if not meta and not deleted_ids:
+            return None
+
+        index = load_index()
+        with trace("incremental_index", sample=True):
+            version, oov, total = apply_changes(index, texts, meta, deleted_ids, watermark)
+            count("incremental_index.changed", len(meta))
+            count("incremental_index.deleted", len(deleted_ids))
+        print(f"Indexed {len(meta)} changed / {len(deleted_ids)} deleted items -> {version} (oov {oov}/{total})")
+
+        index = load_index()
+        if drift_ratio(index.manifest) > self.drift_threshold:
+            print("Vocabulary drift above threshold, starting full refit")
+            self.trigger_refit()
+        elif len(index) >= ANN_MIN_ITEMS and load_ann(version) is None:
+            print(f"Index has {len(index)} items but no ANN, starting full refit")
+            self.trigger_refit()
+        return version
+
+    def poll_once(self):
+        """Index everything updated since the stored watermark"""
+        if self.refitting:
+            return None
+        watermark = load_index().manifest.get("watermark")
+        query = {"updatedAt": {"$gt": datetime.fromisoformat(watermark)}} if watermark else {}
+        texts, meta, newest = load_documents(self.db, query)
+        return self.apply(texts, meta, watermark=newest)
+
+    def run_poll(self, interval=POLL_INTERVAL):
+        while True:
+            self.poll_once()
+            time.sleep(interval)
+
+    def run_stream(self, batch_size=100, max_wait=1.0):
+        """Consume a change stream (requires a replica set), batching events"""
+        with self.db.menuitems.watch(full_document="updateLookup") as stream:
+            changed = {}
+            deleted = set()
+            last_flush = time.monotonic()
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    item_id = change["documentKey"]["_id"]
+                    if change["operationType"] == "delete":
+                        deleted.add(str(item_id))
+                        changed.pop(item_id, None)
+                    elif change.get("fullDocument"):
+                        changed[item_id] = change["fullDocument"]
+
+                pending = len(changed) + len(deleted)
+                if pending and (pending >= batch_size or time.monotonic() - last_flush >= max_wait):
+                    if not self.refitting:
+                        texts, meta, newest = load_documents(self.db, {"_id": {"$in": list(changed)}})
+                        self.apply(texts, meta, deleted_ids=sorted(deleted), watermark=newest)
+                        changed.clear()
+                        deleted.clear()
+                    last_flush = time.monotonic()
+                elif change is None:
+                    time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the RAG menu index fresh")
+    parser.add_argument("--mode", choices=["poll", "stream"], default="poll")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Run a single poll cycle and exit")
+    args = parser.parse_args()
+
+    indexer = IncrementalIndexer(get_db())
+    try:
+        load_index()
+    except FileNotFoundError:
+        print("No menu index yet, running a full build")
+        build_menu_index(indexer.db)
+
+    if args.once:
+        indexer.poll_once()
+        if indexer._refit_thread is not None:
+            indexer._refit_thread.join()
+    elif args.mode == "stream":
+        indexer.run_stream()
+    else:
+        indexer.run_poll(args.interval)
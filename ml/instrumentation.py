@@ -0,0 +1,271 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+import functools
+import contextvars
+from collections import deque
+
+# --------------------------------------------------
+# Lightweight stage timings and counters
+#
+#   with trace("dashboard"):            # one request / job
+#       with span("dashboard.fetch"):   # one stage
+#           ...
+#       count("dashboard.items_scored", len(df))
+#
+# Every span and counter feeds process-wide aggregates (count/sum/max
+# per stage, totals per counter) served as JSON or Prometheus text. A
+# sampled fraction of traces (ML_TRACE_SAMPLE_RATE, or sample=True for
+# offline jobs) also keeps the per-request span breakdown; finished
+# traces are kept in memory and, with ML_TRACE_LOG=<path>|stderr,
+# appended there as JSON lines. ML_METRICS=0 turns every call into a
+# shared no-op.
+# --------------------------------------------------
+ENABLED = os.getenv("ML_METRICS", "1") != "0"
+SAMPLE_RATE = float(os.getenv("ML_TRACE_SAMPLE_RATE", "0.01"))
+TRACE_LOG = os.getenv("ML_TRACE_LOG")
+RECENT_TRACES = int(os.getenv("ML_RECENT_TRACES", "100"))
+
+_current = contextvars.ContextVar("ml_trace", default=None)
+
+
+class Registry:
+    """Process-wide stage timings (count, total, max seconds) and counters"""
+
+    def __init__(self):
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            t = self._timings.get(name)
+            if t is None:
+                self._timings[name] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                if seconds > t[2]:
+                    t[2] = seconds
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"count": c, "totalMs": round(total * 1000, 3),
+                           "meanMs": round(total * 1000 / c, 3), "maxMs": round(peak * 1000, 3)}
+                    for name, (c, total, peak) in sorted(self._timings.items())
+                },
+                "counters": dict(sorted(self._counters.items()))
+            }
+
+    def prometheus(self, gauges=()):
+        """Prometheus text exposition; gauges is [(metric, {label: value}, number)]"""
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counters = sorted(self._counters.items())
+
+        lines = ["# TYPE ml_stage_seconds summary"]
+        for name, (c, total, _) in timings:
+            lines.append(f'ml_stage_seconds_count{{stage="{name}"}} {c}')
+            lines.append(f'ml_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines.append("# TYPE ml_stage_seconds_max gauge")
+        for name, (_, _, peak) in timings:
+            lines.append(f'ml_stage_seconds_max{{stage="{name}"}} {peak:.6f}')
+        lines.append("# TYPE ml_events_total counter")
+        for name, value in counters:
+            lines.append(f'ml_events_total{{event="{name}"}} {value}')
+
+        declared = set()
+        for metric, labels, value in gauges:
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} gauge")
+                declared.add(metric)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{metric}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
+recent_traces = deque(maxlen=RECENT_TRACES)
+
+
+class Trace:
+    """Span breakdown and counters of one sampled request or job"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.total_seconds = None
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, start, seconds):
+        with self._lock:
+            self.spans.append((name, start - self._start, seconds))
+
+    def add(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "trace": self.name,
+                "startedAt": round(self.started_at, 3),
+                "totalMs": round(self.total_seconds * 1000, 3) if self.total_seconds is not None else None,
+                "spans": [
+                    {"name": name, "startMs": round(offset * 1000, 3), "ms": round(seconds * 1000, 3)}
+                    for name, offset, seconds in sorted(self.spans, key=lambda s: s[1])
+                ],
+                "counters": dict(self.counters)
+            }
+
+
+def _emit(trace):
+    recent_traces.append(trace)
+    if not TRACE_LOG:
+        return
+    line = json.dumps(trace.to_dict(), default=str)
+    try:
+        if TRACE_LOG == "stderr":
+            print(line, file=sys.stderr)
+        else:
+            with open(TRACE_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Trace log write failed: {e}", file=sys.stderr)
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Span:
+    __slots__ = ("name", "start", "trace")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _current.get()
+        self.start = time.perf_counter()
+        return self.trace
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        metrics.observe(self.name, seconds)
+        if self.trace is not None:
+            self.trace.record(self.name, self.start, seconds)
+        return False
+
+
+class _TraceScope:
+    __slots__ = ("name", "sample", "trace", "token", "start")
+
+    def __init__(self, name, sample):
+        self.name = name
+        self.sample = sample
+
+    def __enter__(self):
+        self.trace = None
+        self.token = None
+        self.start = time.perf_counter()
+        active = _current.get()
+        if active is not None:
+            # Nested under another trace (e.g. retrieve inside rag-context): just a span
+            return active
+        sampled = self.sample if self.sample is not None else random.random() < SAMPLE_RATE
+        if sampled:
+            self.trace = Trace(self.name)
+            self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        metrics.observe(self.name, seconds)
+        if self.trace is not None:
+            _current.reset(self.token)
+            self.trace.total_seconds = seconds
+            _emit(self.trace)
+        else:
+            active = _current.get()
+            if active is not None:
+                active.record(self.name, self.start, seconds)
+        return False
+
+
+def span(name):
+    """Time one stage: `with span("dashboard.rank"): ...`"""
+    return _Span(name) if ENABLED else _NOOP
+
+
+def trace(name, sample=None):
+    """Root span of a request or job; yields the Trace when sampled, else None.
+
+    sample=None samples at ML_TRACE_SAMPLE_RATE; offline jobs pass True.
+    """
+    return _TraceScope(name, sample) if ENABLED else _NOOP
+
+
+def traced(name, sample=None):
+    """Decorator form of trace() for job entry points"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name, sample):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add n to a counter (items scored, DB round-trips, cache hits...)"""
+    if not ENABLED:
+        return
+    metrics.add(name, n)
+    active = _current.get()
+    if active is not None:
+        active.add(name, n)
+
+
+def current_trace():
+    return _current.get()
+
+
+async def bind(coro, trace=None):
+    """Await coro with `trace` active, for work handed to another thread's event loop"""
+    if trace is None:
+        return await coro
+    token = _current.set(trace)
+    try:
+        return await coro
+    finally:
+        _current.reset(token)
+
+
+def recent(limit=20):
+    return [t.to_dict() for t in list(recent_traces)[-limit:]]
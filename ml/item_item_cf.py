@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+import artifact_store
+from instrumentation import traced, span, count
+from collaborative_filtering import (
+    load_interactions,
+    build_user_item_matrix,
+    implicit_scores,
+    top_k_neighbours,
+)
+
+# --------------------------------------------------
+# Item–item CF with precomputed neighbour lists
+#
+# Offline: cosine between restaurant columns of the review matrix, keeping
+# only the top-N neighbours per restaurant as (int32 index, float32 sim)
+# arrays. Online: a user's score is a sum over the neighbours of the
+# restaurants they rated — O(rated × N), no similarity recomputation.
+# --------------------------------------------------
+STORE_DIR = os.path.join(artifact_store.ARTIFACTS_DIR, "item_neighbours")
+N_NEIGHBOURS = int(os.getenv("ML_ITEM_NEIGHBOURS", "20"))
+
+
+class ItemNeighbours:
+    def __init__(self, version, item_ids, neighbours, sims):
+        self.version = version
+        self.item_ids = item_ids      # row -> restaurant id (str)
+        self.neighbours = neighbours  # (items, N) int32, -1 = empty slot
+        self.sims = sims              # (items, N) float32
+        self.index = {item_id: row for row, item_id in enumerate(item_ids.tolist())}
+
+    def score(self, rated_item_ids, ratings):
+        """Sparse (item_rows, scores) for a user's rated restaurants"""
+        rows = np.array([self.index.get(str(i), -1) for i in rated_item_ids], dtype=np.int64)
+        weights = implicit_scores(ratings)
+        known = (rows >= 0) & (weights > 0)
+        if not known.any():
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        neigh = self.neighbours[rows[known]]
+        contrib = self.sims[rows[known]] * weights[known][:, None]
+        valid = neigh >= 0
+
+        candidates, inverse = np.unique(neigh[valid], return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib[valid], minlength=len(candidates))
+
+        # Don't recommend what the user already rated
+        unseen = ~np.isin(candidates, rows[known])
+        return candidates[unseen], scores[unseen]
+
+    def recommend(self, rated_item_ids, ratings, k=5):
+        candidates, scores = self.score(rated_item_ids, ratings)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(str(self.item_ids[candidates[i]]), float(scores[i])) for i in order]
+
+
+# --------------------------------------------------
+# Offline build
+# --------------------------------------------------
+@traced("build_item_neighbours", sample=True)
+def build_item_neighbours(db, n_neighbours=N_NEIGHBOURS):
+    with span("build_item_neighbours.load_interactions"):
+        users, items, ratings = load_interactions(db)
+    count("build_item_neighbours.interactions", len(ratings))
+    if len(ratings) == 0:
+        raise Exception("No reviews found")
+
+    user_item, _, item_ids = build_user_item_matrix(users, items, ratings)
+
+    # Rows of X.T are restaurants; reuse the blockwise top-k neighbour search
+    with span("build_item_neighbours.top_k"):
+        neighbours, sims = top_k_neighbours(user_item.T.tocsr(), k=n_neighbours)
+    sims = np.where(neighbours >= 0, sims, 0).astype(np.float32)
+
+    digest = hashlib.sha1()
+    for array in (item_ids.astype("U24"), user_item.indptr, user_item.indices, user_item.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    version = digest.hexdigest()[:16]
+
+    def write(tmp_dir):
+        np.save(os.path.join(tmp_dir, "item_ids.npy"), item_ids.astype("U24"))
+        np.save(os.path.join(tmp_dir, "neighbours.npy"), neighbours.astype(np.int32))
+        np.save(os.path.join(tmp_dir, "sims.npy"), sims)
+        artifact_store.save_json(tmp_dir, "manifest.json", {
+            "version": version,
+            "items": int(len(item_ids)),
+            "neighbours": int(neighbours.shape[1]),
+            "built_at": time.time()
+        })
+
+    artifact_store.publish(STORE_DIR, version, write)
+    return load_item_neighbours()
+
+
+# --------------------------------------------------
+# Online load (memory-mapped, cached per process)
+# --------------------------------------------------
+_cache = {"version": None, "model": None}
+_lock = threading.Lock()
+
+
+def load_item_neighbours():
+    version = artifact_store.current_version(STORE_DIR)
+    if version is None:
+        raise FileNotFoundError("Item neighbours not built. Run: python item_item_cf.py")
+
+    with _lock:
+        if _cache["version"] != version:
+            version_dir = os.path.join(STORE_DIR, version)
+            _cache["model"] = ItemNeighbours(
+                version,
+                artifact_store.load_array(version_dir, "item_ids"),
+                artifact_store.load_array(version_dir, "neighbours"),
+                artifact_store.load_array(version_dir, "sims")
+            )
+            artifact_store.hold(STORE_DIR, version)
+            _cache["version"] = version
+        return _cache["model"]
+
+
+def recommend_for_user(db, user_id, k=5):
+    reviews = list(db.reviews.find({"userId": user_id}, {"restaurantId": 1, "rating": 1}))
+    return load_item_neighbours().recommend(
+        [r["restaurantId"] for r in reviews],
+        [r.get("rating", 0) for r in reviews],
+        k=k
+    )
+
+
+if __name__ == "__main__":
+    from mongo_client import get_db
+
+    parser = argparse.ArgumentParser(description="Build item–item CF neighbour lists")
+    parser.add_argument("--neighbours", type=int, default=N_NEIGHBOURS)
+    args = parser.parse_args()
+
+    db = get_db()
+    start = time.perf_counter()
+    model = build_item_neighbours(db, args.neighbours)
+    print(f"✅ Item neighbours built: version={model.version} items={len(model.item_ids)} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    sample = db.reviews.find_one({"userId": {"$exists": True}}, {"userId": 1})
+    if sample is None:
+        sys.exit(0)
+
+    start = time.perf_counter()
+    recs = recommend_for_user(db, sample["userId"])
+    print(f"🔍 Item–item CF for user {sample['userId']} ({(time.perf_counter() - start) * 1000:.2f} ms incl. DB read):")
+    for item_id, score in recs:
+        print(f"- {item_id} (score: {round(score, 3)})")
@@ -0,0 +1,156 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+import artifact_store
+
+# --------------------------------------------------
+# RAG menu index: TF-IDF CSR arrays + columnar metadata,
+# stored as .npy files and loaded with mmap_mode="r"
+# (replaces the pickled menu_vectors.pkl)
+# --------------------------------------------------
+INDEX_DIR = os.path.join(artifact_store.ARTIFACTS_DIR, "menu_index")
+
+STRING_COLUMNS = ["item_id", "dish", "restaurant", "city"]
+NUMBER_COLUMNS = ["price", "spice", "calories"]   # float64, NaN for missing
+FLAG_COLUMNS = ["isVeg"]              # int8, -1 for missing
+
+
+def _number(value):
+    if value is None or np.isnan(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _flag(value):
+    return None if value < 0 else bool(value)
+
+
+def encode_meta(meta):
+    """Turn a list of meta dicts into fixed-width column arrays"""
+    columns = {}
+    for name in STRING_COLUMNS:
+        columns[name] = np.array([str(m.get(name) or "") for m in meta], dtype=str)
+    for name in NUMBER_COLUMNS:
+        columns[name] = np.array(
+            [np.nan if m.get(name) is None else float(m[name]) for m in meta],
+            dtype=np.float64
+        )
+    for name in FLAG_COLUMNS:
+        columns[name] = np.array(
+            [-1 if m.get(name) is None else int(bool(m[name])) for m in meta],
+            dtype=np.int8
+        )
+    return columns
+
+
+def content_version(texts, meta):
+    digest = hashlib.sha1()
+    for text, m in zip(texts, meta):
+        digest.update(text.encode("utf-8"))
+        digest.update(repr(sorted(m.items())).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class MenuIndex:
+    def __init__(self, version, X, vocabulary, idf, columns, manifest=None):
+        self.version = version
+        self.manifest = manifest or {}
+        self.X = X
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.columns = columns
+
+        self.vectorizer = TfidfVectorizer(stop_words="english", vocabulary=vocabulary)
+        self.vectorizer.idf_ = np.asarray(idf)
+        self._analyzer = self.vectorizer.build_analyzer()
+        self._terms = set(vocabulary)
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def canonical_terms(self, query):
+        """Sorted (term, count) pairs of the in-vocabulary tokens.
+
+        Two queries with the same canonical terms get the same TF-IDF vector
+        (order, case, stop words and unknown words do not matter).
+        """
+        counts = {}
+        for term in self._analyzer(query):
+            if term in self._terms:
+                counts[term] = counts.get(term, 0) + 1
+        return tuple(sorted(counts.items()))
+
+    def meta(self, i):
+        row = {name: str(self.columns[name][i]) for name in STRING_COLUMNS}
+        for name in NUMBER_COLUMNS:
+            row[name] = _number(self.columns[name][i])
+        for name in FLAG_COLUMNS:
+            row[name] = _flag(self.columns[name][i])
+        return row
+
+
+def save_index(X, vocabulary, idf, columns, version, manifest_extra=None):
+    """Publish a new index version and make it CURRENT"""
+    manifest = {
+        "version": version,
+        "shape": list(X.shape),
+        "built_at": time.time()
+    }
+    manifest.update(manifest_extra or {})
+
+    def write(tmp_dir):
+        artifact_store.save_csr(tmp_dir, X)
+        np.save(os.path.join(tmp_dir, "idf.npy"), np.asarray(idf, dtype=np.float64))
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"meta_{name}.npy"), values)
+        artifact_store.save_json(tmp_dir, "vocabulary.json", list(vocabulary))
+        artifact_store.save_json(tmp_dir, "manifest.json", manifest)
+
+    artifact_store.publish(INDEX_DIR, version, write)
+    return version
+
+
+def _load_version(version):
+    version_dir = os.path.join(INDEX_DIR, version)
+    manifest = artifact_store.load_json(version_dir, "manifest.json")
+    columns = {}
+    for name in STRING_COLUMNS + NUMBER_COLUMNS + FLAG_COLUMNS:
+        if os.path.exists(os.path.join(version_dir, f"meta_{name}.npy")):
+            columns[name] = artifact_store.load_array(version_dir, f"meta_{name}")
+        else:
+            # Column added after this version was built: all missing
+            columns[name] = encode_meta([{}] * manifest["shape"][0])[name]
+    return MenuIndex(
+        version,
+        artifact_store.load_csr(version_dir, manifest["shape"]),
+        artifact_store.load_json(version_dir, "vocabulary.json"),
+        artifact_store.load_array(version_dir, "idf"),
+        columns,
+        manifest
+    )
+
+
+# --------------------------------------------------
+# Resident index, reloaded only when CURRENT changes
+# --------------------------------------------------
+_cache = {"stamp": None, "index": None}
+_lock = threading.Lock()
+
+
+def load_index():
+    stamp = artifact_store.current_stamp(INDEX_DIR)
+    if stamp is None:
+        raise FileNotFoundError("Menu index not built. Run: python build_menu_embeddings.py")
+
+    with _lock:
+        if _cache["stamp"] != stamp:
+            version = artifact_store.current_version(INDEX_DIR)
+            if _cache["index"] is None or _cache["index"].version != version:
+                _cache["index"] = _load_version(version)
+                artifact_store.hold(INDEX_DIR, version)
+            _cache["stamp"] = stamp
+        return _cache["index"]
@@ -0,0 +1,32 @@
+import os
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load backend .env once for every ML module
+ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
+load_dotenv(ENV_PATH)
+
+DB_NAME = os.getenv("ML_MONGO_DB", "test")
+
+_client = None
+
+
+def get_client():
+    """Return the process-wide MongoClient, creating its pool on first use"""
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            os.getenv("MONGO_URI"),
+            maxPoolSize=int(os.getenv("ML_MONGO_POOL_SIZE", "20"))
+        )
+    return _client
+
+
+def set_client(client):
+    """Use an existing client (e.g. mongomock in benchmarks) instead of MONGO_URI"""
+    global _client
+    _client = client
+
+
+def get_db():
+    return get_client()[DB_NAME]
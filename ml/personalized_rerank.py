@@ -1,10 +1,12 @@
 import os
+import sys
 import numpy as np
 import pandas as pd
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from feature_store import build_feature_store
+from user_embedding_store import get_user_embeddings, user_vector
+from similarity import row_similarity
 
 # --------------------------------------------------
 # 1️⃣ Load env & DB
@@ -16,66 +18,39 @@ client = MongoClient(os.getenv("MONGO_URI"))
 db = client["test"]
 
 # --------------------------------------------------
-# 2️⃣ Load menu items
+# 2️⃣ TF-IDF item embeddings (shared feature store)
 # --------------------------------------------------
-menu_items = list(db.menuitems.find())
+features = build_feature_store(db)
+item_matrix = features.matrix
+menu_ids = features.item_ids.tolist()
 
-menu_ids = []
-menu_texts = []
-
-for m in menu_items:
-    menu_ids.append(str(m["_id"]))
-    menu_texts.append(
-        f"{m['name']} {m.get('description', '')} {m.get('cuisine', '')}"
-    )
-
-df_menu = pd.DataFrame({
-    "item_id": menu_ids,
-    "text": menu_texts
-})
-
-# --------------------------------------------------
-# 3️⃣ TF-IDF item embeddings
 # --------------------------------------------------
-vectorizer = TfidfVectorizer(stop_words="english")
-item_matrix = vectorizer.fit_transform(df_menu["text"])
-
-# --------------------------------------------------
-# 4️⃣ Build USER embedding (reuse Day 18 logic)
+# 3️⃣ USER embedding: O(1) lookup in the user embedding store
 # --------------------------------------------------
-reviews = list(db.reviews.find())
-reviewed_restaurants = set(str(r["restaurantId"]) for r in reviews)
-
-item_restaurant_map = {
-    str(m["_id"]): str(m["restaurantId"]) for m in menu_items
-}
+store = get_user_embeddings(db)
 
-user_item_indices = [
-    idx for idx, item_id in enumerate(menu_ids)
-    if item_restaurant_map[item_id] in reviewed_restaurants
-]
-
-if not user_item_indices:
+if not len(store):
     raise Exception("No user interactions found")
 
-user_vector = np.mean(
-    item_matrix[user_item_indices].toarray(),
-    axis=0
-).reshape(1, -1)
+user_id = sys.argv[1] if len(sys.argv) > 1 else store.user_ids[0]
+found = user_vector(store, user_id)
+
+if found is None:
+    raise Exception(f"No profile for user {user_id}")
 
 # --------------------------------------------------
-# 5️⃣ Compute user–item similarity
+# 4️⃣ Compute user–item similarity (normalized centroid · normalized rows)
 # --------------------------------------------------
-user_similarity = cosine_similarity(user_vector, item_matrix)[0]
+user_similarity = np.asarray(item_matrix @ found[0]).ravel()
 
 # --------------------------------------------------
-# 6️⃣ Load hybrid scores (simulate or recompute)
+# 5️⃣ Load hybrid scores (simulate or recompute)
 # --------------------------------------------------
 # For now, reuse content similarity as hybrid proxy
-hybrid_scores = cosine_similarity(item_matrix, item_matrix)[0]
+hybrid_scores = row_similarity(item_matrix, 0, normalized=True)
 
 # --------------------------------------------------
-# 7️⃣ Personalized re-ranking
+# 6️⃣ Personalized re-ranking
 # --------------------------------------------------
 results = []
 
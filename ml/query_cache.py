@@ -0,0 +1,45 @@
+import os
+import threading
+from ttl_cache import TTLCache
+
+# --------------------------------------------------
+# RAG query-result cache
+#
+# Keys are (canonical query terms, top_k, canonical filters) for one menu index
+# version; entries never expire by age, only by LRU size and when a new
+# index version is published (the whole cache is dropped then).
+# --------------------------------------------------
+MAX_ENTRIES = int(os.getenv("ML_QUERY_CACHE_SIZE", "2048"))
+
+
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self._entries = TTLCache(max_entries, ttl_seconds=None)
+        self._version = None
+        self._lock = threading.Lock()
+        self.version_resets = 0
+
+    def _check_version(self, version):
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._entries.invalidate()
+                    self.version_resets += 1
+                self._version = version
+
+    def get(self, version, key):
+        self._check_version(version)
+        return self._entries.get(key)
+
+    def put(self, version, key, results):
+        self._check_version(version)
+        self._entries.put(key, results)
+
+    def clear(self):
+        self._entries.invalidate()
+
+    def stats(self):
+        return dict(self._entries.stats(), indexVersion=self._version, versionResets=self.version_resets)
+
+
+query_cache = QueryCache()
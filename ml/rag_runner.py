@@ -1,5 +1,19 @@
+import re
 import sys
 from retrieve_menu import retrieve
+from menu_index import load_index
+from attribute_index import get_attribute_index
+from instrumentation import trace, span
+
+SPICY_MIN_LEVEL = 3
+MILD_MAX_LEVEL = 1
+LOW_CALORIE_CAP = 400
+
+# "under 200", "below rs 150", "less than ₹300", "under 500 calories"
+LIMIT_PATTERN = re.compile(
+    r"\b(?:under|below|less than|within|upto|up to)\s*(?:rs\.?|₹|inr)?\s*(\d+)\s*(kcal|cal|calories)?",
+    re.IGNORECASE
+)
 
 def enhance_query(query):
     """Enhance emotional queries with food-related keywords"""
@@ -33,20 +47,54 @@ def enhance_query(query):
         return f"{query} {' '.join(enhanced_terms)}"
     return query
 
-query = sys.argv[1]
-enhanced_query = enhance_query(query)
+def extract_filters(query, cities=()):
+    """Hard constraints stated in the query: diet, spice, price / calorie caps, city"""
+    query_lower = query.lower()
+    filters = {}
+
+    if 'non veg' in query_lower or 'nonveg' in query_lower or 'non-veg' in query_lower:
+        filters["veg"] = False
+    elif re.search(r"\b(veg|vegetarian|pure veg)\b", query_lower):
+        filters["veg"] = True
+
+    if any(phrase in query_lower for phrase in ['not spicy', 'no spice', 'mild', 'less spicy']):
+        filters["spice"] = [None, MILD_MAX_LEVEL]
+    elif any(word in query_lower for word in ['spicy', 'fiery', 'very hot']):
+        filters["spice"] = [SPICY_MIN_LEVEL, None]
+
+    for amount, unit in LIMIT_PATTERN.findall(query_lower):
+        if unit:
+            filters["maxCalories"] = int(amount)
+        else:
+            filters["price"] = [None, int(amount)]
+    if "maxCalories" not in filters and any(p in query_lower for p in ['low calorie', 'low-calorie', 'low cal']):
+        filters["maxCalories"] = LOW_CALORIE_CAP
+
+    mentioned = [c for c in cities if re.search(rf"\b{re.escape(c)}\b", query_lower)]
+    if mentioned:
+        filters["city"] = mentioned
+    return filters
 
-results = retrieve(enhanced_query, top_k=5)
+def build_context(query, top_k=5, filters=None):
+    with trace("rag_context"):
+        with span("rag_context.enhance_query"):
+            enhanced_query = enhance_query(query)
+            # Explicit filters win over the ones read from the query text
+            derived = extract_filters(query, get_attribute_index(load_index()).cities)
+            filters = dict(derived, **(filters or {}))
 
-context = ""
-for r in results:
-    context += (
-        f"- Dish: {r['dish']}, "
-        f"Restaurant: {r['restaurant']} ({r['city']}), "
-        f"Veg: {r['isVeg']}, "
-        f"Price: {r['price']}, "
-        f"Spice: {r['spice']}\n"
-    )
+        results = retrieve(enhanced_query, top_k=top_k, filters=filters)
 
-print(context)
+        context = ""
+        for r in results:
+            context += (
+                f"- Dish: {r['dish']}, "
+                f"Restaurant: {r['restaurant']} ({r['city']}), "
+                f"Veg: {r['isVeg']}, "
+                f"Price: {r['price']}, "
+                f"Spice: {r['spice']}\n"
+            )
+        return context
 
+if __name__ == "__main__":
+    print(build_context(sys.argv[1]))
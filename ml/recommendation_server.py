@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from mongo_client import get_db
+from async_db import get_async_db, run
+from dashboard_recommender import get_dashboard_recommendations, load_user_context, suggest_meal_type
+from batch_precompute import get_precomputed_recommendations
+from batch_dashboard import iter_dashboard_batch, parse_request
+from retrieve_menu import retrieve
+from rag_runner import build_context
+from query_cache import query_cache
+from suggestion_cache import invalidate_user, cache_stats
+from user_embedding_store import record_review, record_dish
+from instrumentation import metrics, recent, count
+
+# --------------------------------------------------
+# Long-lived recommendation service
+#
+# Replaces one Python interpreter per request (execFile from the
+# backend) with a single process that imports pandas/sklearn once
+# and keeps a warm Mongo connection pool.
+# --------------------------------------------------
+HOST = os.getenv("ML_SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("ML_SERVER_PORT", "8765"))
+
+
+def handle_dashboard(body):
+    user_id = body.get("userId")
+    return get_dashboard_recommendations(
+        user_id if user_id not in (None, "null") else None,
+        int(body.get("consumedCalories", 0)),
+        int(body.get("calorieGoal", 2000))
+    )
+
+
+def handle_precomputed(body):
+    # Nightly top-N filtered by today's budget and the next meal type;
+    # falls back to live dashboard scoring when the user has no list yet
+    # or nothing in it fits (live scoring can add the non-veg backfill)
+    user_id = body.get("userId")
+    user_id = user_id if user_id not in (None, "null") else None
+    consumed = int(body.get("consumedCalories", 0))
+    goal = int(body.get("calorieGoal", 2000))
+
+    meal_type = body.get("mealType")
+    if meal_type is None:
+        from datetime import datetime
+        adb = get_async_db()
+        meal_type = suggest_meal_type(load_user_context(adb, user_id)["meal_types_logged"], datetime.now().hour)
+
+    results = get_precomputed_recommendations(user_id, goal - consumed, meal_type) if user_id else None
+    if not results:
+        if results is not None:
+            count("precomputed.empty_fallbacks")
+        return get_dashboard_recommendations(user_id, consumed, goal)
+    return results
+
+
+def handle_dashboard_batch(body):
+    # {"users": [{userId, consumedCalories, calorieGoal}, ...]} -> JSON lines
+    results = iter_dashboard_batch((parse_request(u) for u in body["users"]), hour=body.get("hour"))
+    return "".join(json.dumps(r, default=str) + "\n" for r in results)
+
+
+def handle_retrieve(body):
+    return retrieve(body["query"], top_k=int(body.get("topK", 5)), filters=body.get("filters"))
+
+
+def handle_rag_context(body):
+    return {"context": build_context(body["query"], top_k=int(body.get("topK", 5)), filters=body.get("filters"))}
+
+
+def handle_invalidate(body):
+    # Sent by the backend after a calorie log or profile update
+    user_id = body.get("userId")
+    return {"invalidated": invalidate_user(user_id if user_id not in (None, "null") else None)}
+
+
+def handle_profile_event(body):
+    # Sent by the backend after a new review or an accepted/saved suggestion;
+    # folds the interaction into the user's embedding as a running mean.
+    # A stale store is rebuilt in the background and the event queued for it
+    user_id = body["userId"]
+    event_id = body.get("eventId")
+    if body.get("restaurantId"):
+        interactions = record_review(get_db(), user_id, body["restaurantId"], event_id)
+    else:
+        interactions = record_dish(get_db(), user_id, body["dish"], event_id)
+    return {"interactions": interactions}
+
+
+ROUTES = {
+    "/dashboard": handle_dashboard,
+    "/precomputed": handle_precomputed,
+    "/dashboard-batch": handle_dashboard_batch,
+    "/retrieve": handle_retrieve,
+    "/rag-context": handle_rag_context,
+    "/invalidate": handle_invalidate,
+    "/profile-event": handle_profile_event,
+}
+
+def all_cache_stats():
+    return dict(cache_stats(), queries=query_cache.stats())
+
+
+def prometheus_metrics():
+    # Stage timings/counters plus the caches' own size and hit counters
+    gauges = [
+        (f"ml_cache_{field}", {"cache": name}, stats[field])
+        for name, stats in all_cache_stats().items()
+        for field in ("size", "hits", "misses", "hitRate", "evictions")
+    ]
+    return metrics.prometheus(gauges)
+
+
+GET_ROUTES = {
+    "/health": lambda: {"status": "ok"},
+    "/stats": all_cache_stats,
+    "/metrics": prometheus_metrics,
+    "/metrics.json": metrics.snapshot,
+    "/traces": lambda: recent(),
+}
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status, text, content_type="text/plain; version=0.0.4"):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        handler = GET_ROUTES.get(self.path)
+        if handler is None:
+            return self._send_json(404, {"error": "Not found"})
+        payload = handler()
+        if isinstance(payload, str):
+            return self._send_text(200, payload)
+        self._send_json(200, payload)
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            return self._send_json(404, {"error": "Not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send_json(400, {"error": "Invalid JSON body"})
+
+        try:
+            payload = handler(body)
+            if isinstance(payload, str):
+                # JSON lines (batch endpoints)
+                return self._send_text(200, payload, "application/x-ndjson")
+            self._send_json(200, payload)
+        except KeyError as e:
+            self._send_json(400, {"error": f"Missing field: {e.args[0]}"})
+        except ValueError as e:
+            # Bad field values, e.g. an unknown retrieval filter
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            print(f"Error in recommendation server ({self.path}): {e}", file=sys.stderr)
+            self._send_json(500, {"error": "Recommendation failed"})
+
+    def log_message(self, format, *args):
+        # Keep stdout quiet; errors are reported explicitly above
+        pass
+
+
+def serve(host=HOST, port=PORT):
+    # Open both pools before the first request arrives
+    try:
+        get_db().command("ping")
+        run(get_async_db().command("ping"))
+    except Exception as e:
+        print(f"Mongo warm-up failed, will retry on first request: {e}", file=sys.stderr)
+
+    server = ThreadingHTTPServer((host, port), RecommendationHandler)
+    server.daemon_threads = True
+    print(f"Recommendation server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
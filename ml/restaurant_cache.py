@@ -0,0 +1,71 @@
+import os
+import time
+import threading
+from instrumentation import count
+
+# Only the restaurant fields the recommenders read
+RESTAURANT_PROJECTION = {"name": 1, "rating": 1, "location": 1}
+
+
+class RestaurantCache:
+    """In-process restaurant lookup keyed by _id with TTL invalidation.
+
+    Misses are fetched with a single ``$in`` query, so resolving the
+    restaurants for any number of menu items costs at most one round-trip.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # _id -> (expires_at, doc)
+        self._lock = threading.Lock()
+
+    def _lookup(self, restaurant_ids):
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        with self._lock:
+            for rid in set(restaurant_ids):
+                entry = self._entries.get(rid)
+                if entry and entry[0] > now:
+                    found[rid] = entry[1]
+                else:
+                    missing.append(rid)
+        count("restaurant_cache.hits", len(found))
+        count("restaurant_cache.misses", len(missing))
+        return found, missing
+
+    def _store(self, docs, found):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for doc in docs:
+                self._entries[doc["_id"]] = (expires_at, doc)
+                found[doc["_id"]] = doc
+        return found
+
+    def get_many(self, db, restaurant_ids):
+        found, missing = self._lookup(restaurant_ids)
+        if missing:
+            count("db.round_trips")
+            docs = db.restaurants.find({"_id": {"$in": missing}}, RESTAURANT_PROJECTION)
+            self._store(docs, found)
+        return found
+
+    async def get_many_async(self, adb, restaurant_ids):
+        """Same as get_many against an async (pymongo async / Motor) database"""
+        found, missing = self._lookup(restaurant_ids)
+        if missing:
+            count("db.round_trips")
+            cursor = adb.restaurants.find({"_id": {"$in": missing}}, RESTAURANT_PROJECTION)
+            self._store(await cursor.to_list(None), found)
+        return found
+
+    def invalidate(self, restaurant_id=None):
+        with self._lock:
+            if restaurant_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(restaurant_id, None)
+
+
+restaurant_cache = RestaurantCache(int(os.getenv("ML_RESTAURANT_CACHE_TTL", "300")))
@@ -1,17 +1,87 @@
 import os
-import pickle
-from sklearn.metrics.pairwise import cosine_similarity
+import sys
+import numpy as np
+from menu_index import load_index
+from ann_index import ANN_MIN_ITEMS, load_ann
+from attribute_index import get_attribute_index, normalize_filters
+from query_cache import query_cache
+from topk import cosine_top_k
+from instrumentation import trace, span, count
 
-# 🔥 Always resolve paths relative to this file
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-VECTOR_PATH = os.path.join(BASE_DIR, "menu_vectors.pkl")
+# Below ANN_MIN_ITEMS dishes exact scoring is already fast and stays exact.
+# ANN candidates fetched per requested result when filters drop some of them
+FILTER_OVERFETCH = int(os.getenv("ML_FILTER_OVERFETCH", "4"))
 
-def retrieve(query, top_k=5):
-    with open(VECTOR_PATH, "rb") as f:
-        vectorizer, X, meta = pickle.load(f)
+def _filtered_top_k(index, q_vec, rows, ann, top_k):
+    if ann is not None:
+        # Large subsets: over-fetch ANN candidates and keep the matching ones;
+        # too few survivors fall back to exact scoring of the subset
+        count("retrieve.ann_queries")
+        found, _ = ann.search(q_vec, top_k * FILTER_OVERFETCH, X=index.X)
+        found = found[np.isin(found, rows)]
+        if len(found) >= min(top_k, len(rows)):
+            return found[:top_k]
 
-    q_vec = vectorizer.transform([query])
-    scores = cosine_similarity(q_vec, X)[0]
+    # Exact scoring over the matching subset only
+    count("retrieve.items_scored", len(rows))
+    sub_idx, _ = cosine_top_k(q_vec, index.X[rows], top_k)
+    return rows[sub_idx]
 
-    top_idx = scores.argsort()[::-1][:top_k]
-    return [meta[i] for i in top_idx]
+_warned_missing_ann = set()
+
+def _ann_for(index, n_candidates):
+    """The ANN for this index version when the candidate set is large enough"""
+    if n_candidates < ANN_MIN_ITEMS:
+        return None
+    ann = load_ann(index.version)
+    if ann is None:
+        # Large enough for ANN but none was published for this version: exact scoring
+        count("retrieve.ann_missing")
+        if index.version not in _warned_missing_ann:
+            _warned_missing_ann.add(index.version)
+            print(f"No ANN index for menu index {index.version} ({len(index)} items); "
+                  f"falling back to exact scoring", file=sys.stderr)
+    return ann
+
+def retrieve(query, top_k=5, use_cache=True, filters=None):
+    """Top menu items for a text query; filters (veg, spice/price/calories ranges, maxCalories, city) are hard constraints"""
+    with trace("retrieve"):
+        # Index stays resident; it is only reloaded when a new version is published
+        index = load_index()
+        filters = normalize_filters(filters)
+
+        # Repeated intents (same terms in any order/case) skip scoring entirely
+        key = (index.canonical_terms(query), top_k, filters)
+        if use_cache:
+            cached = query_cache.get(index.version, key)
+            if cached is not None:
+                count("retrieve.cache_hits")
+                return [dict(r) for r in cached]
+            count("retrieve.cache_misses")
+
+        rows = None
+        if filters:
+            with span("retrieve.filter"):
+                rows = get_attribute_index(index).select(filters)
+            count("retrieve.filtered_queries")
+
+        with span("retrieve.score"):
+            q_vec = index.vectorizer.transform([query])
+            n_candidates = len(index) if rows is None else len(rows)
+            ann = _ann_for(index, n_candidates)
+            if rows is not None:
+                top_idx = _filtered_top_k(index, q_vec, rows, ann, top_k)
+            elif ann is not None:
+                # Large catalogs: probe a few IVF lists of the dense LSA vectors,
+                # then re-score those candidates exactly
+                count("retrieve.ann_queries")
+                top_idx, _ = ann.search(q_vec, top_k, X=index.X)
+            else:
+                # TF-IDF rows are already L2-normalized, so cosine is a sparse dot product
+                count("retrieve.items_scored", len(index))
+                top_idx, _ = cosine_top_k(q_vec, index.X, top_k)
+        results = [index.meta(i) for i in top_idx]
+
+        if use_cache:
+            query_cache.put(index.version, key, results)
+        return [dict(r) for r in results]
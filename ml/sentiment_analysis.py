@@ -1,73 +1,215 @@
 import os
-import pandas as pd
-from pymongo import MongoClient
-from dotenv import load_dotenv
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-
-# --------------------------------------------------
-# 1️⃣ Load env & connect DB
-# --------------------------------------------------
-ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
-load_dotenv(ENV_PATH)
-
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["test"]
-
-# --------------------------------------------------
-# 2️⃣ Load reviews
-# --------------------------------------------------
-reviews = list(db.reviews.find())
-
-if not reviews:
-    raise Exception("No reviews found")
-
-# --------------------------------------------------
-# 3️⃣ Initialize VADER
-# --------------------------------------------------
-sid = SentimentIntensityAnalyzer()
-
-sentiment_rows = []
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-for r in reviews:
-    text = r.get("reviewText", "")
-
-    if not text.strip():
-        continue
-
-    score = sid.polarity_scores(text)["compound"]
-
-    sentiment_rows.append({
-        "restaurantId": str(r["restaurantId"]),
-        "sentiment": score
-    })
-
-df = pd.DataFrame(sentiment_rows)
-
-print("Total sentiment-scored reviews:", len(df))
-
-# --------------------------------------------------
-# 4️⃣ Aggregate sentiment per restaurant
-# --------------------------------------------------
-restaurant_sentiment = (
-    df.groupby("restaurantId")["sentiment"]
-    .mean()
-    .reset_index()
-)
-
-restaurant_sentiment["sentiment_label"] = restaurant_sentiment["sentiment"].apply(
-    lambda x: "Positive" if x > 0.2 else "Negative" if x < -0.2 else "Neutral"
-)
-
-print("📊 Restaurant Sentiment Scores")
-print(restaurant_sentiment.head())
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+from instrumentation import traced, span, count
 
 # --------------------------------------------------
-# 5️⃣ OPTIONAL: Store sentiment back to DB
+# Incremental, batched sentiment job
+#
+# Only reviews with _id past the stored watermark are scanned (cursor,
+# in batches), scored with VADER in a process pool (one vectorized call
+# per batch, see batch_sentiment.py), and folded into running
+# per-restaurant sums/counts. sentimentScore = sum / count is then
+# written back with one bulk_write, and the watermark advances only after
+# all writes succeed.
+#
+# The fold is idempotent: the range's upper _id is recorded as "pending"
+# before any $inc, and each aggregate stores the range it last folded
+# (its $inc is skipped when that already matches). A run that dies midway
+# is finished by the next one re-scoring exactly the pending range.
 # --------------------------------------------------
-for _, row in restaurant_sentiment.iterrows():
-    db.restaurants.update_one(
-        {"_id": row["restaurantId"]},
-        {"$set": {"sentimentScore": round(row["sentiment"], 3)}}
+JOB_ID = "sentiment_analysis"
+BATCH_SIZE = int(os.getenv("ML_SENTIMENT_BATCH_SIZE", "2000"))
+WORKERS = int(os.getenv("ML_SENTIMENT_WORKERS", str(os.cpu_count() or 2)))
+
+# "batch": vectorized scorer (batch_sentiment.py, same compound scores);
+# "vader": nltk polarity_scores() per review
+ENGINE = os.getenv("ML_SENTIMENT_ENGINE", "batch")
+
+_sid = None
+_scorer = None
+
+
+def _init_worker():
+    global _sid, _scorer
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    _sid = SentimentIntensityAnalyzer()
+    if ENGINE == "batch":
+        from batch_sentiment import BatchSentimentScorer
+        _scorer = BatchSentimentScorer(_sid.lexicon, _sid.constants)
+
+
+def score_batch(batch):
+    """[(restaurantId, text)] -> [(restaurantId, compound)] inside a worker"""
+    if _scorer is not None:
+        compounds = _scorer.compound_scores([text for _, text in batch])
+        return [(rid, float(compound)) for (rid, _), compound in zip(batch, compounds)]
+    return [(rid, _sid.polarity_scores(text)["compound"]) for rid, text in batch]
+
+
+def review_batches(db, watermark, batch_size=BATCH_SIZE, upper=None):
+    """Yield (batch, last_id) for reviews newer than the watermark (up to upper)"""
+    query = {}
+    if watermark is not None:
+        query["$gt"] = watermark
+    if upper is not None:
+        query["$lte"] = upper
+    query = {"_id": query} if query else {}
+    cursor = db.reviews.find(
+        query,
+        {"restaurantId": 1, "reviewText": 1},
+        batch_size=batch_size
+    ).sort("_id", 1)
+
+    batch = []
+    last_id = None
+    for r in cursor:
+        last_id = r["_id"]
+        text = r.get("reviewText") or ""
+        if text.strip():
+            batch.append((r["restaurantId"], text))
+        if len(batch) >= batch_size:
+            yield batch, last_id
+            batch = []
+    if batch or last_id is not None:
+        yield batch, last_id
+
+
+def score_reviews(db, watermark, workers=WORKERS, batch_size=BATCH_SIZE, upper=None):
+    """Per-restaurant (sum, count) deltas for new reviews, plus the new watermark"""
+    deltas = {}
+    new_watermark = watermark
+    scored = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded window of batches in flight so memory stays flat
+        in_flight = deque()
+
+        def drain_one():
+            nonlocal scored
+            for rid, compound in in_flight.popleft().result():
+                total, count = deltas.get(rid, (0.0, 0))
+                deltas[rid] = (total + compound, count + 1)
+                scored += 1
+
+        for batch, last_id in review_batches(db, watermark, batch_size, upper):
+            new_watermark = last_id
+            if batch:
+                in_flight.append(pool.submit(score_batch, batch))
+            if len(in_flight) >= workers * 2:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    return deltas, new_watermark, scored
+
+
+def apply_deltas(db, deltas, batch_watermark):
+    """Fold deltas into running aggregates (once per batch_watermark) and write sentimentScore in bulk"""
+    if not deltas:
+        return {}
+
+    db.restaurant_sentiment.bulk_write([
+        UpdateOne({"_id": rid}, {"$setOnInsert": {"sum": 0.0, "count": 0}}, upsert=True)
+        for rid in deltas
+    ], ordered=False)
+    # Aggregates that already folded this range (an earlier, interrupted run) are skipped
+    db.restaurant_sentiment.bulk_write([
+        UpdateOne(
+            {"_id": rid, "watermark": {"$ne": batch_watermark}},
+            {"$inc": {"sum": total, "count": count}, "$set": {"watermark": batch_watermark}}
+        )
+        for rid, (total, count) in deltas.items()
+    ], ordered=False)
+
+    aggregates = db.restaurant_sentiment.find({"_id": {"$in": list(deltas)}})
+    scores = {a["_id"]: round(a["sum"] / a["count"], 3) for a in aggregates if a["count"]}
+
+    db.restaurants.bulk_write([
+        UpdateOne({"_id": rid}, {"$set": {"sentimentScore": score}})
+        for rid, score in scores.items()
+    ], ordered=False)
+    return scores
+
+
+def sentiment_label(score):
+    return "Positive" if score > 0.2 else "Negative" if score < -0.2 else "Neutral"
+
+
+def fold_range(db, watermark, workers=WORKERS, batch_size=BATCH_SIZE, upper=None):
+    """Score reviews in (watermark, upper] and fold them in; returns (scored, scores, new watermark)"""
+    with span("sentiment_analysis.score_reviews"):
+        deltas, new_watermark, scored = score_reviews(db, watermark, workers, batch_size, upper)
+    count("sentiment_analysis.reviews_scored", scored)
+    if upper is not None:
+        # Same range key as the interrupted run, even if some of its reviews are gone
+        new_watermark = upper
+    if new_watermark == watermark:
+        return scored, {}, watermark
+
+    db.ml_jobs.update_one({"_id": JOB_ID}, {"$set": {"pending": new_watermark}}, upsert=True)
+    with span("sentiment_analysis.write_scores"):
+        scores = apply_deltas(db, deltas, new_watermark)
+    db.ml_jobs.update_one(
+        {"_id": JOB_ID},
+        {"$set": {"watermark": new_watermark}, "$unset": {"pending": ""}}
     )
-
-print("✅ Sentiment scores updated in restaurants collection")
+    return scored, scores, new_watermark
+
+
+@traced("sentiment_analysis", sample=True)
+def run(db, full=False, workers=WORKERS, batch_size=BATCH_SIZE):
+    if full:
+        # Re-score everything: reset running aggregates and the watermark
+        db.restaurant_sentiment.delete_many({})
+        db.ml_jobs.delete_one({"_id": JOB_ID})
+
+    state = db.ml_jobs.find_one({"_id": JOB_ID}) or {}
+    watermark = state.get("watermark")
+    scored = 0
+    scores = {}
+
+    if state.get("pending") is not None:
+        # The previous run stopped after recording this range: finish exactly it first
+        scored, scores, watermark = fold_range(db, watermark, workers, batch_size, upper=state["pending"])
+        count("sentiment_analysis.resumed")
+
+    more_scored, more_scores, _ = fold_range(db, watermark, workers, batch_size)
+    scores.update(more_scores)
+    return scored + more_scored, scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental restaurant sentiment scoring")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and re-score all reviews")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    # --------------------------------------------------
+    # 1️⃣ Load env & connect DB
+    # --------------------------------------------------
+    ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend/.env"))
+    load_dotenv(ENV_PATH)
+
+    client = MongoClient(os.getenv("MONGO_URI"))
+    db = client["test"]
+
+    # --------------------------------------------------
+    # 2️⃣ Score new reviews & update restaurants
+    # --------------------------------------------------
+    scored, scores = run(db, args.full, args.workers, args.batch_size)
+
+    print("Total sentiment-scored reviews:", scored)
+
+    if scores:
+        print("📊 Restaurant Sentiment Scores")
+        for rid, score in list(scores.items())[:5]:
+            print(f"- {rid}: {score} ({sentiment_label(score)})")
+        print("✅ Sentiment scores updated in restaurants collection")
+    else:
+        print("No new reviews since last run")
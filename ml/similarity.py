@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from scipy import sparse
+from topk import normalize_rows, top_k_rows
+
+# --------------------------------------------------
+# Cosine similarity without N × N matrices
+#
+# row_similarities() scores only the requested rows against every row
+# (one sparse product per call). all_pairs_top_k() streams blocks of
+# rows whose dense (block × N) scratch fits ML_SIMILARITY_MEMORY_MB and
+# keeps only the top-k neighbours of each, so memory stays O(N · k).
+# --------------------------------------------------
+MEMORY_BUDGET_MB = float(os.getenv("ML_SIMILARITY_MEMORY_MB", "256"))
+
+
+def block_rows(n_columns, memory_budget_mb=MEMORY_BUDGET_MB, itemsize=8):
+    """Rows per block so a dense (rows × n_columns) scratch fits the budget"""
+    return max(1, int(memory_budget_mb * 1024 * 1024 // (max(n_columns, 1) * itemsize)))
+
+
+def row_similarities(X, rows, normalized=False):
+    """(len(rows), N) cosine of the requested rows of X against all of X"""
+    Xn = X if normalized else normalize_rows(X)
+    S = Xn[np.atleast_1d(rows)] @ Xn.T
+    return S.toarray() if sparse.issparse(S) else np.asarray(S)
+
+
+def row_similarity(X, row, normalized=False):
+    """(N,) cosine of one row of X against all of X"""
+    return row_similarities(X, row, normalized)[0]
+
+
+def _mostly_disjoint(X):
+    """True when a row's products with all rows touch far fewer than N entries"""
+    col_counts = np.bincount(X.indices, minlength=X.shape[1]).astype(np.float64)
+    products_per_row = (col_counts ** 2).sum() / max(X.shape[0], 1)
+    return products_per_row < X.shape[0] / 4
+
+
+def _sparse_top_k_rows(S, k, exclude_cols=None):
+    """Row-wise top-k over the stored entries of a CSR matrix; missing slots are -1 / -inf"""
+    S = S.tocsr()
+    counts = np.diff(S.indptr)
+    owner = np.repeat(np.arange(S.shape[0]), counts)
+    data = S.data.astype(np.float32)
+    if exclude_cols is not None:
+        data[S.indices == exclude_cols[owner]] = -np.inf
+
+    order = np.lexsort((-data, owner))  # grouped by row, best first within a row
+    rank = np.arange(len(order)) - S.indptr[owner[order]]
+    keep = order[rank < k]
+    slots = rank[rank < k]
+
+    idx = np.full((S.shape[0], k), -1, dtype=np.int64)
+    scores = np.full((S.shape[0], k), -np.inf, dtype=np.float32)
+    idx[owner[keep], slots] = S.indices[keep]
+    scores[owner[keep], slots] = data[keep]
+    idx[np.isneginf(scores)] = -1
+    return idx, scores
+
+
+def all_pairs_top_k(X, k, rows=None, memory_budget_mb=MEMORY_BUDGET_MB, exclude_self=True):
+    """k most similar rows (cosine) for each requested row, best first.
+
+    Returns (neighbours, sims) of shape (len(rows), k) float32; missing
+    neighbours (fewer than k other rows) are -1. On very sparse input only
+    rows sharing at least one column are candidates, so rows with fewer
+    than k overlapping rows also get -1 instead of zero-score neighbours.
+    """
+    Xn = normalize_rows(X).astype(np.float32)
+    rows = np.arange(X.shape[0]) if rows is None else np.asarray(rows)
+    # Scratch per block column: float32 scores over all rows (+ the dense
+    # feature block) and the int64 positions argpartition returns
+    block = block_rows(X.shape[0] + X.shape[1], memory_budget_mb, itemsize=12)
+
+    # Very sparse rows (menu text) share few columns: a sparse product and a
+    # top-k over its stored entries are far cheaper. Dense-ish rows (CF
+    # interactions): sparse @ dense avoids a huge sparse intermediate.
+    XnT = Xn.T.tocsr() if sparse.issparse(Xn) and _mostly_disjoint(Xn) else None
+
+    neighbours = []
+    sims = []
+    for start in range(0, len(rows), block):
+        chunk = rows[start:start + block]
+        if XnT is not None:
+            idx, scores = _sparse_top_k_rows(Xn[chunk] @ XnT, k, chunk if exclude_self else None)
+            neighbours.append(idx)
+            sims.append(scores)
+            continue
+        if sparse.issparse(Xn):
+            # sparse @ dense -> dense (N × block), no sparse N × block intermediate
+            S = (Xn @ Xn[chunk].T.toarray()).T
+        else:
+            S = Xn[chunk] @ Xn.T
+        if exclude_self:
+            S[np.arange(len(chunk)), chunk] = -np.inf
+        idx, scores = top_k_rows(S, k)
+        idx[np.isneginf(scores)] = -1  # fewer than k other rows
+        neighbours.append(idx)
+        sims.append(scores)
+
+    if not neighbours:
+        return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+    return np.vstack(neighbours), np.vstack(sims)
@@ -0,0 +1,38 @@
+import os
+from ttl_cache import TTLCache
+
+# --------------------------------------------------
+# Per-user dashboard suggestion cache
+#
+# Results are keyed by (user_id, suggested_meal_type, calorie bucket).
+# The user's profile and today's logged meal types are cached separately
+# (keyed by user and day), so a hit never touches Mongo. Both are dropped
+# for a user when the backend reports a new calorie log or profile edit;
+# the meal-type window rolling over changes the key by itself.
+# --------------------------------------------------
+CALORIE_BUCKET = int(os.getenv("ML_SUGGESTION_CALORIE_BUCKET", "50"))
+MAX_ENTRIES = int(os.getenv("ML_SUGGESTION_CACHE_SIZE", "10000"))
+TTL_SECONDS = int(os.getenv("ML_SUGGESTION_CACHE_TTL", "900"))
+
+suggestions = TTLCache(MAX_ENTRIES, TTL_SECONDS)
+user_contexts = TTLCache(MAX_ENTRIES, TTL_SECONDS)
+
+
+def calorie_bucket(remaining_calories):
+    return int(remaining_calories // CALORIE_BUCKET)
+
+
+def suggestion_key(user_id, meal_type, remaining_calories):
+    return (user_id, meal_type, calorie_bucket(remaining_calories))
+
+
+def invalidate_user(user_id=None):
+    """Forget cached suggestions and context for one user (or everyone)"""
+    if user_id is None:
+        return suggestions.invalidate() + user_contexts.invalidate()
+    matches = lambda key: key[0] == user_id  # noqa: E731
+    return suggestions.invalidate(matches) + user_contexts.invalidate(matches)
+
+
+def cache_stats():
+    return {"suggestions": suggestions.stats(), "userContexts": user_contexts.stats()}
@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# --------------------------------------------------
+# Shared top-k scoring
+#
+# Rows are L2-normalized once, so cosine similarity becomes a plain
+# sparse dot product, and results are selected with np.argpartition
+# (O(n) per query) instead of a full argsort.
+# --------------------------------------------------
+
+
+def normalize_rows(X):
+    """L2-normalize rows (sparse or dense); zero rows stay zero"""
+    if sparse.issparse(X):
+        return normalize(X.tocsr(), norm="l2", copy=True)
+    return normalize(np.asarray(X, dtype=np.float64), norm="l2", copy=True)
+
+
+def top_k_indices(scores, k, exclude=None):
+    """Indices of the k largest scores, best first"""
+    scores = np.asarray(scores, dtype=np.float64).ravel()
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+
+    n_excluded = 0 if exclude is None else np.size(exclude)
+    k = min(k, scores.shape[0] - n_excluded)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < scores.shape[0]:
+        candidates = np.argpartition(scores, scores.shape[0] - k)[-k:]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_rows(S, k):
+    """Row-wise top-k of a dense score matrix -> (indices, scores), best first"""
+    S = np.asarray(S)
+    k = min(k, S.shape[1])
+    if k <= 0:
+        empty = np.empty((S.shape[0], 0))
+        return empty.astype(np.int64), empty
+
+    if k < S.shape[1]:
+        # Partition on S itself (no negated copy); the k largest land at the end
+        part = np.argpartition(S, S.shape[1] - k, axis=1)[:, -k:]
+    else:
+        part = np.tile(np.arange(S.shape[1]), (S.shape[0], 1))
+    part_scores = np.take_along_axis(S, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def cosine_scores(q, X_normed):
+    """Cosine of one query vector against pre-normalized rows"""
+    scores = X_normed @ normalize_rows(q).T
+    if sparse.issparse(scores):
+        scores = scores.toarray()
+    return np.asarray(scores).ravel()
+
+
+def cosine_top_k(q, X_normed, k):
+    scores = cosine_scores(q, X_normed)
+    idx = top_k_indices(scores, k)
+    return idx, scores[idx]
+
+
+def batch_cosine_top_k(Q, X_normed, k, chunk_size=256):
+    """Top-k for many queries with one sparse matmul per chunk of queries"""
+    Q = normalize_rows(Q)
+    XT = X_normed.T
+
+    all_idx = []
+    all_scores = []
+    for start in range(0, Q.shape[0], chunk_size):
+        S = Q[start:start + chunk_size] @ XT
+        S = S.toarray() if sparse.issparse(S) else np.asarray(S)
+        idx, scores = top_k_rows(S, k)
+        all_idx.append(idx)
+        all_scores.append(scores)
+
+    if not all_idx:
+        return np.empty((0, 0), dtype=np.int64), np.empty((0, 0))
+    return np.vstack(all_idx), np.vstack(all_scores)
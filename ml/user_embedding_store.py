@@ -0,0 +1,393 @@
+import os
+import sys
+import time
+import threading
+from collections import deque
+from datetime import datetime, timezone
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy import sparse
+from bson import ObjectId
+import artifact_store
+from feature_store import build_feature_store, get_feature_store
+from instrumentation import traced, span, count
+
+# --------------------------------------------------
+# User profile embeddings
+#
+# One float32 centroid (mean TF-IDF row of every menu item the user
+# interacted with) and an interaction count per user, in memory-mapped
+# arrays tied to one feature store version:
+#   artifacts/user_embeddings/CURRENT
+#   artifacts/user_embeddings/<version>/centroids.npy  (capacity × vocab) float32
+#   artifacts/user_embeddings/<version>/counts.npy     (capacity,) int64
+#   artifacts/user_embeddings/<version>/users.txt      row -> user id, append-only
+#
+# Lookups are a dict hit plus one row read. New reviews / saved and
+# accepted suggestions fold into the centroid as a running mean in place
+# (one writer process: the recommendation server); readers elsewhere
+# pick up appended users and grown arrays on their next miss. A full
+# rebuild (reviews, savedrecommendations and calorie logs added from a
+# suggestion) publishes a new version, e.g. after the menu vocabulary changes.
+# --------------------------------------------------
+STORE_DIR = os.path.join(artifact_store.ARTIFACTS_DIR, "user_embeddings")
+MIN_CAPACITY = 1024
+BUILD_CHUNK = 4096
+RECENT_EVENTS = 1024  # folded events kept to replay onto a rebuild that started after them
+
+
+def _user_key(user_id):
+    return str(user_id)
+
+
+class UserEmbeddingStore:
+    def __init__(self, version, writable=False):
+        self.version = version
+        self.version_dir = os.path.join(STORE_DIR, version)
+        self.writable = writable
+        manifest = artifact_store.load_json(self.version_dir, "manifest.json")
+        self.features_version = manifest["features_version"]
+        self.dim = manifest["dim"]
+        self.user_ids = []
+        self.index = {}
+        self._users_offset = 0
+        self._lock = threading.Lock()
+        self._open_arrays()
+        self._read_new_users()
+
+    def _path(self, name):
+        return os.path.join(self.version_dir, name)
+
+    def _open_arrays(self):
+        mode = "r+" if self.writable else "r"
+        self.centroids = np.load(self._path("centroids.npy"), mmap_mode=mode)
+        self.counts = np.load(self._path("counts.npy"), mmap_mode=mode)
+
+    def _read_new_users(self):
+        with open(self._path("users.txt"), "rb") as f:
+            f.seek(self._users_offset)
+            tail = f.read()
+        complete = tail[:tail.rfind(b"\n") + 1]  # ignore a line still being written
+        for line in complete.decode("utf-8").splitlines():
+            self.index[line] = len(self.user_ids)
+            self.user_ids.append(line)
+        self._users_offset += len(complete)
+        if len(self.user_ids) > len(self.counts):
+            self._open_arrays()  # the writer grew the arrays
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def get(self, user_id):
+        """(centroid float32 view, interaction count), or None for an unknown user"""
+        key = _user_key(user_id)
+        row = self.index.get(key)
+        if row is None and not self.writable:
+            with self._lock:
+                self._read_new_users()
+            row = self.index.get(key)
+        if row is None:
+            return None
+        return self.centroids[row], int(self.counts[row])
+
+    def _grow(self, capacity):
+        for name, dtype, shape in (("centroids", np.float32, (capacity, self.dim)), ("counts", np.int64, (capacity,))):
+            old = getattr(self, name)
+            tmp_path = self._path(f"{name}.npy.tmp-{os.getpid()}")
+            grown = open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+            grown[:len(old)] = old
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self._path(f"{name}.npy"))
+        self._open_arrays()
+
+    def _row_for(self, key):
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        row = len(self.user_ids)
+        if row >= len(self.counts):
+            self._grow(max(MIN_CAPACITY, 2 * len(self.counts)))
+        self.centroids[row] = 0
+        self.counts[row] = 0
+        with open(self._path("users.txt"), "a", encoding="utf-8") as f:
+            f.write(key + "\n")
+        self._users_offset = os.path.getsize(self._path("users.txt"))
+        self.index[key] = row
+        self.user_ids.append(key)
+        return row
+
+    def add(self, user_id, item_vectors):
+        """Fold interacted item rows (k × vocab, sparse or dense) into the running mean"""
+        if not self.writable:
+            raise PermissionError("User embedding store opened read-only")
+        k = item_vectors.shape[0]
+        if k == 0:
+            return None
+        sums = np.asarray(item_vectors.sum(axis=0), dtype=np.float32).ravel()
+
+        with self._lock:
+            row = self._row_for(_user_key(user_id))
+            n = int(self.counts[row])
+            self.centroids[row] += (sums - k * self.centroids[row]) / (n + k)
+            self.counts[row] = n + k
+        count("user_embeddings.updates")
+        return n + k
+
+    def flush(self):
+        if self.writable:
+            self.centroids.flush()
+            self.counts.flush()
+
+
+# --------------------------------------------------
+# Full build from all interactions
+# --------------------------------------------------
+def _before(doc, cutoff):
+    """Documents created before cutoff (an ObjectId); all of them when cutoff is None"""
+    return cutoff is None or not isinstance(doc["_id"], ObjectId) or doc["_id"] < cutoff
+
+
+def load_dish_events(db, cutoff=None):
+    """(user key, dish name) for saved recommendations and suggestions added to meals"""
+    saved = db.savedrecommendations.find({"userId": {"$ne": None}}, {"userId": 1, "dish": 1})
+    accepted = db.calorielogs.find({"source": "suggestion", "userId": {"$ne": None}}, {"userId": 1, "suggestedDish": 1})
+    events = [(_user_key(d["userId"]), d["dish"]) for d in saved if d.get("dish") and _before(d, cutoff)]
+    events += [(_user_key(d["userId"]), d["suggestedDish"]) for d in accepted
+               if d.get("suggestedDish") and _before(d, cutoff)]
+    return events
+
+
+@traced("build_user_embeddings", sample=True)
+def build_user_embeddings(db, features=None, cutoff=None):
+    """Centroid of the menu items of every restaurant each user reviewed and
+    of every dish they saved or added from a suggestion. With cutoff (an
+    ObjectId) only documents created before it are read."""
+    features = features if features is not None else build_feature_store(db)
+    X = features.matrix
+
+    with span("build_user_embeddings.load"):
+        # userId is optional on reviews; anonymous ones belong to no profile
+        reviews = [r for r in db.reviews.find({"userId": {"$ne": None}}, {"userId": 1, "restaurantId": 1})
+                   if _before(r, cutoff)]
+        dish_events = load_dish_events(db, cutoff)
+        menu_items = list(db.menuitems.find({}, {"restaurantId": 1, "name": 1}))
+
+    user_ids, user_codes = np.unique(
+        np.array([_user_key(r["userId"]) for r in reviews] + [u for u, _ in dish_events], dtype=str),
+        return_inverse=True
+    )
+    review_users = user_codes[:len(reviews)]
+    dish_users = user_codes[len(reviews):]
+    item_rows = features.rows([m["_id"] for m in menu_items])
+    known = item_rows >= 0
+    restaurant_ids, restaurant_codes = np.unique(
+        np.array([str(m["restaurantId"]) for m in menu_items] + [str(r["restaurantId"]) for r in reviews], dtype=str),
+        return_inverse=True
+    )
+    item_restaurants = restaurant_codes[:len(menu_items)]
+    review_restaurants = restaurant_codes[len(menu_items):]
+
+    # users × restaurants review counts, restaurants × items membership
+    reviewed = sparse.csr_matrix(
+        (np.ones(len(reviews)), (review_users, review_restaurants)), shape=(len(user_ids), len(restaurant_ids))
+    )
+    membership = sparse.csr_matrix(
+        (np.ones(known.sum()), (item_restaurants[known], item_rows[known])), shape=(len(restaurant_ids), X.shape[0])
+    )
+    counts = np.asarray(reviewed @ membership.sum(axis=1)).ravel().astype(np.int64)
+    counts += np.bincount(dish_users, minlength=len(user_ids))
+
+    # Dishes like record_dish(): the first menu item of that name, else the name vectorized
+    first_by_name = {}
+    for m in menu_items:
+        first_by_name.setdefault(m.get("name"), m["_id"])
+    dish_rows = features.rows([first_by_name.get(d) for _, d in dish_events])
+    stored = dish_rows >= 0
+    dish_items = sparse.csr_matrix(
+        (np.ones(stored.sum()), (dish_users[stored], dish_rows[stored])), shape=(len(user_ids), X.shape[0])
+    )
+    names, name_codes = np.unique(np.array([d for _, d in dish_events], dtype=str)[~stored], return_inverse=True)
+
+    with span("build_user_embeddings.centroids"):
+        sums = reviewed @ (membership @ X) + dish_items @ X
+        if len(names):
+            named = sparse.csr_matrix(
+                (np.ones(len(name_codes)), (dish_users[~stored], name_codes.ravel())), shape=(len(user_ids), len(names))
+            )
+            sums = sums + named @ features.transform(names.tolist())
+        sums = sums.tocsr()
+        version = f"{features.version}-{time.time_ns():x}"
+        capacity = max(MIN_CAPACITY, 2 * len(user_ids))
+
+        def write(tmp_dir):
+            centroids = open_memmap(os.path.join(tmp_dir, "centroids.npy"), mode="w+",
+                                    dtype=np.float32, shape=(capacity, X.shape[1]))
+            for start in range(0, len(user_ids), BUILD_CHUNK):
+                end = min(start + BUILD_CHUNK, len(user_ids))
+                centroids[start:end] = sums[start:end].toarray() / np.maximum(counts[start:end], 1)[:, None]
+            centroids.flush()
+            del centroids
+
+            padded = np.zeros(capacity, dtype=np.int64)
+            padded[:len(counts)] = counts
+            np.save(os.path.join(tmp_dir, "counts.npy"), padded)
+            with open(os.path.join(tmp_dir, "users.txt"), "w", encoding="utf-8") as f:
+                f.writelines(u + "\n" for u in user_ids.tolist())
+            artifact_store.save_json(tmp_dir, "manifest.json", {
+                "version": version,
+                "features_version": features.version,
+                "dim": int(X.shape[1]),
+                "users": int(len(user_ids)),
+                "built_at": time.time()
+            })
+
+        artifact_store.publish(STORE_DIR, version, write)
+    count("build_user_embeddings.users", len(user_ids))
+    return version
+
+
+# --------------------------------------------------
+# Load (memory-mapped, cached per process)
+# --------------------------------------------------
+_cache = {"key": None, "store": None}
+_lock = threading.Lock()
+
+
+def load_user_embeddings(writable=False):
+    """The active store, or None if it was never built"""
+    version = artifact_store.current_version(STORE_DIR)
+    if version is None:
+        return None
+    with _lock:
+        if _cache["key"] != (version, writable):
+            _cache["store"] = UserEmbeddingStore(version, writable)
+            artifact_store.hold(STORE_DIR, version)
+            _cache["key"] = (version, writable)
+        return _cache["store"]
+
+
+def get_user_embeddings(db, writable=False):
+    """Active store for the current menu vocabulary; (re)built when missing or stale"""
+    features = get_feature_store(db)
+    store = load_user_embeddings(writable)
+    if store is None or store.features_version != features.version:
+        build_user_embeddings(db, features)
+        store = load_user_embeddings(writable)
+    return store
+
+
+def user_vector(store, user_id):
+    """L2-normalized centroid (float32) and interaction count; None for unknown users"""
+    found = store.get(user_id)
+    if found is None or found[1] == 0:
+        return None
+    centroid, n = found
+    norm = np.linalg.norm(centroid)
+    return (np.asarray(centroid) / norm if norm else np.asarray(centroid)), n
+
+
+# --------------------------------------------------
+# Incremental events
+#
+# Events fold into the active store. When it is missing or was built for
+# an older feature store version, one full rebuild runs in a background
+# thread and events are queued meanwhile. The rebuild reads documents
+# created before its cutoff; queued events (and recently folded ones)
+# whose eventId is not before the cutoff are then replayed onto it.
+# --------------------------------------------------
+_rebuild_lock = threading.Lock()
+_rebuild = {"thread": None, "queued": []}
+_recent = deque(maxlen=RECENT_EVENTS)
+
+
+def _counted(event, cutoff):
+    """Whether a rebuild with this cutoff already read the event's document"""
+    event_id = event[3]
+    return ObjectId.is_valid(event_id) and ObjectId(event_id) < cutoff
+
+
+def rebuilding():
+    thread = _rebuild["thread"]
+    return thread is not None and thread.is_alive()
+
+
+def _start_rebuild(db):
+    """Background rebuild (caller holds _rebuild_lock); no-op while one runs"""
+    if rebuilding():
+        return
+    cutoff = ObjectId.from_datetime(datetime.now(timezone.utc))
+    # Already folded into the store the rebuild replaces, but created too late for it
+    _rebuild["queued"].extend(e for e in _recent if not _counted(e, cutoff))
+    _recent.clear()
+    _rebuild["thread"] = threading.Thread(target=_run_rebuild, args=(db, cutoff), daemon=True)
+    _rebuild["thread"].start()
+    count("user_embeddings.rebuilds")
+
+
+def _run_rebuild(db, cutoff):
+    try:
+        version = build_user_embeddings(db, get_feature_store(db), cutoff)
+        print(f"User embeddings rebuilt: version={version}")
+    except Exception as e:
+        # Events stay queued; the next one starts another rebuild
+        print(f"Error rebuilding user embeddings: {e}", file=sys.stderr)
+        with _rebuild_lock:
+            _rebuild["thread"] = None
+        return
+    with _rebuild_lock:
+        queued, _rebuild["queued"] = _rebuild["queued"], []
+        _rebuild["thread"] = None
+    for event in queued:
+        if not _counted(event, cutoff):
+            record_event(db, *event)
+
+
+def _event_vectors(db, features, restaurant_id, dish):
+    if restaurant_id is not None:
+        # A review: the reviewed restaurant's menu items
+        rid = ObjectId(restaurant_id) if isinstance(restaurant_id, str) and ObjectId.is_valid(restaurant_id) else restaurant_id
+        rows = features.rows([m["_id"] for m in db.menuitems.find({"restaurantId": rid}, {"_id": 1})])
+        return features.matrix[rows[rows >= 0]]
+    # A saved / accepted suggestion: the dish's stored row, or its name vectorized
+    item = db.menuitems.find_one({"name": dish}, {"_id": 1})
+    rows = features.rows([item["_id"]]) if item else np.array([-1])
+    return features.matrix[rows] if rows[0] >= 0 else features.transform([dish])
+
+
+def record_event(db, user_id, restaurant_id=None, dish=None, event_id=None):
+    """Fold a review (restaurant_id) or a dish into the user's centroid.
+
+    Returns the new interaction count, or None when the event was queued
+    behind a rebuild. event_id is the _id of the stored review / saved
+    recommendation / calorie log.
+    """
+    features = get_feature_store(db)
+    event = (user_id, restaurant_id, dish, event_id)
+    with _rebuild_lock:
+        store = load_user_embeddings(writable=True)
+        if rebuilding() or store is None or store.features_version != features.version:
+            _rebuild["queued"].append(event)
+            _start_rebuild(db)
+            count("user_embeddings.queued")
+            return None
+        _recent.append(event)
+    return store.add(user_id, _event_vectors(db, features, restaurant_id, dish))
+
+
+def record_review(db, user_id, restaurant_id, event_id=None):
+    """A new review: fold in the reviewed restaurant's menu items"""
+    return record_event(db, user_id, restaurant_id=restaurant_id, event_id=event_id)
+
+
+def record_dish(db, user_id, dish, event_id=None):
+    """A saved / accepted suggestion: the dish's stored row, or its name vectorized"""
+    return record_event(db, user_id, dish=dish, event_id=event_id)
+
+
+if __name__ == "__main__":
+    from mongo_client import get_db
+
+    version = build_user_embeddings(get_db())
+    store = load_user_embeddings()
+    print(f"✅ User embeddings built: version={version} users={len(store)} dim={store.dim}")
@@ -1,9 +1,8 @@
 import os
-import numpy as np
-import pandas as pd
+import sys
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
+from user_embedding_store import get_user_embeddings
 
 # --------------------------------------------------
 # 1️⃣ Load env & DB
@@ -15,65 +14,27 @@ client = MongoClient(os.getenv("MONGO_URI"))
 db = client["test"]
 
 # --------------------------------------------------
-# 2️⃣ Load menu items
+# 2️⃣ User embedding store (built from all reviews on first use,
+#    then kept current by review / suggestion events)
 # --------------------------------------------------
-menu_items = list(db.menuitems.find())
+store = get_user_embeddings(db)
 
-menu_texts = []
-menu_ids = []
-menu_restaurant_map = {}  # menu_item_id -> restaurant_id (string)
+if not len(store):
+    raise Exception("No reviewed users found")
 
-for m in menu_items:
-    menu_id = str(m["_id"])
-    restaurant_id = str(m["restaurantId"])  # ✅ normalize here
+user_id = sys.argv[1] if len(sys.argv) > 1 else store.user_ids[0]
 
-    text = f"{m['name']} {m.get('description', '')} {m.get('cuisine', '')}"
-
-    menu_texts.append(text)
-    menu_ids.append(menu_id)
-    menu_restaurant_map[menu_id] = restaurant_id
-
-df_menu = pd.DataFrame({
-    "item_id": menu_ids,
-    "text": menu_texts
-})
-
-# --------------------------------------------------
-# 3️⃣ TF-IDF embeddings
 # --------------------------------------------------
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf_matrix = vectorizer.fit_transform(df_menu["text"])
-
-# --------------------------------------------------
-# 4️⃣ Load reviews (restaurant-level)
+# 3️⃣ O(1) lookup of the user's centroid
 # --------------------------------------------------
-reviews = list(db.reviews.find())
+found = store.get(user_id)
 
-# Normalize reviewed restaurant IDs
-reviewed_restaurants = set(str(r["restaurantId"]) for r in reviews)
+if found is None or found[1] == 0:
+    raise Exception(f"No profile for user {user_id}")
 
-print("🔍 Reviewed restaurant IDs:", reviewed_restaurants)
-
-# --------------------------------------------------
-# 5️⃣ Collect menu items from reviewed restaurants
-# --------------------------------------------------
-item_indices = []
-
-for idx, item_id in enumerate(menu_ids):
-    if menu_restaurant_map[item_id] in reviewed_restaurants:
-        item_indices.append(idx)
-
-print("🔍 Matched menu items:", len(item_indices))
-
-if not item_indices:
-    raise Exception("No menu items matched reviewed restaurants")
-
-# --------------------------------------------------
-# 6️⃣ Build user embedding
-# --------------------------------------------------
-user_vector = np.mean(tfidf_matrix[item_indices].toarray(), axis=0)
+user_vector, interactions = found
 
 print("👤 User Profile Embedding Generated")
-print("- User: demo_user")
+print("- User:", user_id)
 print("- Vector size:", len(user_vector))
-print("- Based on menu items:", len(item_indices))
+print("- Based on menu items:", interactions)